@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lokalizacja katalogów z danymi aplikacji (pamięć podręczna, historia pomiarów itp.).
+"""
+
+import os
+import sys
+
+def data_dir(*parts):
+    """
+    Zwraca (i tworzy) katalog danych aplikacji.
+    Domyślnie %LOCALAPPDATA%\\TranscriberApp w Windows i ~/.cache/transcriber-app w pozostałych systemach;
+    zmienna środowiskowa TRANSCRIBER_DATA_DIR pozwala wskazać inny katalog.
+    """
+    base = os.environ.get("TRANSCRIBER_DATA_DIR")
+    if not base:
+        if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+            base = os.path.join(os.environ["LOCALAPPDATA"], "TranscriberApp")
+        else:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            base = os.path.join(cache_home, "transcriber-app")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def transcriptions_dir():
+    """Domyślny katalog plików .md z transkrypcjami (katalog 'transcriptions' obok aplikacji)."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'transcriptions')
@@ -0,0 +1,582 @@
+# -*- coding: utf-8 -*-
+
+"""
+Natywny dekoder plików WAV (PCM i IEEE float) do formatu wejściowego Whisper:
+16 kHz, mono, float32. Dane są mapowane do pamięci, a miksowanie do mono
+i zmiana częstotliwości próbkowania (polifazowy filtr sinc z oknem Kaisera)
+odbywa się blokami w NumPy, bez uruchamiania ffmpeg.
+
+decode_to_file dekoduje nagranie (WAV natywnie, inne formaty przez ffmpeg) blokami stałej
+wielkości do pliku tymczasowego; zużycie pamięci nie zależy wtedy od długości nagrania.
+
+Nagrania już w formacie wejściowym (16 kHz, mono, PCM 16 bit - np. archiwa z ingest.py) są
+zamieniane na float32 jedną operacją wprost z mapowanego pliku, bez zmiany częstotliwości.
+"""
+
+import os
+import json
+import struct
+import tempfile
+import subprocess
+from math import gcd
+
+import numpy as np
+
+# Częstotliwość próbkowania oczekiwana przez Whisper
+TARGET_SAMPLE_RATE = 16000
+
+# Kody formatu z nagłówka "fmt "
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Parametry filtra: liczba przejść przez zero po każdej stronie, pasmo względem Nyquista, parametr okna Kaisera
+FILTER_ZERO_CROSSINGS = 16
+FILTER_ROLLOFF = 0.945
+FILTER_KAISER_BETA = 8.6
+
+# Liczba próbek wyjściowych przetwarzanych w jednym bloku (ogranicza zużycie pamięci)
+BLOCK_OUTPUT_SAMPLES = 1 << 16
+
+# Rozmiar bufora odczytu wyjścia ffmpeg przy dekodowaniu do pliku (bajty)
+STREAM_CHUNK_BYTES = 1 << 20
+
+# Końcowy fragment komunikatów ffmpeg dołączany do opisu błędu (bajty)
+FFMPEG_ERROR_TAIL_BYTES = 4096
+
+# Blok RIFF z opisem źródła nagrania (JSON) zapisywany przez ingest.py
+SOURCE_CHUNK_ID = b'tsrc'
+
+class WavFormatError(ValueError):
+    """Plik nie jest obsługiwanym plikiem WAV."""
+
+class WavInfo:
+    """Opis strumienia danych w pliku WAV."""
+
+    def __init__(self, path, format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size, source=None):
+        self.path = path
+        self.format_tag = format_tag
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits_per_sample
+        self.data_offset = data_offset
+        self.data_size = data_size
+        # Opis nagrania źródłowego (blok SOURCE_CHUNK_ID) lub None
+        self.source = source
+
+    @property
+    def block_align(self):
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def frames(self):
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self):
+        return self.frames / float(self.sample_rate)
+
+    def is_canonical(self, target_rate=TARGET_SAMPLE_RATE):
+        """Czy próbki są już w formacie wejściowym Whisper (mono, PCM 16 bit, target_rate)."""
+        return (self.format_tag == WAVE_FORMAT_PCM and self.bits_per_sample == 16 and self.channels == 1
+                and self.sample_rate == target_rate)
+
+def read_wav_info(path):
+    """
+    Odczytuje nagłówek RIFF/WAVE i zwraca WavInfo.
+    Obsługuje pliki niedomknięte przez WaveFileWriter (rozmiar danych 0 lub większy niż plik).
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise WavFormatError("Brak nagłówka RIFF/WAVE")
+
+        fmt = None
+        source = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise WavFormatError("Brak bloku danych 'data'")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.read(1)
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                data_size = chunk_size
+                break
+            elif chunk_id == SOURCE_CHUNK_ID:
+                try:
+                    source = json.loads(f.read(chunk_size).decode('utf-8'))
+                except ValueError:
+                    source = None
+                if chunk_size % 2:
+                    f.read(1)
+            else:
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    if fmt is None or len(fmt) < 16:
+        raise WavFormatError("Brak bloku 'fmt '")
+    format_tag, channels, sample_rate, _, _, bits_per_sample = struct.unpack('<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # Pierwsze dwa bajty identyfikatora podformatu to właściwy kod formatu
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+
+    if format_tag == WAVE_FORMAT_PCM and bits_per_sample not in (8, 16, 24, 32):
+        raise WavFormatError(f"Nieobsługiwana rozdzielczość PCM: {bits_per_sample} bit")
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample not in (32, 64):
+        raise WavFormatError(f"Nieobsługiwana rozdzielczość float: {bits_per_sample} bit")
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise WavFormatError(f"Nieobsługiwany format WAV: 0x{format_tag:04x}")
+    if channels < 1 or sample_rate < 1:
+        raise WavFormatError("Nieprawidłowy nagłówek 'fmt '")
+
+    available = file_size - data_offset
+    if data_size == 0 or data_size > available:
+        data_size = available
+    return WavInfo(path, format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size, source)
+
+def can_decode(path):
+    """Sprawdza, czy plik można zdekodować natywnie (bez ffmpeg)."""
+    if not path.lower().endswith(('.wav', '.wave')):
+        return False
+    try:
+        read_wav_info(path)
+        return True
+    except (OSError, WavFormatError, struct.error):
+        return False
+
+def read_source(path):
+    """Zwraca opis nagrania źródłowego zapisany w archiwum ingest.py (None dla innych plików)."""
+    if not path.lower().endswith(('.wav', '.wave')):
+        return None
+    try:
+        return read_wav_info(path).source
+    except (OSError, WavFormatError, struct.error):
+        return None
+
+class _FrameReader:
+    """Odczyt fragmentów nagrania jako mono float32 z pliku zmapowanego w pamięci."""
+
+    def __init__(self, info):
+        self.info = info
+        self.frames = info.frames
+        if self.frames == 0:
+            self._data = None
+        else:
+            self._data = np.memmap(info.path, dtype=_sample_dtype(info), mode='r', offset=info.data_offset,
+                                   shape=(self.frames,) + _frame_shape(info))
+
+    def close(self):
+        """Zwalnia mapowanie pliku."""
+        data, self._data = self._data, None
+        mmap_obj = getattr(data, '_mmap', None)
+        if mmap_obj is not None:
+            mmap_obj.close()
+
+    def read(self, start, stop):
+        """Zwraca ramki [start, stop) jako mono float32, z zerami poza zakresem nagrania."""
+        out = np.zeros(stop - start, dtype=np.float32)
+        lo = max(start, 0)
+        hi = min(stop, self.frames)
+        if hi <= lo:
+            return out
+        out[lo - start:hi - start] = _to_mono(self.info, self._data[lo:hi])
+        return out
+
+class _FileFrameReader:
+    """
+    Odczyt fragmentów nagrania zwykłymi odczytami pliku. W odróżnieniu od mapowania strony pliku
+    nie zostają w pamięci procesu, więc zużycie pamięci nie rośnie z długością nagrania.
+    """
+
+    def __init__(self, info):
+        self.info = info
+        self.frames = info.frames
+        self._file = open(info.path, 'rb')
+
+    def close(self):
+        self._file.close()
+
+    def read(self, start, stop):
+        """Zwraca ramki [start, stop) jako mono float32, z zerami poza dostępnymi danymi."""
+        info = self.info
+        out = np.zeros(stop - start, dtype=np.float32)
+        lo = max(start, 0)
+        hi = min(stop, self.frames)
+        if hi <= lo:
+            return out
+        self._file.seek(info.data_offset + lo * info.block_align)
+        raw = self._file.read((hi - lo) * info.block_align)
+        frames = len(raw) // info.block_align
+        block = np.frombuffer(raw[:frames * info.block_align], dtype=_sample_dtype(info))
+        out[lo - start:lo - start + frames] = _to_mono(info, block.reshape((frames,) + _frame_shape(info)))
+        return out
+
+def _to_mono(info, block):
+    """Zamienia blok ramek (frames, channels[, 3]) na mono float32 w zakresie [-1, 1]."""
+    if info.format_tag == WAVE_FORMAT_PCM and info.bits_per_sample == 24:
+        raw = block.astype(np.int32)
+        samples = raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16)
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples).astype(np.float32)
+        scale = 1.0 / (1 << 23)
+    elif info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        samples = block.astype(np.float32)
+        scale = 1.0
+    elif info.bits_per_sample == 8:
+        samples = block.astype(np.float32) - 128.0
+        scale = 1.0 / 128
+    else:
+        samples = block.astype(np.float32)
+        scale = 1.0 / (1 << (info.bits_per_sample - 1))
+
+    if info.channels > 1:
+        samples = samples.mean(axis=1, dtype=np.float32)
+    else:
+        samples = samples[:, 0]
+    return samples * np.float32(scale)
+
+def _sample_dtype(info):
+    """Typ próbek w pliku (dla 24 bit - bajty, składane w _to_mono)."""
+    if info.format_tag == WAVE_FORMAT_PCM and info.bits_per_sample == 24:
+        return np.dtype(np.uint8)
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return np.dtype('<f4') if info.bits_per_sample == 32 else np.dtype('<f8')
+    return {8: np.dtype('u1'), 16: np.dtype('<i2'), 32: np.dtype('<i4')}[info.bits_per_sample]
+
+def _frame_shape(info):
+    """Kształt jednej ramki w tablicy próbek."""
+    if info.format_tag == WAVE_FORMAT_PCM and info.bits_per_sample == 24:
+        return (info.channels, 3)
+    return (info.channels,)
+
+def design_resampling_filter(up, down, zero_crossings=FILTER_ZERO_CROSSINGS,
+                             rolloff=FILTER_ROLLOFF, beta=FILTER_KAISER_BETA):
+    """
+    Projektuje filtr dolnoprzepustowy (sinc z oknem Kaisera) dla zmiany częstotliwości up/down
+    i zwraca go w postaci polifazowej: tablica (up, taps), gdzie wiersz to jedna faza.
+    """
+    factor = max(up, down)
+    half = zero_crossings * factor
+    n = np.arange(-half, half + 1, dtype=np.float64)
+    cutoff = rolloff / factor
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half + 1, beta)
+    h *= up / h.sum()
+
+    taps = -(-len(h) // up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[:len(h)] = h
+    # h_poly[phase, k] = h[phase + k * up]
+    return padded.reshape(taps, up).T.astype(np.float32), half
+
+class _PolyphasePlan:
+    """
+    Filtry polifazowe dla zmiany częstotliwości up/down.
+    Wyjście n = p + q*up korzysta z próbek x[c_p + q*down - k], k = 0..taps-1,
+    z fazą filtra (p*down + half) % up niezależną od q - każda faza to jeden iloczyn macierz-wektor.
+    """
+
+    def __init__(self, up, down):
+        h_poly, half = design_resampling_filter(up, down)
+        phases = np.arange(up)
+        self.up = up
+        self.down = down
+        self.taps = h_poly.shape[1]
+        self.centers = (phases * down + half) // up
+        self.filters = h_poly[(phases * down + half) % up][:, ::-1].copy()
+        self.min_center = int(self.centers.min())
+        self.max_center = int(self.centers.max())
+
+    def input_range(self, q0, q1):
+        """Zakres próbek wejściowych [lo, hi) potrzebny dla wierszy wyjścia [q0, q1)."""
+        return q0 * self.down + self.min_center - (self.taps - 1), (q1 - 1) * self.down + self.max_center + 1
+
+    def complete_outputs(self, n_available):
+        """Liczba próbek wyjściowych, które zależą wyłącznie od pierwszych n_available próbek wejścia."""
+        rows = (n_available - 1 - self.max_center) // self.down + 1
+        return max(0, rows) * self.up
+
+def resample_poly(read, n_in, up, down, block_output_samples=BLOCK_OUTPUT_SAMPLES, out_start=0, out_stop=None,
+                  plan=None):
+    """
+    Zmienia częstotliwość próbkowania sygnału o współczynnik up/down.
+
+    Args:
+        read: Funkcja read(start, stop) zwracająca próbki mono float32 (z zerami poza sygnałem)
+        n_in: Liczba próbek wejściowych
+        up, down: Współczynniki zmiany częstotliwości (po skróceniu)
+        out_start, out_stop: Zakres zwracanych próbek wyjściowych (domyślnie całość)
+        plan: Gotowy _PolyphasePlan (unika ponownego projektowania filtra przy kolejnych wywołaniach)
+
+    Returns:
+        Tablica float32 z próbkami [out_start, out_stop) sygnału o długości ceil(n_in * up / down)
+    """
+    n_out = -(-n_in * up // down)
+    out_stop = n_out if out_stop is None else min(out_stop, n_out)
+    out = np.empty(max(0, out_stop - out_start), dtype=np.float32)
+    for first, block in _resample_blocks(read, up, down, block_output_samples, out_start, out_stop, plan):
+        out[first - out_start:first - out_start + len(block)] = block
+    return out
+
+def _resample_blocks(read, up, down, block_output_samples, out_start, out_stop, plan=None):
+    """Generator kolejnych bloków wyjścia resample_poly: pary (indeks pierwszej próbki, próbki)."""
+    plan = plan or _PolyphasePlan(up, down)
+    taps = plan.taps
+    centers = plan.centers
+    filters = plan.filters
+    min_center = plan.min_center
+
+    rows_per_block = max(1, block_output_samples // up)
+    total_rows = -(-out_stop // up)
+    stride = np.dtype(np.float32).itemsize
+    for q0 in range(out_start // up, total_rows, rows_per_block):
+        q1 = min(q0 + rows_per_block, total_rows)
+        rows = q1 - q0
+        lo, hi = plan.input_range(q0, q1)
+        x = np.ascontiguousarray(read(lo, hi), dtype=np.float32)
+
+        block = np.empty((rows, up), dtype=np.float32)
+        for p in range(up):
+            start = int(centers[p]) - min_center
+            view = np.lib.stride_tricks.as_strided(
+                x[start:], shape=(rows, taps), strides=(down * stride, stride), writeable=False
+            )
+            block[:, p] = view @ filters[p]
+
+        first = max(q0 * up, out_start)
+        last = min(q1 * up, out_stop)
+        yield first, block.reshape(-1)[first - q0 * up:last - q0 * up]
+
+def decode_ffmpeg(path, target_rate=TARGET_SAMPLE_RATE):
+    """
+    Dekoduje dowolny format obsługiwany przez ffmpeg (tak samo jak whisper.load_audio).
+
+    Returns:
+        Tablica numpy float32 (mono, target_rate)
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(target_rate), "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Nie udało się zdekodować audio przez ffmpeg: {e.stderr.decode(errors='replace')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def decode_wav(path, target_rate=TARGET_SAMPLE_RATE):
+    """
+    Dekoduje plik WAV do mono float32 w zadanej częstotliwości próbkowania.
+
+    Returns:
+        Tablica numpy float32 gotowa do przekazania do model.transcribe
+    """
+    info = read_wav_info(path)
+    if info.is_canonical(target_rate):
+        return _read_canonical(info)
+    reader = _FrameReader(info)
+    try:
+        divisor = gcd(info.sample_rate, target_rate)
+        up = target_rate // divisor
+        down = info.sample_rate // divisor
+        if up == down:
+            return reader.read(0, reader.frames)
+        return resample_poly(reader.read, reader.frames, up, down)
+    finally:
+        reader.close()
+
+def _read_canonical(info):
+    """Zamienia próbki 16 kHz mono int16 na float32 jedną operacją na mapowanym pliku (jedna alokacja)."""
+    out = np.empty(info.frames, dtype=np.float32)
+    if info.frames == 0:
+        return out
+    data = np.memmap(info.path, dtype='<i2', mode='r', offset=info.data_offset, shape=(info.frames,))
+    try:
+        np.multiply(data, np.float32(1.0 / 32768), out=out, dtype=np.float32)
+    finally:
+        mmap_obj = getattr(data, '_mmap', None)
+        if mmap_obj is not None:
+            mmap_obj.close()
+    return out
+
+class GrowingWavReader:
+    """
+    Przyrostowe dekodowanie pliku WAV, który jest wciąż zapisywany (np. przez WaveFileWriter).
+    Każde wywołanie poll zwraca kolejne próbki 16 kHz mono, które nie zmienią się po dopisaniu
+    dalszych danych; wynik sklejony z kolejnych wywołań jest taki sam jak decode_wav całego pliku.
+    Plik jest czytany zwykłymi odczytami (bez mapowania), aby nie blokować zapisu w Windows.
+    """
+
+    def __init__(self, path, target_rate=TARGET_SAMPLE_RATE):
+        self.path = path
+        self.target_rate = target_rate
+        self.emitted = 0
+        self._plan = None
+        self._up = self._down = None
+
+    def _read_frames(self, info, start, stop):
+        """Zwraca ramki [start, stop) jako mono float32, z zerami poza dostępnymi danymi."""
+        reader = _FileFrameReader(info)
+        try:
+            return reader.read(start, stop)
+        finally:
+            reader.close()
+
+    def poll(self, final=False):
+        """
+        Zwraca nowe próbki od poprzedniego wywołania.
+
+        Args:
+            final: Czy zapis pliku się zakończył (zwracana jest wtedy cała reszta sygnału)
+
+        Returns:
+            Tablica float32 (może być pusta, np. gdy nagłówek nie jest jeszcze zapisany)
+        """
+        try:
+            info = read_wav_info(self.path)
+        except (WavFormatError, struct.error):
+            if final:
+                raise
+            return np.zeros(0, dtype=np.float32)
+
+        if self._up is None:
+            divisor = gcd(info.sample_rate, self.target_rate)
+            self._up = self.target_rate // divisor
+            self._down = info.sample_rate // divisor
+            if self._up != self._down:
+                self._plan = _PolyphasePlan(self._up, self._down)
+
+        n_in = info.frames
+        if self._plan is None:
+            # Bez zmiany częstotliwości każda zapisana ramka jest od razu ostateczna
+            target = n_in
+            new = self._read_frames(info, self.emitted, target) if target > self.emitted else None
+        else:
+            target = -(-n_in * self._up // self._down) if final else self._plan.complete_outputs(n_in)
+            new = None
+            if target > self.emitted:
+                lo, hi = self._plan.input_range(self.emitted // self._up, -(-target // self._up))
+                x = self._read_frames(info, lo, hi)
+                new = resample_poly(lambda start, stop: x[start - lo:stop - lo], n_in, self._up, self._down,
+                                    out_start=self.emitted, out_stop=target, plan=self._plan)
+        if new is None:
+            return np.zeros(0, dtype=np.float32)
+        self.emitted = target
+        return new
+
+class DiskAudio:
+    """
+    Nagranie 16 kHz mono float32 przechowywane w pliku (wynik decode_to_file).
+    Zachowuje się jak tablica w zakresie potrzebnym transkrypcji w oknach: len(audio)
+    i audio[start:stop] (fragment jest czytany z dysku), więc w pamięci jest tylko bieżące okno.
+    """
+
+    def __init__(self, path, delete=True):
+        self.path = path
+        self.delete = delete
+        self._file = open(path, 'rb')
+        self._length = os.path.getsize(path) // 4
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("DiskAudio obsługuje tylko wycinki audio[start:stop]")
+        start, stop, _ = key.indices(self._length)
+        if stop <= start:
+            return np.zeros(0, dtype=np.float32)
+        self._file.seek(start * 4)
+        return np.fromfile(self._file, dtype='<f4', count=stop - start).astype(np.float32, copy=False)
+
+    def __array__(self, dtype=None, copy=None):
+        # Pełne wczytanie - tylko dla kodu, który potrzebuje całego nagrania naraz
+        return np.asarray(self[:], dtype=dtype)
+
+    def close(self):
+        """Zamyka plik i (domyślnie) go usuwa."""
+        if not self._file.closed:
+            self._file.close()
+            if self.delete:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _stream_ffmpeg(path, out_file, target_rate):
+    """Przepisuje wyjście ffmpeg (s16le) do pliku float32 przez bufory wielokrotnego użytku."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(target_rate), "-"
+    ]
+    raw = bytearray(STREAM_CHUNK_BYTES)
+    view = memoryview(raw)
+    samples = np.empty(STREAM_CHUNK_BYTES // 2, dtype=np.float32)
+    carry = 0
+    # Komunikaty ffmpeg trafiają do pliku tymczasowego: potok stderr czytany dopiero po wyjściu mógłby
+    # się zapełnić (ostrzeżenia dla uszkodzonego nagrania) i zablokować ffmpeg oraz odczyt stdout
+    with tempfile.TemporaryFile() as log, \
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=log) as process:
+        while True:
+            n = process.stdout.readinto(view[carry:])
+            if not n:
+                break
+            n += carry
+            count = n // 2
+            block = samples[:count]
+            np.multiply(np.frombuffer(raw, dtype='<i2', count=count), np.float32(1.0 / 32768.0), out=block)
+            block.tofile(out_file)
+            # Nieparzysty bajt (połowa próbki) przechodzi na początek kolejnego odczytu
+            carry = n - count * 2
+            if carry:
+                raw[0] = raw[n - 1]
+        if process.wait() != 0:
+            log.seek(max(0, log.seek(0, os.SEEK_END) - FFMPEG_ERROR_TAIL_BYTES))
+            stderr = log.read().decode(errors='replace')
+            raise RuntimeError(f"Nie udało się zdekodować audio przez ffmpeg: {stderr}")
+
+def decode_to_file(path, use_ffmpeg=False, target_rate=TARGET_SAMPLE_RATE, directory=None):
+    """
+    Dekoduje nagranie do pliku tymczasowego float32 (mono, target_rate) blokami stałej wielkości.
+    Pliki WAV są czytane zwykłymi odczytami i przepróbkowywane blokami, pozostałe formaty
+    (lub wszystkie, jeśli use_ffmpeg) są strumieniowane z ffmpeg.
+
+    Returns:
+        DiskAudio (plik jest usuwany przy close)
+    """
+    fd, out_path = tempfile.mkstemp(suffix='.f32', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as out_file:
+            if use_ffmpeg or not can_decode(path):
+                _stream_ffmpeg(path, out_file, target_rate)
+            else:
+                info = read_wav_info(path)
+                reader = _FileFrameReader(info)
+                try:
+                    divisor = gcd(info.sample_rate, target_rate)
+                    up = target_rate // divisor
+                    down = info.sample_rate // divisor
+                    if up == down:
+                        for start in range(0, reader.frames, BLOCK_OUTPUT_SAMPLES):
+                            reader.read(start, min(start + BLOCK_OUTPUT_SAMPLES, reader.frames)).tofile(out_file)
+                    else:
+                        n_out = -(-reader.frames * up // down)
+                        for _, block in _resample_blocks(reader.read, up, down, BLOCK_OUTPUT_SAMPLES, 0, n_out):
+                            block.tofile(out_file)
+                finally:
+                    reader.close()
+        return DiskAudio(out_path)
+    except BaseException:
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        raise
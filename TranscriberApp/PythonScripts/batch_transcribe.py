@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Wsadowa transkrypcja wielu nagrań za pomocą Whisper AI.
+Przyjmuje katalogi, wzorce glob lub pliki z listą nagrań i rozdziela pliki
+pomiędzy kilka procesów roboczych, z których każdy ładuje model tylko raz.
+Z --clip-batch krótkie nagrania (do 30 s) są transkrybowane wsadami (wspólna inferencja),
+a z --prefetch każdy proces przetwarza swoje pliki potokiem (pipeline.py).
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import cpu_tuning
+import inference_backends
+import pipeline
+import whisper_transcribe
+from whisper_transcribe import emit_event, default_output_path
+
+# Rozszerzenia plików traktowanych jako nagrania audio
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac', '.ogg', '.opus', '.webm')
+
+# Pamięć podręczna modeli w procesie roboczym (tworzona przez _init_worker)
+_worker_model_cache = None
+
+def setup_args():
+    """Konfiguracja parsera argumentów wiersza poleceń."""
+    parser = argparse.ArgumentParser(description='Wsadowa transkrypcja audio za pomocą Whisper AI')
+    parser.add_argument('inputs', type=str, nargs='+',
+                        help='Katalogi, wzorce glob lub pliki z listą nagrań (jedna ścieżka w linii)')
+    parser.add_argument('--output-dir', type=str, help='Katalog dla plików .md (domyślnie transcriptions)')
+    parser.add_argument('--summary', type=str, help='Ścieżka pliku podsumowania JSON')
+    parser.add_argument('--model', type=str, default='small', help='Model Whisper (tiny, base, small, medium, large)')
+    parser.add_argument('--language', type=str, default='pl', help='Język transkrypcji (domyślnie polski)')
+    parser.add_argument('--punctuation', action='store_true', help='Dodaj automatycznie interpunkcję')
+    parser.add_argument('--best_of', type=int, default=1, help='Parametr best_of dla Whisper')
+    parser.add_argument('--beam_size', type=int, default=1, help='Parametr beam_size dla Whisper')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Liczba procesów roboczych (domyślnie: wynik --autotune lub 1)')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='Liczba wątków obliczeniowych na proces (domyślnie: wynik --autotune lub rdzenie / procesy)')
+    parser.add_argument('--backend', type=str, default=inference_backends.DEFAULT_BACKEND,
+                        choices=list(inference_backends.BACKENDS), help='Silnik inferencji')
+    parser.add_argument('--model-dir', type=str, default=None,
+                        help='Lokalny katalog modelu CTranslate2 (dla --backend ctranslate2)')
+    parser.add_argument('--clip-batch', type=int, default=0,
+                        help='Liczba krótkich nagrań (do 30 s) transkrybowanych razem w jednym wsadzie (0 - wyłączone)')
+    parser.add_argument('--prefetch', type=int, default=0,
+                        help='Liczba nagrań dekodowanych z wyprzedzeniem w każdym procesie (0 - bez potoku)')
+    parser.add_argument('--force', action='store_true', help='Transkrybuj również pliki z aktualną transkrypcją')
+    return parser.parse_args()
+
+def collect_audio_files(inputs):
+    """
+    Zwraca posortowaną listę nagrań na podstawie katalogów, wzorców glob
+    i plików z listą nagrań (puste linie i linie zaczynające się od '#' są pomijane).
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in os.listdir(item):
+                path = os.path.join(item, name)
+                if os.path.isfile(path) and name.lower().endswith(AUDIO_EXTENSIONS):
+                    found.append(path)
+        elif any(ch in item for ch in '*?['):
+            found.extend(p for p in glob.glob(item, recursive=True)
+                         if os.path.isfile(p) and p.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(item) and item.lower().endswith(AUDIO_EXTENSIONS):
+            found.append(item)
+        elif os.path.isfile(item):
+            base_dir = os.path.dirname(os.path.abspath(item))
+            with open(item, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    path = line if os.path.isabs(line) else os.path.join(base_dir, line)
+                    if os.path.isfile(path):
+                        found.append(path)
+                    else:
+                        emit_event({"warning": f"Pominięto nieistniejące wejście: {path}"})
+        else:
+            emit_event({"warning": f"Pominięto nieistniejące wejście: {item}"})
+
+    # Usunięcie duplikatów z zachowaniem kolejności
+    unique = []
+    seen = set()
+    for path in found:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def output_paths(audio_files, output_dir=None):
+    """
+    Zwraca słownik nagranie -> plik .md. Nagrania o tej samej nazwie z różnych katalogów
+    (np. z rekurencyjnego wzorca glob) dostają pliki w podkatalogach odpowiadających ich położeniu
+    względem wspólnego katalogu, a nagrania z jednego katalogu różniące się rozszerzeniem -
+    nazwy z rozszerzeniem; inaczej transkrypcje nadpisywałyby się nawzajem.
+    """
+    defaults = {path: default_output_path(path, output_dir) for path in audio_files}
+    groups = {}
+    for path, output_path in defaults.items():
+        groups.setdefault(os.path.normcase(os.path.abspath(output_path)), []).append(path)
+
+    paths = {}
+    for group in groups.values():
+        if len(group) == 1:
+            paths[group[0]] = defaults[group[0]]
+            continue
+        directories = [os.path.dirname(os.path.abspath(path)) for path in group]
+        try:
+            root = os.path.commonpath(directories)
+        except ValueError:
+            # Różne dyski (Windows) - pełna ścieżka katalogu bez litery dysku
+            root = None
+        for path, directory in zip(group, directories):
+            relative = (os.path.relpath(directory, root) if root is not None
+                        else os.path.splitdrive(directory)[1].lstrip("\\/"))
+            paths[path] = os.path.join(os.path.dirname(defaults[path]), relative, os.path.basename(defaults[path]))
+        if len(set(directories)) < len(group):
+            for path in group:
+                paths[path] = os.path.join(os.path.dirname(paths[path]), os.path.basename(path) + ".md")
+    for output_path in paths.values():
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    return paths
+
+def _file_size(path):
+    """Rozmiar pliku (0, jeśli plik zniknął - błąd zgłosi wtedy transkrypcja tego pliku)."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def is_up_to_date(audio_path, output_path):
+    """Sprawdza, czy transkrypcja istnieje i jest nowsza niż nagranie."""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+def _init_worker(threads_per_worker, model_cache_mb, backend):
+    """Inicjalizuje proces roboczy: limit wątków i własna pamięć podręczna modeli."""
+    global _worker_model_cache
+    if threads_per_worker and inference_backends.uses_torch(backend):
+        whisper_transcribe.require_backend()
+        cpu_tuning.apply_threads(threads_per_worker, backend)
+    _worker_model_cache = whisper_transcribe.ModelCache(model_cache_mb)
+
+def _transcribe_file(audio_path, output_path, options):
+    """Transkrybuje jeden plik w procesie roboczym i zwraca wpis do podsumowania."""
+    events = {}
+
+    def collect(event):
+        if event.get("status") in ("completed", "error"):
+            events[event["status"]] = event
+
+    whisper_transcribe._event_context["job_id"] = audio_path
+    whisper_transcribe._event_listeners.append(collect)
+    try:
+        whisper_transcribe.transcribe_audio(
+            audio_path, output_path, options["model"], options["language"], options["punctuation"],
+            options["best_of"], options["beam_size"], model_cache=_worker_model_cache,
+            backend=options["backend"], model_dir=options["model_dir"],
+            cpu_threads=options["threads"]
+        )
+    finally:
+        whisper_transcribe._event_listeners.remove(collect)
+        whisper_transcribe._event_context.pop("job_id", None)
+
+    entry = {"audio_path": audio_path, "output_path": output_path}
+    if "completed" in events:
+        completed = events["completed"]
+        entry.update({
+            "status": "completed",
+            "total_time": completed["total_time"],
+            "audio_duration": completed["audio_duration"],
+            "speed_ratio": completed["speed_ratio"]
+        })
+    else:
+        entry.update({"status": "error", "error": events.get("error", {}).get("error", "Nieznany błąd")})
+    return entry
+
+def _transcribe_clips(clips, options):
+    """Transkrybuje wsad krótkich nagrań w procesie roboczym i zwraca wpisy do podsumowania."""
+    return whisper_transcribe.transcribe_clips(
+        clips, options["model"], options["language"], options["punctuation"], options["best_of"],
+        options["beam_size"], model_cache=_worker_model_cache, batch_size=len(clips),
+        backend=options["backend"], model_dir=options["model_dir"], cpu_threads=options["threads"]
+    )
+
+def _transcribe_files(files, prefetch, options):
+    """Transkrybuje pliki procesu roboczego potokiem (pipeline.run) i zwraca wpisy do podsumowania."""
+    jobs = [{
+        "audio_path": audio_path,
+        "output": output_path,
+        "model": options["model"],
+        "language": options["language"],
+        "punctuation": options["punctuation"],
+        "best_of": options["best_of"],
+        "beam_size": options["beam_size"],
+        "backend": options["backend"],
+        "model_dir": options["model_dir"],
+        "cpu_threads": options["threads"]
+    } for audio_path, output_path in files]
+    entries, _ = pipeline.run(jobs, _worker_model_cache, options["backend"], prefetch)
+    return entries
+
+def run_batch(audio_files, output_dir=None, model_size='small', language='pl', add_punctuation=False,
+              best_of=1, beam_size=1, workers=None, threads_per_worker=None, force=False,
+              backend=inference_backends.DEFAULT_BACKEND, model_dir=None, clip_batch=0, prefetch=0):
+    """
+    Transkrybuje listę nagrań w puli procesów roboczych. Z clip_batch > 1 nagrania nie dłuższe
+    niż inference_backends.BATCH_CLIP_SECONDS są łączone we wsady po clip_batch plików.
+    Z prefetch > 0 pozostałe pliki są dzielone między procesy, a każdy przetwarza swoją część
+    potokiem (dekodowanie kolejnych prefetch nagrań i zapis wyników w tle podczas inferencji).
+
+    Returns:
+        Słownik podsumowania z wpisem dla każdego pliku
+    """
+    # Konfiguracja o największej przepustowości zmierzona przez --autotune (jeśli jej nie nadpisano)
+    tuned = cpu_tuning.saved_config(model_size, backend, "throughput")
+    if workers is None:
+        workers = tuned["jobs"] if tuned else 1
+    workers = max(1, workers)
+    if threads_per_worker is None:
+        if tuned and tuned["jobs"] == workers:
+            threads_per_worker = tuned["threads"]
+        else:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    # Procesy potomne dziedziczą limity wątków bibliotek numerycznych
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads_per_worker)
+
+    options = {
+        "model": model_size,
+        "language": language,
+        "punctuation": add_punctuation,
+        "best_of": best_of,
+        "beam_size": beam_size,
+        "backend": backend,
+        "model_dir": model_dir,
+        "threads": threads_per_worker
+    }
+
+    entries = []
+    pending = []
+    targets = output_paths(audio_files, output_dir)
+    for audio_path in audio_files:
+        output_path = targets[audio_path]
+        if not force and is_up_to_date(audio_path, output_path):
+            entries.append({"audio_path": audio_path, "output_path": output_path, "status": "skipped"})
+            emit_event({"info": f"Pominięto (transkrypcja aktualna): {audio_path}"})
+        else:
+            pending.append((audio_path, output_path))
+
+    # Najdłuższe pliki najpierw, żeby wyrównać obciążenie procesów
+    pending.sort(key=lambda item: _file_size(item[0]), reverse=True)
+
+    # Zadania dla procesów roboczych: pojedyncze pliki lub wsady krótkich nagrań
+    tasks = []
+    clips = []
+    singles = []
+    for audio_path, output_path in pending:
+        duration = whisper_transcribe.get_audio_duration(audio_path) if clip_batch > 1 else None
+        if duration is not None and duration <= inference_backends.BATCH_CLIP_SECONDS:
+            clips.append((audio_path, output_path))
+        else:
+            singles.append((audio_path, output_path))
+    if prefetch > 0:
+        # Pliki posortowane od najdłuższych są rozdzielane naprzemiennie, żeby wyrównać obciążenie
+        for i in range(min(workers, len(singles))):
+            files = singles[i::workers]
+            tasks.append((_transcribe_files, (files, prefetch), [audio_path for audio_path, _ in files]))
+    else:
+        tasks.extend((_transcribe_file, (audio_path, output_path), [audio_path]) for audio_path, output_path in singles)
+    for i in range(0, len(clips), max(1, clip_batch)):
+        group = clips[i:i + clip_batch]
+        tasks.append((_transcribe_clips, (group,), [audio_path for audio_path, _ in group]))
+
+    # Każdy proces trzyma dokładnie jeden model
+    model_cache_mb = whisper_transcribe.model_memory_mb(model_size, backend)
+
+    start_time = time.time()
+    if pending:
+        emit_event({"info": f"Transkrypcja {len(pending)} plików w {workers} procesach "
+                            f"({threads_per_worker} wątków na proces)"})
+        if clips:
+            emit_event({"info": f"Krótkie nagrania we wsadach po {clip_batch}: {len(clips)}"})
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(threads_per_worker, model_cache_mb, backend)) as executor:
+            futures = {
+                executor.submit(function, *args, options): audio_paths
+                for function, args, audio_paths in tasks
+            }
+            done = 0
+            for future in as_completed(futures):
+                audio_paths = futures[future]
+                try:
+                    # Wsad zwraca listę wpisów, pojedynczy plik - jeden wpis
+                    result = future.result()
+                    task_entries = result if isinstance(result, list) else [result]
+                except Exception as e:
+                    task_entries = [{"audio_path": path, "status": "error", "error": str(e)} for path in audio_paths]
+                for entry in task_entries:
+                    done += 1
+                    entries.append(entry)
+                    emit_event({
+                        "status": "batch_progress",
+                        "files_done": done,
+                        "files_total": len(pending),
+                        "file": entry
+                    })
+    wall_time = time.time() - start_time
+
+    completed = [e for e in entries if e["status"] == "completed"]
+    audio_total = sum(e["audio_duration"] for e in completed)
+    return {
+        "model": model_size,
+        "backend": backend,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+        "clip_batch": clip_batch,
+        "prefetch": prefetch,
+        "wall_time": wall_time,
+        "files_completed": len(completed),
+        "files_skipped": sum(1 for e in entries if e["status"] == "skipped"),
+        "files_failed": sum(1 for e in entries if e["status"] == "error"),
+        "audio_duration": audio_total,
+        "speed_ratio": audio_total / wall_time if wall_time > 0 else 0,
+        "clips_per_second": len(completed) / wall_time if wall_time > 0 else 0,
+        "files": entries
+    }
+
+def main():
+    """Główna funkcja skryptu."""
+    args = setup_args()
+    missing_deps = whisper_transcribe.check_dependencies(args.backend)
+    if missing_deps:
+        emit_event({
+            "error": f"Brakujące biblioteki Python: {', '.join(missing_deps)}\n"
+                     "Zainstaluj je używając polecenia:\n"
+                     f"{inference_backends.INSTALL_COMMANDS[args.backend]}",
+            "status": "error",
+            "missing_deps": missing_deps
+        })
+        return 1
+
+    try:
+        audio_files = collect_audio_files(args.inputs)
+        if not audio_files:
+            emit_event({"error": "Nie znaleziono plików audio", "status": "error"})
+            return 1
+
+        summary = run_batch(
+            audio_files, args.output_dir, args.model, args.language, args.punctuation,
+            args.best_of, args.beam_size, args.workers, args.threads_per_worker, args.force,
+            args.backend, args.model_dir, args.clip_batch, args.prefetch
+        )
+
+        summary_path = args.summary
+        if summary_path is None:
+            summary_dir = os.path.dirname(default_output_path(audio_files[0], args.output_dir))
+            summary_path = os.path.join(summary_dir, "batch_summary.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        emit_event({
+            "progress": 100,
+            "status": "completed",
+            "summary_path": summary_path,
+            "files_completed": summary["files_completed"],
+            "files_skipped": summary["files_skipped"],
+            "files_failed": summary["files_failed"],
+            "total_time": summary["wall_time"],
+            "audio_duration": summary["audio_duration"],
+            "speed_ratio": summary["speed_ratio"],
+            "clips_per_second": summary["clips_per_second"]
+        })
+        return 0 if summary["files_failed"] == 0 else 1
+    except Exception as e:
+        emit_event({"error": str(e), "status": "error"})
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kaskada dwóch modeli (--cascade): szybki model wstępny transkrybuje całe nagranie, a większy
+model dekoduje ponownie tylko fragmenty, których model wstępny był niepewny (niski avg_logprob,
+wysoki compression_ratio lub graniczne no_speech_prob). Segmenty obu przebiegów są scalane
+w jedną listę w kolejności czasu.
+"""
+
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+# Próbki na sekundę audio podawanego do modeli
+SAMPLE_RATE = 16000
+
+# Segment jest niepewny, gdy średnie logprawdopodobieństwo tokenów jest niższe niż próg
+DEFAULT_LOGPROB_THRESHOLD = -0.7
+
+# ... lub gdy tekst jest podejrzanie powtarzalny (współczynnik kompresji gzip wyższy niż próg)
+DEFAULT_COMPRESSION_THRESHOLD = 2.0
+
+# ... lub gdy prawdopodobieństwo braku mowy jest graniczne (ani wyraźna mowa, ani cisza)
+DEFAULT_NO_SPEECH_RANGE = (0.3, 0.8)
+
+# Niepewne segmenty oddalone o mniej niż tyle sekund są dekodowane ponownie jako jeden fragment
+MERGE_GAP_SECONDS = 1.0
+
+# Najkrótszy fragment dekodowany ponownie (krótsze są rozszerzane symetrycznie, sekundy)
+MIN_REGION_SECONDS = 1.0
+
+def thresholds(logprob=None, compression_ratio=None, no_speech_range=None):
+    """Zwraca progi niepewności (wartości None zastępowane domyślnymi)."""
+    return {
+        "logprob": DEFAULT_LOGPROB_THRESHOLD if logprob is None else logprob,
+        "compression_ratio": DEFAULT_COMPRESSION_THRESHOLD if compression_ratio is None else compression_ratio,
+        "no_speech_range": list(DEFAULT_NO_SPEECH_RANGE if no_speech_range is None else no_speech_range)
+    }
+
+def is_uncertain(segment, limits):
+    """Czy model wstępny był niepewny wyniku segmentu."""
+    low, high = limits["no_speech_range"]
+    return (segment.get("avg_logprob", 0.0) < limits["logprob"]
+            or segment.get("compression_ratio", 0.0) > limits["compression_ratio"]
+            or low <= segment.get("no_speech_prob", 0.0) <= high)
+
+def uncertain_regions(segments, duration, limits):
+    """
+    Wyznacza fragmenty do ponownego dekodowania: zakresy niepewnych segmentów,
+    scalone, gdy dzieli je mniej niż MERGE_GAP_SECONDS.
+
+    Returns:
+        Lista par (początek, koniec) w sekundach, posortowana i bez nakładania się
+    """
+    regions = []
+    for segment in sorted(segments, key=lambda s: s["start"]):
+        if not is_uncertain(segment, limits):
+            continue
+        start, end = segment["start"], max(segment["start"], segment["end"])
+        if end - start < MIN_REGION_SECONDS:
+            middle = (start + end) / 2
+            start, end = middle - MIN_REGION_SECONDS / 2, middle + MIN_REGION_SECONDS / 2
+        start, end = max(0.0, start), min(duration, end)
+        if regions and start - regions[-1][1] < MERGE_GAP_SECONDS:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return [(start, end) for start, end in regions if end > start]
+
+def merge_segments(draft_segments, redecoded):
+    """
+    Zastępuje segmenty modelu wstępnego, których środek leży we fragmencie dekodowanym ponownie,
+    segmentami większego modelu (przesuniętymi o początek fragmentu).
+
+    Args:
+        draft_segments: Segmenty modelu wstępnego
+        redecoded: Lista par ((początek, koniec), wynik większego modelu dla fragmentu)
+
+    Returns:
+        Scalona lista segmentów z nową numeracją
+    """
+    def inside(segment):
+        middle = (segment["start"] + segment["end"]) / 2
+        return any(start <= middle <= end for (start, end), _ in redecoded)
+
+    merged = [dict(segment, cascade="draft") for segment in draft_segments if not inside(segment)]
+    for (start, end), result in redecoded:
+        for segment in result.get("segments", []):
+            shifted = dict(segment, start=start + segment["start"], end=min(end, start + segment["end"]),
+                           cascade="final")
+            for word in shifted.get("words", []) or []:
+                word["start"] += start
+                word["end"] += start
+            merged.append(shifted)
+
+    merged.sort(key=lambda s: s["start"])
+    for i, segment in enumerate(merged):
+        segment["id"] = i
+    return merged
+
+def transcribe_cascade(draft_model, final_model, audio, transcribe_options, limits, on_progress=None):
+    """
+    Transkrybuje nagranie kaskadą dwóch modeli.
+
+    Args:
+        draft_model: Szybki model transkrybujący całe nagranie
+        final_model: Większy model dla niepewnych fragmentów
+        audio: Tablica float32 (16 kHz, mono)
+        transcribe_options: Opcje transkrypcji (jak dla model.transcribe)
+        limits: Progi niepewności (thresholds)
+        on_progress: Opcjonalna funkcja (ukończone fragmenty, wszystkie fragmenty) wywoływana po każdym fragmencie
+
+    Returns:
+        Krotka (wynik w formacie model.transcribe, statystyki kaskady)
+    """
+    duration = len(audio) / SAMPLE_RATE
+    start_time = time.time()
+    draft = draft_model.transcribe(audio, **transcribe_options, verbose=None)
+    draft_time = time.time() - start_time
+
+    regions = uncertain_regions(draft.get("segments", []), duration, limits)
+    # Większy model dostaje język ustalony przez model wstępny, żeby fragmenty nie różniły się językiem
+    final_options = dict(transcribe_options)
+    if final_options.get("language") is None and draft.get("language"):
+        final_options["language"] = draft["language"]
+
+    redecoded = []
+    redecode_start = time.time()
+    for i, (start, end) in enumerate(regions):
+        fragment = np.asarray(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], dtype=np.float32)
+        redecoded.append(((start, end), final_model.transcribe(fragment, **final_options, verbose=None)))
+        if on_progress is not None:
+            on_progress(i + 1, len(regions))
+    redecode_time = time.time() - redecode_start
+
+    segments = merge_segments(draft.get("segments", []), redecoded)
+    redecoded_seconds = sum(end - start for start, end in regions)
+    stats = {
+        "regions": len(regions),
+        "draft_segments": len(draft.get("segments", [])),
+        "redecoded_seconds": redecoded_seconds,
+        "redecoded_ratio": redecoded_seconds / duration if duration > 0 else 0,
+        "draft_time": draft_time,
+        "redecode_time": redecode_time,
+        "thresholds": limits
+    }
+    result = {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": draft.get("language")
+    }
+    return result, stats
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Punkty kontrolne transkrypcji w oknach (--stream), pozwalające wznowić przerwaną pracę.
+Plik <wyjście>.checkpoint.json zawiera gotowe segmenty, pozycję w nagraniu (próbkę, od której
+zaczyna się następne okno) i kontekst dekodowania (wykryty język; podpowiedź dla następnego okna
+powstaje z ostatnich segmentów). Punkt kontrolny jest ważny tylko dla tego samego nagrania
+(ścieżka, rozmiar, czas modyfikacji) i tych samych opcji transkrypcji.
+"""
+
+import os
+import json
+import time
+
+# Wersja formatu - zmiana unieważnia zapisane punkty kontrolne
+CHECKPOINT_VERSION = 1
+
+# Minimalny odstęp (sekundy) między kolejnymi zapisami punktu kontrolnego
+CHECKPOINT_INTERVAL_SECONDS = 60
+
+def _json_default(value):
+    """Serializacja typów numpy występujących w wynikach Whisper."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+class Checkpoint:
+    """Punkt kontrolny jednej transkrypcji zapisywany obok pliku wyjściowego."""
+
+    def __init__(self, output_path, audio_path, options, interval=None):
+        self.path = output_path + ".checkpoint.json"
+        self.interval = CHECKPOINT_INTERVAL_SECONDS if interval is None else interval
+        stat = os.stat(audio_path)
+        self.fingerprint = {
+            "version": CHECKPOINT_VERSION,
+            "audio_path": os.path.abspath(audio_path),
+            "audio_size": stat.st_size,
+            "audio_mtime": stat.st_mtime,
+            "options": options
+        }
+        self._last_save = time.time()
+
+    def load(self):
+        """
+        Zwraca zapisany stan (seek, segments, language) lub None, jeśli punktu kontrolnego
+        brak albo dotyczy innego nagrania lub innych opcji.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("fingerprint") != json.loads(json.dumps(self.fingerprint)):
+            return None
+        return entry.get("state")
+
+    def save(self, seek, segments, language, force=False):
+        """Zapisuje stan, jeśli od poprzedniego zapisu minęło co najmniej interval sekund (lub force)."""
+        if not force and time.time() - self._last_save < self.interval:
+            return False
+        entry = {
+            "fingerprint": self.fingerprint,
+            "state": {"seek": seek, "segments": segments, "language": language},
+            "saved_at": time.time()
+        }
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, default=_json_default)
+        os.replace(temp_path, self.path)
+        self._last_save = time.time()
+        return True
+
+    def remove(self):
+        """Usuwa punkt kontrolny (po zapisaniu pełnej transkrypcji)."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""
+Dobór liczby wątków na zadanie i liczby równoległych zadań na CPU (--autotune).
+Krótkie transkrypcje kalibracyjne są uruchamiane dla kombinacji (procesy, wątki na proces),
+a najlepsze konfiguracje są zapisywane osobno dla komputera, silnika i modelu:
+    latency    - najkrótszy czas pojedynczej transkrypcji (zwykłe uruchomienia)
+    throughput - najwięcej sekund audio na sekundę pracy (transkrypcja wsadowa)
+"""
+
+import os
+import json
+import time
+import platform
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+import inference_backends
+from app_paths import data_dir
+
+# Długość nagrania kalibracyjnego (sekundy)
+DEFAULT_CLIP_SECONDS = 30
+
+# Model w procesie kalibracyjnym (tworzony przez _init_worker)
+_worker_model = None
+
+def _tuning_path():
+    return os.path.join(data_dir("tuning"), "cpu.json")
+
+def _key(model_size, backend):
+    return f"{platform.node()}|{backend}|{model_size}"
+
+def available_memory_mb():
+    """Dostępna pamięć RAM (MB) lub None, jeśli system jej nie podaje."""
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def memory_job_limit(model_mb, available_mb=None):
+    """
+    Największa liczba procesów, których modele (po model_mb każdy) mieszczą się w dostępnej pamięci
+    (co najmniej 1; None, jeśli dostępnej pamięci nie da się ustalić).
+    """
+    if available_mb is None:
+        available_mb = available_memory_mb()
+    if available_mb is None or model_mb <= 0:
+        return None
+    return max(1, int(available_mb // model_mb))
+
+def candidate_configs(cpu_count=None, max_jobs=None):
+    """
+    Zwraca kombinacje (procesy, wątki na proces) do sprawdzenia: liczba procesów rośnie
+    dwukrotnie (najwyżej do max_jobs, np. limitu z memory_job_limit), a wątki dzielą wszystkie
+    rdzenie (lub ich połowę) pomiędzy procesy; dla jednego procesu sprawdzana jest też jedna czwarta rdzeni.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    job_limit = cpu_count if max_jobs is None else max(1, min(cpu_count, max_jobs))
+    configs = []
+    jobs = 1
+    while jobs <= job_limit:
+        divisors = (1, 2, 4) if jobs == 1 else (1, 2)
+        for threads in (cpu_count // (d * jobs) for d in divisors):
+            if threads >= 1 and (jobs, threads) not in configs:
+                configs.append((jobs, threads))
+        jobs *= 2
+    return configs
+
+def calibration_audio(seconds, sample_rate=inference_backends.SAMPLE_RATE):
+    """Syntetyczny sygnał przypominający mowę (harmoniczne z modulacją sylabową i przerwami)."""
+    t = np.arange(int(seconds * sample_rate), dtype=np.float64) / sample_rate
+    phase = 2 * np.pi * np.cumsum(140 + 30 * np.sin(2 * np.pi * 0.3 * t)) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) * ((t % 12.0) < 8.0)
+    return (0.2 * voice * envelope).astype(np.float32)
+
+def apply_threads(threads, backend):
+    """Ustawia liczbę wątków obliczeniowych bieżącego procesu (dla silników PyTorch)."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if inference_backends.uses_torch(backend):
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            # Równoległość między operatorami nie pomaga przy dekodowaniu Whisper, a zabiera rdzenie
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Można ją ustawić tylko przed pierwszą operacją równoległą
+            pass
+
+def _init_worker(model_size, backend, model_dir, threads):
+    """Inicjalizuje proces kalibracyjny: limit wątków i załadowany model."""
+    global _worker_model
+    apply_threads(threads, backend)
+    _worker_model = inference_backends.load_model(backend, model_size, "cpu", model_dir, cpu_threads=threads)
+
+def _transcribe_clip(seconds):
+    """Transkrybuje nagranie kalibracyjne i zwraca czas pracy (sekundy)."""
+    audio = calibration_audio(seconds)
+    start = time.perf_counter()
+    _worker_model.transcribe(audio, language="pl", temperature=0.0, verbose=None)
+    return time.perf_counter() - start
+
+def measure(model_size, backend, jobs, threads, clip_seconds=DEFAULT_CLIP_SECONDS, model_dir=None):
+    """
+    Mierzy jedną konfigurację: jobs procesów po threads wątków transkrybuje jednocześnie
+    po jednym nagraniu (po rozgrzewce, bez czasu ładowania modelu).
+
+    Returns:
+        Słownik z przepustowością (sekundy audio na sekundę) i średnim czasem jednej transkrypcji
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(jobs, initializer=_init_worker, initargs=(model_size, backend, model_dir, threads)) as pool:
+        pool.map(_transcribe_clip, [min(5, clip_seconds)] * jobs, chunksize=1)
+        start = time.perf_counter()
+        latencies = pool.map(_transcribe_clip, [clip_seconds] * jobs, chunksize=1)
+        wall_time = time.perf_counter() - start
+    return {
+        "jobs": jobs,
+        "threads": threads,
+        "throughput": jobs * clip_seconds / wall_time,
+        "latency": sum(latencies) / len(latencies)
+    }
+
+def load_tuning(path=None):
+    """Wczytuje zapisane konfiguracje (pusty słownik, jeśli plik nie istnieje lub jest uszkodzony)."""
+    try:
+        with open(path or _tuning_path(), 'r', encoding='utf-8') as f:
+            tuning = json.load(f)
+        return tuning if isinstance(tuning, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def saved_config(model_size, backend, goal, path=None):
+    """
+    Zwraca zapisaną konfigurację {"jobs", "threads"} dla celu 'latency' lub 'throughput'
+    (None, jeśli dla tego komputera, silnika i modelu nie uruchomiono --autotune).
+    """
+    entry = load_tuning(path).get(_key(model_size, backend))
+    if not entry or entry.get("cpu_count") != os.cpu_count():
+        # Pomiar z innego sprzętu (np. zmieniona liczba rdzeni maszyny wirtualnej) jest nieaktualny
+        return None
+    return entry.get(goal)
+
+def autotune(model_size, backend, clip_seconds=DEFAULT_CLIP_SECONDS, model_dir=None, on_result=None, path=None,
+             max_jobs=None):
+    """
+    Mierzy wszystkie konfiguracje z candidate_configs (najwyżej max_jobs procesów) i zapisuje najlepsze.
+
+    Returns:
+        Zapisany wpis (wyniki wszystkich konfiguracji oraz najlepsze 'latency' i 'throughput')
+    """
+    results = []
+    for jobs, threads in candidate_configs(max_jobs=max_jobs):
+        result = measure(model_size, backend, jobs, threads, clip_seconds, model_dir)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    # Zwykłe uruchomienie to jedno zadanie - dla niego liczy się tylko liczba wątków
+    best_latency = min((r for r in results if r["jobs"] == 1), key=lambda r: r["latency"])
+    best_throughput = max(results, key=lambda r: r["throughput"])
+    entry = {
+        "cpu_count": os.cpu_count(),
+        "max_jobs": max_jobs,
+        "clip_seconds": clip_seconds,
+        "measured_at": time.time(),
+        "results": results,
+        "latency": {"jobs": best_latency["jobs"], "threads": best_latency["threads"]},
+        "throughput": {"jobs": best_throughput["jobs"], "threads": best_throughput["threads"]}
+    }
+
+    path = path or _tuning_path()
+    tuning = load_tuning(path)
+    tuning[_key(model_size, backend)] = entry
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(temp_path, path)
+    return entry
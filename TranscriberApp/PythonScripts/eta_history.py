@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Historia zmierzonej wydajności transkrypcji używana do szacowania czasu ukończenia.
+Dla każdej kombinacji komputera, urządzenia i modelu zapamiętywane są ostatnie pomiary
+czasu ładowania modelu i czasu transkrypcji na sekundę audio.
+"""
+
+import os
+import json
+import time
+import platform
+from contextlib import contextmanager
+
+from app_paths import data_dir
+
+# Liczba przechowywanych pomiarów dla jednej kombinacji
+HISTORY_SIZE = 50
+
+# Liczba najnowszych pomiarów używanych do szacowania
+WINDOW = 20
+
+# Odsetek skrajnych pomiarów odrzucanych z każdej strony przy liczeniu średniej
+TRIM_RATIO = 0.2
+
+# Minimalna długość nagrania (sekundy), dla której pomiar jest zapisywany
+MIN_AUDIO_SECONDS = 5.0
+
+# Najdłuższe oczekiwanie na blokadę pliku historii (sekundy)
+LOCK_TIMEOUT_SECONDS = 10.0
+
+# Blokada starsza niż tyle sekund jest uznawana za pozostałość po przerwanym procesie
+STALE_LOCK_SECONDS = 60.0
+
+def _history_path():
+    return os.path.join(data_dir("eta"), "throughput.json")
+
+def _key(model_size, device):
+    return f"{platform.node()}|{device}|{model_size}"
+
+def trimmed_mean(values, trim_ratio=TRIM_RATIO):
+    """Średnia po odrzuceniu skrajnych wartości (odporna na pojedyncze anomalie)."""
+    values = sorted(values)
+    trim = int(len(values) * trim_ratio)
+    if trim and len(values) - 2 * trim > 0:
+        values = values[trim:len(values) - trim]
+    return sum(values) / len(values)
+
+def load_history(path=None):
+    """Wczytuje historię pomiarów (pusty słownik, jeśli plik nie istnieje lub jest uszkodzony)."""
+    try:
+        with open(path or _history_path(), 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        return history if isinstance(history, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def estimate(audio_duration, model_size, device, path=None):
+    """
+    Szacuje czas przetwarzania (sekundy) na podstawie historii pomiarów.
+
+    Returns:
+        Szacowany czas lub None, jeśli brak pomiarów dla tej kombinacji
+    """
+    samples = load_history(path).get(_key(model_size, device), [])[-WINDOW:]
+    if not samples:
+        return None
+    load_time = trimmed_mean([sample["load"] for sample in samples])
+    factor = trimmed_mean([sample["factor"] for sample in samples])
+    return load_time + factor * audio_duration
+
+@contextmanager
+def _locked(path):
+    """
+    Blokada pliku historii na czas odczytu, zmiany i zapisu (plik .lock tworzony atomowo),
+    żeby równoległe procesy (transkrypcja wsadowa, tryb --parallel) nie gubiły swoich pomiarów.
+
+    Raises:
+        OSError: Blokady nie udało się uzyskać w LOCK_TIMEOUT_SECONDS
+    """
+    lock_path = f"{path}.lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise OSError(f"Plik historii jest zablokowany: {lock_path}")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def record(model_size, device, audio_duration, model_load_time, total_time, path=None):
+    """
+    Zapisuje pomiar zakończonej transkrypcji.
+
+    Args:
+        model_load_time: Czas samego ładowania modelu (etap model_load, bez dekodowania i importu bibliotek)
+        total_time: Całkowity czas transkrypcji
+    """
+    if audio_duration < MIN_AUDIO_SECONDS or total_time <= 0:
+        return
+    path = path or _history_path()
+    with _locked(path):
+        history = load_history(path)
+        samples = history.setdefault(_key(model_size, device), [])
+        samples.append({
+            "load": max(0.0, model_load_time),
+            "factor": max(0.0, total_time - model_load_time) / audio_duration
+        })
+        del samples[:-HISTORY_SIZE]
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        os.replace(temp_path, path)
+
+def refine_remaining(estimated_total, elapsed, fraction_done):
+    """
+    Łączy wstępne oszacowanie z wydajnością obserwowaną w trakcie pracy.
+    Im większa część pracy jest wykonana, tym większą wagę ma obserwacja.
+
+    Returns:
+        Pozostały czas (sekundy)
+    """
+    if fraction_done <= 0:
+        return max(0, estimated_total - elapsed)
+    fraction_done = min(1.0, fraction_done)
+    observed_total = elapsed / fraction_done
+    blended_total = (1 - fraction_done) * estimated_total + fraction_done * observed_total
+    return max(0, blended_total - elapsed)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pamięć podręczna cech wejściowych modelu (spektrogramów log-mel) adresowana treścią nagrania.
+Klucz to skrót SHA-256 zawartości pliku audio oraz konfiguracji cech (inference_backends.feature_config),
+więc kolejne transkrypcje tego samego nagrania z innymi opcjami dekodowania (beam_size, best_of,
+język) pomijają zarówno dekodowanie audio, jak i liczenie spektrogramu. Wpisy są plikami .npy
+odczytywanymi przez mapowanie pamięci (bez wczytywania całego spektrogramu do RAM).
+"""
+
+import os
+import json
+import hashlib
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+from app_paths import data_dir
+
+# Domyślny limit rozmiaru pamięci podręcznej (MB); godzina nagrania to ok. 110 MB spektrogramu
+DEFAULT_MAX_MB = 2048
+
+# Wersja formatu wpisów - zmiana unieważnia wszystkie zapisane cechy
+CACHE_VERSION = 1
+
+# Liczniki trafień i chybień w bieżącym procesie (np. kolejne zadania w trybie --serve)
+_counters = {"hits": 0, "misses": 0}
+
+class FeatureCache:
+    """Katalog z cechami nagrań (.npy) i usuwaniem najdawniej używanych wpisów (LRU)."""
+
+    def __init__(self, directory=None, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory or data_dir("features")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def make_key(self, audio_digest, config):
+        """Buduje klucz z treści nagrania i konfiguracji cech."""
+        payload = json.dumps({"audio": audio_digest, "config": config, "version": CACHE_VERSION},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        """
+        Zwraca zapisane cechy (tablica mapowana z pliku) lub None. Trafienie odświeża czas użycia wpisu.
+        Mapowanie w trybie kopiowania przy zapisie: tablica jest zapisywalna, a plik pozostaje niezmieniony.
+        """
+        path = self._path(key)
+        try:
+            features = np.load(path, mmap_mode='c', allow_pickle=False)
+        except (OSError, ValueError):
+            _counters["misses"] += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        _counters["hits"] += 1
+        return features
+
+    def put(self, key, features):
+        """Zapisuje cechy i w razie potrzeby usuwa najdawniej używane wpisy."""
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(features, dtype=np.float32), allow_pickle=False)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep=None):
+        """Usuwa najdawniej używane wpisy (poza keep), aż rozmiar zmieści się w limicie."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                # Wpis może być właśnie mapowany przez inny proces (Windows nie pozwala go usunąć)
+                pass
+
+    def stats(self):
+        """Zwraca liczniki trafień i chybień bieżącego procesu oraz rozmiar pamięci podręcznej."""
+        return {
+            "hits": _counters["hits"],
+            "misses": _counters["misses"],
+            "size_mb": round(sum(size for _, size, _ in self._entries()) / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1)
+        }
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+
+"""
+Silniki inferencji używane do transkrypcji. Każdy silnik zwraca model z metodami
+transcribe(audio, **opcje), transcribe_batch(nagrania, **opcje) i detect_language(audio),
+a wynik transkrypcji ma ten sam kształt co wynik whisper (text, segments, language),
+więc plik Markdown wygląda tak samo. Silniki, które przyjmują gotowe cechy wejściowe
+(feature_config), mają też compute_features(audio) i transcribe(audio, features=...).
+
+    openai       - oryginalny Whisper (PyTorch, fp32 na CPU)
+    torch-int8   - Whisper z dynamiczną kwantyzacją warstw liniowych do int8 (tylko CPU)
+    ctranslate2  - faster-whisper (CTranslate2), int8 na CPU, opcjonalnie z lokalnego katalogu modelu
+    stub         - model zastępczy bez zależności (testy i praca offline)
+"""
+
+import importlib.util
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+BACKENDS = ("openai", "torch-int8", "ctranslate2", "stub")
+DEFAULT_BACKEND = "openai"
+
+# Moduły wymagane przez poszczególne silniki
+_REQUIREMENTS = {
+    "openai": ("whisper", "torch", "numpy"),
+    "torch-int8": ("whisper", "torch", "numpy"),
+    "ctranslate2": ("faster_whisper", "numpy"),
+    "stub": ("numpy",)
+}
+
+# Polecenia instalacji zależności
+INSTALL_COMMANDS = {
+    "openai": "pip install openai-whisper torch",
+    "torch-int8": "pip install openai-whisper torch",
+    "ctranslate2": "pip install faster-whisper",
+    "stub": "pip install numpy"
+}
+
+# Przybliżony rozmiar modelu w pamięci względem wag fp32
+MEMORY_RATIO = {
+    "openai": 1.0,
+    "torch-int8": 0.4,
+    "ctranslate2": 0.3,
+    "stub": 0.0
+}
+
+# Częstotliwość próbkowania wejścia Whisper
+SAMPLE_RATE = 16000
+
+# Najdłuższe nagranie przetwarzane przez transcribe_batch w jednym oknie (sekundy)
+BATCH_CLIP_SECONDS = 30
+
+# Progi jakości jak w whisper.transcribe; nagranie, którego wynik z dekodowania wsadowego
+# ich nie spełnia, jest transkrybowane ponownie pojedynczo (z podwyższaniem temperatury)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Czas odpowiadający jednemu tokenowi znacznika czasu Whisper (sekundy)
+TIMESTAMP_PRECISION = 0.02
+
+# Parametry spektrogramu log-mel Whisper (whisper.audio) - bez importu whisper
+MEL_HOP_LENGTH = 160
+MEL_N_FFT = 400
+MEL_PADDING_SAMPLES = 30 * SAMPLE_RATE
+
+# Modele z 128 pasmami mel (pozostałe mają 80)
+MEL_128_MODELS = ("large", "large-v3", "large-v3-turbo", "turbo")
+
+def missing_dependencies(backend):
+    """Zwraca listę brakujących modułów dla silnika (bez importowania ich)."""
+    return [name for name in _REQUIREMENTS[backend] if importlib.util.find_spec(name) is None]
+
+def uses_torch(backend):
+    """Czy silnik wymaga importu whisper i torch."""
+    return "torch" in _REQUIREMENTS[backend]
+
+def select_device(backend):
+    """Wybiera urządzenie dla silnika ('cuda' lub 'cpu')."""
+    if backend == "openai":
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if backend == "ctranslate2":
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    # Kwantyzacja dynamiczna PyTorch i model zastępczy działają tylko na CPU
+    return "cpu"
+
+def load_model(backend, model_size, device, model_dir=None, cpu_threads=None):
+    """
+    Ładuje model wybranego silnika.
+
+    Args:
+        backend: Nazwa silnika (jedna z BACKENDS)
+        model_size: Rozmiar modelu Whisper (tiny, base, small, medium, large)
+        device: Urządzenie ('cpu' lub 'cuda')
+        model_dir: Lokalny katalog modelu CTranslate2 (tylko dla ctranslate2)
+        cpu_threads: Liczba wątków obliczeniowych (tylko dla ctranslate2)
+    """
+    if backend == "openai":
+        import whisper
+        return WhisperModel(whisper.load_model(model_size, device=device))
+    if backend == "torch-int8":
+        import whisper
+        return WhisperModel(quantize_linear_layers(whisper.load_model(model_size, device="cpu")), fp16=False)
+    if backend == "ctranslate2":
+        return CTranslate2Model(model_dir or model_size, device, cpu_threads)
+    if backend == "stub":
+        return StubModel()
+    raise ValueError(f"Nieznany silnik inferencji: {backend}")
+
+def feature_config(backend, model_size):
+    """
+    Opisuje cechy wejściowe, które model silnika przyjmuje gotowe (klucz pamięci podręcznej cech),
+    lub zwraca None, jeśli silnik liczy je wyłącznie sam (ctranslate2).
+    """
+    if backend in ("openai", "torch-int8"):
+        return {
+            "kind": "log_mel",
+            "n_mels": 128 if model_size in MEL_128_MODELS else 80,
+            "n_fft": MEL_N_FFT,
+            "hop_length": MEL_HOP_LENGTH,
+            "padding": MEL_PADDING_SAMPLES,
+            "sample_rate": SAMPLE_RATE
+        }
+    if backend == "stub":
+        # Model zastępczy nie ma osobnych cech - jego wejściem są same próbki
+        return {"kind": "samples", "sample_rate": SAMPLE_RATE}
+    return None
+
+def feature_duration(config, features):
+    """Zwraca długość nagrania (sekundy) odpowiadającą cechom opisanym przez config."""
+    if config["kind"] == "log_mel":
+        frames = features.shape[-1] - config["padding"] // config["hop_length"]
+        return frames * config["hop_length"] / config["sample_rate"]
+    return len(features) / config["sample_rate"]
+
+def quantize_linear_layers(model):
+    """Kwantyzuje dynamicznie (int8) wszystkie warstwy liniowe modelu Whisper."""
+    import torch
+    import whisper.model
+
+    # Whisper używa własnej podklasy nn.Linear (różni się tylko rzutowaniem typu w forward),
+    # której kwantyzacja PyTorch nie rozpoznaje - zamieniamy ją na zwykłą nn.Linear
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    quantization = getattr(torch, "ao", torch).quantization
+    return quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _result(segments, language):
+    """Składa wynik w formacie model.transcribe."""
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language
+    }
+
+def _segments_from_tokens(decoded, tokenizer, duration):
+    """
+    Dzieli wynik whisper.decode jednego okna na segmenty (tak jak whisper.transcribe).
+
+    Returns:
+        Lista segmentów, pusta lista dla ciszy lub None, jeśli wynik wymaga ponownej
+        transkrypcji (niespełnione progi jakości albo tekst urwany przed końcem nagrania)
+    """
+    silent = decoded.no_speech_prob > NO_SPEECH_THRESHOLD and decoded.avg_logprob < LOGPROB_THRESHOLD
+    if silent:
+        return []
+    if decoded.compression_ratio > COMPRESSION_RATIO_THRESHOLD or decoded.avg_logprob < LOGPROB_THRESHOLD:
+        return None
+
+    tokens = list(decoded.tokens)
+    is_timestamp = [token >= tokenizer.timestamp_begin for token in tokens]
+    single_timestamp_ending = is_timestamp[-2:] == [False, True]
+    consecutive = [i for i in range(1, len(tokens)) if is_timestamp[i - 1] and is_timestamp[i]]
+
+    def segment(start, end, segment_tokens):
+        return {
+            "seek": 0,
+            "start": start,
+            "end": end,
+            "text": tokenizer.decode([token for token in segment_tokens if token < tokenizer.eot]),
+            "tokens": segment_tokens,
+            "temperature": decoded.temperature,
+            "avg_logprob": decoded.avg_logprob,
+            "compression_ratio": decoded.compression_ratio,
+            "no_speech_prob": decoded.no_speech_prob
+        }
+
+    segments = []
+    if consecutive:
+        if not single_timestamp_ending:
+            # Ostatni segment nie został domknięty - whisper.transcribe dekodowałby kolejne okno
+            return None
+        last = 0
+        for current in consecutive + [len(tokens)]:
+            sliced = tokens[last:current]
+            segments.append(segment((sliced[0] - tokenizer.timestamp_begin) * TIMESTAMP_PRECISION,
+                                    (sliced[-1] - tokenizer.timestamp_begin) * TIMESTAMP_PRECISION, sliced))
+            last = current
+    else:
+        end = duration
+        timestamps = [token for token, flag in zip(tokens, is_timestamp) if flag]
+        if timestamps and timestamps[-1] != tokenizer.timestamp_begin:
+            end = (timestamps[-1] - tokenizer.timestamp_begin) * TIMESTAMP_PRECISION
+        segments.append(segment(0.0, end, tokens))
+
+    for i, item in enumerate(segments):
+        item["id"] = i
+    return segments
+
+class WhisperModel:
+    """Model openai-whisper (również po kwantyzacji)."""
+
+    def __init__(self, model, fp16=None):
+        self.model = model
+        self.fp16 = fp16
+
+    @property
+    def device(self):
+        return self.model.device
+
+    def size_mb(self):
+        """Rozmiar wag w MB (None, jeśli nie da się go policzyć)."""
+        if self.fp16 is False:
+            # Wagi skwantyzowanych warstw nie są zwykłymi parametrami
+            return None
+        try:
+            return sum(p.numel() * p.element_size() for p in self.model.parameters()) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def compute_features(self, audio):
+        """Spektrogram log-mel całego nagrania (z dopełnieniem ciszą, jak w whisper.transcribe)."""
+        import whisper
+        from whisper.audio import N_SAMPLES
+        mel = whisper.log_mel_spectrogram(np.asarray(audio, dtype=np.float32), self.model.dims.n_mels,
+                                          padding=N_SAMPLES)
+        return mel.cpu().numpy()
+
+    def transcribe(self, audio, features=None, **options):
+        if self.fp16 is not None:
+            options.setdefault("fp16", self.fp16)
+        if features is None or features.shape[0] != self.model.dims.n_mels:
+            return self.model.transcribe(audio, **options)
+
+        import importlib
+        import torch
+        # whisper.transcribe zawsze liczy spektrogram z próbek - na czas wywołania podstawiamy
+        # gotowy (modele są używane przez jeden wątek procesu, więc podmiana jest bezpieczna)
+        module = importlib.import_module("whisper.transcribe")
+        compute_mel = module.log_mel_spectrogram
+        module.log_mel_spectrogram = lambda *args, **kwargs: torch.from_numpy(features)
+        try:
+            return self.model.transcribe(audio, **options)
+        finally:
+            module.log_mel_spectrogram = compute_mel
+
+    def transcribe_batch(self, clips, language=None, task="transcribe", best_of=None, beam_size=None, **options):
+        """
+        Transkrybuje krótkie nagrania (do BATCH_CLIP_SECONDS) razem: spektrogramy są składane
+        w jeden wsad dla kodera, a dekodowanie (zachłanne lub wiązkowe) przebiega wspólnie.
+        Nagrania, dla których wynik wymaga ponownej próby, trafiają do zwykłego transcribe.
+
+        Returns:
+            Lista wyników w formacie model.transcribe (w kolejności nagrań)
+        """
+        import torch
+        import whisper
+        from whisper.audio import N_FRAMES, N_SAMPLES
+
+        fp16 = self.fp16 if self.fp16 is not None else self.model.device.type != "cpu"
+        mels = []
+        for audio in clips:
+            # Tak jak whisper.transcribe: spektrogram z dopełnieniem ciszą, przycięty do treści i dopełniony zerami
+            mel = whisper.log_mel_spectrogram(np.asarray(audio, dtype=np.float32), self.model.dims.n_mels,
+                                              padding=N_SAMPLES)
+            mels.append(whisper.pad_or_trim(mel[:, :mel.shape[-1] - N_FRAMES], N_FRAMES))
+        decode_options = whisper.DecodingOptions(task=task, language=language, temperature=0.0,
+                                                 beam_size=beam_size, fp16=fp16)
+        decoded_batch = whisper.decode(self.model, torch.stack(mels).to(self.model.device), decode_options)
+        tokenizer = whisper.tokenizer.get_tokenizer(self.model.is_multilingual,
+                                                    num_languages=self.model.num_languages, task=task)
+
+        results = []
+        for audio, decoded in zip(clips, decoded_batch):
+            segments = _segments_from_tokens(decoded, tokenizer, len(audio) / SAMPLE_RATE)
+            if segments is None:
+                results.append(self.transcribe(audio, language=language, task=task, best_of=best_of,
+                                               beam_size=beam_size, verbose=None, **options))
+            else:
+                results.append(_result(segments, decoded.language))
+        return results
+
+    def detect_language(self, audio):
+        import whisper
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)),
+                                          self.model.dims.n_mels).to(self.model.device)
+        _, probs = self.model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+class CTranslate2Model:
+    """Model faster-whisper (CTranslate2) z obliczeniami int8."""
+
+    def __init__(self, model_path, device, cpu_threads=None):
+        from faster_whisper import WhisperModel as FasterWhisperModel
+        compute_type = "int8" if device == "cpu" else "int8_float16"
+        kwargs = {"cpu_threads": cpu_threads} if cpu_threads else {}
+        self.model = FasterWhisperModel(model_path, device=device, compute_type=compute_type, **kwargs)
+        self.device = device
+
+    def size_mb(self):
+        return None
+
+    def transcribe(self, audio, language=None, task="transcribe", best_of=None, beam_size=None,
+                   initial_prompt=None, verbose=None, **options):
+        # Domyślne wartości jak w whisper: dekodowanie zachłanne, 5 prób przy podwyższonej temperaturze
+        kwargs = {key: options[key] for key in ("temperature", "condition_on_previous_text") if key in options}
+        segments, info = self.model.transcribe(
+            np.asarray(audio, dtype=np.float32), language=language, task=task,
+            beam_size=beam_size or 1, best_of=best_of or 5, initial_prompt=initial_prompt, **kwargs
+        )
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "id": len(result_segments),
+                "seek": getattr(segment, "seek", 0),
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(getattr(segment, "tokens", []) or []),
+                "temperature": getattr(segment, "temperature", 0.0),
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob
+            })
+        return _result(result_segments, info.language)
+
+    def transcribe_batch(self, clips, **options):
+        # faster-whisper nie udostępnia wspólnego dekodowania wielu nagrań - kolejno
+        return [self.transcribe(audio, **options) for audio in clips]
+
+    def detect_language(self, audio):
+        # Język jest ustalany przed dekodowaniem, więc wystarczy nie pobierać segmentów
+        _, info = self.model.transcribe(np.asarray(audio[:30 * SAMPLE_RATE], dtype=np.float32), beam_size=1)
+        return info.language
+
+class StubModel:
+    """
+    Model zastępczy: segmenty co SEGMENT_SECONDS z tekstem zależnym od energii sygnału.
+    no_speech_prob to udział cichych części segmentu, więc segmenty łączące mowę z przerwą
+    są niepewne (jak w prawdziwym modelu) i kaskada dekoduje je ponownie.
+    """
+
+    SEGMENT_SECONDS = 5.0
+
+    # Liczba części segmentu, dla których sprawdzana jest cisza
+    SUBFRAMES = 10
+
+    # Część o energii RMS poniżej progu jest uznawana za ciszę
+    SILENCE_RMS = 0.01
+
+    def __init__(self):
+        self.device = "cpu"
+
+    def size_mb(self):
+        return 0.0
+
+    def compute_features(self, audio):
+        return np.asarray(audio, dtype=np.float32)
+
+    def transcribe(self, audio, language=None, verbose=None, features=None, **options):
+        audio = np.asarray(audio if features is None else features, dtype=np.float32)
+        duration = len(audio) / SAMPLE_RATE
+        frame = int(self.SEGMENT_SECONDS * SAMPLE_RATE)
+        n_frames = -(-len(audio) // frame)
+        padded = np.zeros(n_frames * frame, dtype=np.float32)
+        padded[:len(audio)] = audio
+        energy = np.sqrt(np.mean(padded.reshape(n_frames, frame) ** 2, axis=1)) if n_frames else []
+        # Udział cichych części w każdym segmencie (bez dopełnienia za końcem nagrania)
+        subframe = frame // self.SUBFRAMES
+        subframe_energy = np.sqrt(np.mean(padded.reshape(n_frames, self.SUBFRAMES, subframe) ** 2, axis=2))
+        in_audio = (np.arange(n_frames * self.SUBFRAMES) < -(-len(audio) // subframe)).reshape(n_frames, self.SUBFRAMES)
+        silent_share = (np.sum((subframe_energy < self.SILENCE_RMS) & in_audio, axis=1)
+                        / np.maximum(1, np.sum(in_audio, axis=1)))
+
+        segments = []
+        for i, rms in enumerate(energy):
+            start = i * self.SEGMENT_SECONDS
+            segments.append({
+                "id": i,
+                "seek": int(start * 100),
+                "start": start,
+                "end": min(duration, start + self.SEGMENT_SECONDS),
+                "text": f" Segment {i} poziom {rms:.3f}.",
+                "tokens": [],
+                "temperature": 0.0,
+                "avg_logprob": -0.2 - float(rms),
+                "compression_ratio": 1.2,
+                "no_speech_prob": float(silent_share[i])
+            })
+        return _result(segments, language or "pl")
+
+    def transcribe_batch(self, clips, **options):
+        return [self.transcribe(audio, **options) for audio in clips]
+
+    def detect_language(self, audio):
+        return "pl"
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Jednorazowa normalizacja nagrań do archiwum w formacie wejściowym Whisper: WAV 16 kHz, mono,
+PCM 16 bit (ok. 1,9 MB na minutę zamiast ok. 10 MB dla WAV 44,1 kHz stereo z AudioRecorder).
+Każde archiwum zawiera blok RIFF 'tsrc' z opisem źródła (ścieżka, rozmiar, format, SHA-256
+pliku źródłowego i SHA-256 zapisanych próbek), a katalog archiwów - manifest ingest_manifest.jsonl.
+whisper_transcribe.py wczytuje takie pliki bez przepróbkowania, jedną konwersją int16 -> float32
+wprost z mapowanego pliku (audio_decoder.decode_wav).
+
+Skrypt zgłasza zdarzenia JSON dla każdego pliku oraz podsumowanie z oszczędnością miejsca
+i czasu dekodowania (dekodowanie źródła w porównaniu z wczytaniem archiwum).
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+import audio_decoder
+import result_cache
+import whisper_transcribe
+from app_paths import data_dir
+from batch_transcribe import collect_audio_files
+from whisper_transcribe import emit_event
+
+# Wersja formatu bloku z opisem źródła
+ARCHIVE_VERSION = 1
+
+# Przyrostek nazwy archiwum (nazwa nagrania źródłowego bez rozszerzenia, skrót treści + przyrostek)
+ARCHIVE_SUFFIX = ".16k.wav"
+
+# Liczba znaków skrótu SHA-256 źródła w nazwie archiwum (nagrania o tej samej nazwie z różnych
+# katalogów lub zmienione nagranie dostają osobne archiwa)
+NAME_DIGEST_CHARS = 12
+
+# Manifest archiwów w katalogu docelowym (jeden wpis JSON w linii)
+MANIFEST_NAME = "ingest_manifest.jsonl"
+
+# Liczba próbek konwertowanych i zapisywanych naraz
+WRITE_BLOCK_SAMPLES = 1 << 20
+
+# Wartość zastępcza skrótu próbek, nadpisywana po zapisaniu danych (ta sama długość co skrót SHA-256)
+_PENDING_DIGEST = "0" * 64
+
+def archive_path(source_path, output_dir, source_sha256):
+    """Ścieżka archiwum dla nagrania źródłowego o podanej zawartości."""
+    base = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(output_dir, f"{base}.{source_sha256[:NAME_DIGEST_CHARS]}{ARCHIVE_SUFFIX}")
+
+def describe_source(source_path, source_sha256):
+    """Opis nagrania źródłowego zapisywany w archiwum."""
+    source = {
+        "version": ARCHIVE_VERSION,
+        "source_path": os.path.abspath(source_path),
+        "source_size": os.path.getsize(source_path),
+        "source_sha256": source_sha256,
+        "source_format": os.path.splitext(source_path)[1].lstrip('.').lower(),
+        "pcm_sha256": _PENDING_DIGEST,
+        "ingested_at": datetime.now().isoformat(timespec='seconds')
+    }
+    if audio_decoder.can_decode(source_path):
+        info = audio_decoder.read_wav_info(source_path)
+        source.update(source_sample_rate=info.sample_rate, source_channels=info.channels,
+                      source_bits_per_sample=info.bits_per_sample)
+    return source
+
+def to_int16(block):
+    """Zamienia próbki float32 na int16 (z zaokrągleniem i przycięciem do zakresu)."""
+    scaled = np.rint(np.asarray(block, dtype=np.float32) * np.float32(32768))
+    return np.clip(scaled, -32768, 32767).astype('<i2')
+
+def write_archive(path, audio, source):
+    """
+    Zapisuje próbki (tablica lub audio_decoder.DiskAudio, 16 kHz mono) jako WAV PCM 16 bit
+    z blokiem opisu źródła. Plik powstaje pod tymczasową nazwą i jest podmieniany po zapisaniu.
+
+    Returns:
+        Skrót SHA-256 zapisanych próbek
+    """
+    rate = audio_decoder.TARGET_SAMPLE_RATE
+    frames = len(audio)
+    payload = json.dumps(source, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    if len(payload) % 2:
+        payload += b' '
+    data_size = frames * 2
+    riff_size = 4 + (8 + 16) + (8 + len(payload)) + (8 + data_size)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE'))
+            f.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, audio_decoder.WAVE_FORMAT_PCM, 1, rate, rate * 2, 2, 16))
+            f.write(struct.pack('<4sI', audio_decoder.SOURCE_CHUNK_ID, len(payload)))
+            payload_offset = f.tell()
+            f.write(payload)
+            f.write(struct.pack('<4sI', b'data', data_size))
+            for start in range(0, frames, WRITE_BLOCK_SAMPLES):
+                block = to_int16(audio[start:min(start + WRITE_BLOCK_SAMPLES, frames)]).tobytes()
+                digest.update(block)
+                f.write(block)
+
+            # Skrót próbek jest znany dopiero po zapisie danych - nadpisujemy wartość zastępczą
+            pcm_sha256 = digest.hexdigest()
+            f.seek(payload_offset + payload.index(_PENDING_DIGEST.encode('ascii')))
+            f.write(pcm_sha256.encode('ascii'))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return pcm_sha256
+
+def ingest_file(source_path, output_dir, decoder='auto', low_memory=False, force=False):
+    """
+    Normalizuje jedno nagranie do archiwum 16 kHz mono.
+
+    Args:
+        source_path: Nagranie źródłowe
+        output_dir: Katalog archiwów
+        decoder: Sposób dekodowania źródła ('auto' - natywnie dla WAV, 'ffmpeg')
+        low_memory: Dekodowanie źródła przez plik tymczasowy (pamięć niezależna od długości nagrania)
+        force: Utwórz archiwum ponownie, nawet jeśli istnieje dla tej samej zawartości źródła
+
+    Returns:
+        Słownik z wynikiem (status "ingested" lub "skipped", rozmiary, czasy dekodowania, skróty)
+
+    Raises:
+        RuntimeError: Archiwum o tej nazwie opisuje inne nagranie źródłowe
+    """
+    source_sha256 = result_cache.file_digest(source_path)
+    target = archive_path(source_path, output_dir, source_sha256)
+    entry = {
+        "source_path": os.path.abspath(source_path),
+        "archive_path": os.path.abspath(target),
+        "source_sha256": source_sha256,
+        "source_bytes": os.path.getsize(source_path)
+    }
+
+    if audio_decoder.read_source(source_path) is not None:
+        # Plik jest już archiwum (np. katalog archiwów podany jako wejście)
+        entry.update(status="skipped", archive_bytes=entry["source_bytes"], pcm_sha256=None)
+        return entry
+
+    existing = audio_decoder.read_source(target) if os.path.isfile(target) else None
+    if not force and existing is not None and existing.get("source_sha256") == source_sha256:
+        entry.update(status="skipped", archive_bytes=os.path.getsize(target), pcm_sha256=existing.get("pcm_sha256"))
+        if existing.get("source_path") != entry["source_path"]:
+            # Ta sama zawartość w innym miejscu - archiwum wskazuje pierwsze źródło
+            entry["duplicate_of"] = existing.get("source_path")
+        return entry
+    if os.path.isfile(target) and (existing is None or existing.get("source_path") != entry["source_path"]):
+        owner = existing.get("source_path") if existing is not None else "plik spoza ingest.py"
+        raise RuntimeError(f"Archiwum {target} należy do innego nagrania ({owner}) - nie zostanie nadpisane")
+
+    source = describe_source(source_path, source_sha256)
+    start = time.perf_counter()
+    audio = whisper_transcribe.load_audio(source_path, decoder, low_memory)
+    source_decode_time = time.perf_counter() - start
+    try:
+        pcm_sha256 = write_archive(target, audio, source)
+    finally:
+        if hasattr(audio, 'close'):
+            audio.close()
+
+    # Wczytanie archiwum tą samą ścieżką co przy transkrypcji
+    start = time.perf_counter()
+    archived = whisper_transcribe.load_audio(target)
+    archive_decode_time = time.perf_counter() - start
+
+    entry.update({
+        "status": "ingested",
+        "archive_bytes": os.path.getsize(target),
+        "audio_duration": len(archived) / audio_decoder.TARGET_SAMPLE_RATE,
+        "pcm_sha256": pcm_sha256,
+        "source_decode_time": source_decode_time,
+        "archive_decode_time": archive_decode_time
+    })
+    return entry
+
+def append_manifest(output_dir, entry):
+    """Dopisuje archiwum do manifestu katalogu."""
+    record = {key: entry[key] for key in ("source_path", "source_sha256", "source_bytes", "archive_path",
+                                          "archive_bytes", "pcm_sha256", "audio_duration")}
+    record["ingested_at"] = datetime.now().isoformat(timespec='seconds')
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def summarize(entries):
+    """Oszczędność miejsca i czasu dekodowania dla zakończonych wpisów."""
+    done = [e for e in entries if e["status"] in ("ingested", "skipped")]
+    measured = [e for e in entries if e["status"] == "ingested"]
+    source_bytes = sum(e["source_bytes"] for e in done)
+    archive_bytes = sum(e["archive_bytes"] for e in done)
+    source_decode_time = sum(e["source_decode_time"] for e in measured)
+    archive_decode_time = sum(e["archive_decode_time"] for e in measured)
+    return {
+        "files_ingested": len(measured),
+        "files_skipped": len(done) - len(measured),
+        "files_failed": len(entries) - len(done),
+        "source_bytes": source_bytes,
+        "archive_bytes": archive_bytes,
+        "saved_bytes": source_bytes - archive_bytes,
+        "storage_ratio": source_bytes / archive_bytes if archive_bytes else 0,
+        "source_decode_time": source_decode_time,
+        "archive_decode_time": archive_decode_time,
+        "decode_speedup": source_decode_time / archive_decode_time if archive_decode_time > 0 else 0
+    }
+
+def setup_args():
+    """Konfiguracja parsera argumentów wiersza poleceń."""
+    parser = argparse.ArgumentParser(description='Normalizacja nagrań do archiwum 16 kHz mono (PCM 16 bit)')
+    parser.add_argument('inputs', type=str, nargs='+',
+                        help='Katalogi, wzorce glob lub pliki z listą nagrań (jedna ścieżka w linii)')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Katalog archiwów (domyślnie katalog "archive" w danych aplikacji)')
+    parser.add_argument('--decoder', type=str, default='auto', choices=['auto', 'ffmpeg'],
+                        help='Dekodowanie źródła: auto (natywnie dla WAV, ffmpeg dla innych formatów) lub ffmpeg')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Dekoduj źródło przez plik tymczasowy (pamięć niezależna od długości nagrania)')
+    parser.add_argument('--force', action='store_true',
+                        help='Utwórz archiwa ponownie, także dla niezmienionych nagrań')
+    return parser.parse_args()
+
+def main():
+    """Główna funkcja skryptu."""
+    args = setup_args()
+    try:
+        sources = collect_audio_files(args.inputs)
+        if not sources:
+            emit_event({"error": "Nie znaleziono plików audio", "status": "error"})
+            return 1
+        output_dir = args.output_dir or data_dir("archive")
+        os.makedirs(output_dir, exist_ok=True)
+
+        entries = []
+        for i, source_path in enumerate(sources):
+            try:
+                entry = ingest_file(source_path, output_dir, args.decoder, args.low_memory, args.force)
+                if entry["status"] == "ingested":
+                    append_manifest(output_dir, entry)
+            except Exception as e:
+                entry = {"source_path": os.path.abspath(source_path), "status": "error", "error": str(e)}
+            entries.append(entry)
+            emit_event(dict(entry, progress=(i + 1) * 100 / len(sources)))
+
+        summary = summarize(entries)
+        emit_event({"progress": 100, "status": "completed", "output_dir": os.path.abspath(output_dir), **summary})
+        return 0 if summary["files_failed"] == 0 else 1
+    except Exception as e:
+        emit_event({"error": str(e), "status": "error"})
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trwała kolejka zadań transkrypcji (SQLite) z harmonogramem.
+Zadania mają format zadań trybu --serve, priorytet i stan (queued, running, done, failed).
+Harmonogram uruchamia każde zadanie w osobnym procesie, pilnując, aby suma pamięci
+modeli uruchomionych zadań nie przekroczyła limitu (np. dwa modele large nigdy nie działają
+jednocześnie), ponawia nieudane zadania, a po awarii lub restarcie komputera przywraca
+do kolejki zadania, które były w toku. Zdarzenia postępu zadań są zapisywane w bazie,
+więc można je śledzić z innego procesu.
+
+Przykład:
+    python job_queue.py enqueue nagranie1.wav nagranie2.mp3 --model medium --priority 5
+    python job_queue.py run
+    python job_queue.py list --state queued
+    python job_queue.py watch 1 2
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import multiprocessing
+
+from app_paths import data_dir
+import inference_backends
+import whisper_transcribe
+from whisper_transcribe import emit_event, default_output_path
+
+# Wersja schematu bazy - zmiana powoduje utworzenie pustej kolejki
+SCHEMA_VERSION = 1
+
+STATES = ("queued", "running", "done", "failed")
+
+# Domyślny limit pamięci modeli wszystkich uruchomionych zadań (MB)
+DEFAULT_MEMORY_MB = 8192
+
+# Domyślna liczba jednocześnie uruchomionych zadań
+DEFAULT_MAX_JOBS = 2
+
+# Domyślna liczba prób wykonania zadania
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Opóźnienie ponowienia (sekundy), podwajane przy każdej kolejnej próbie
+RETRY_DELAY_SECONDS = 30
+
+# Odstęp między kolejnymi przebiegami harmonogramu (sekundy)
+POLL_SECONDS = 1.0
+
+# Po tylu sekundach bez sygnału życia harmonogram uznaje się za nieaktywny
+SCHEDULER_STALE_SECONDS = 30
+
+# Zdarzenia zadań zakończonych dawniej niż tyle dni są usuwane przy starcie harmonogramu
+EVENTS_RETENTION_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    job TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    memory_mb REAL NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, priority DESC, id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    created_at REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_job ON events(job_id, id);
+CREATE TABLE IF NOT EXISTS scheduler (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+class SchedulerBusyError(RuntimeError):
+    """Na tej samej bazie kolejki pracuje już inny harmonogram."""
+
+def default_db_path():
+    """Domyślne położenie bazy kolejki w katalogu danych aplikacji."""
+    return os.path.join(data_dir("queue"), "jobs.sqlite")
+
+def job_memory_mb(job):
+    """
+    Szacowana pamięć modeli potrzebna zadaniu (MB); tryb równoległy ładuje model w każdym procesie,
+    a kaskada trzyma w pamięci również model wstępny.
+    """
+    backend = job.get("backend", inference_backends.DEFAULT_BACKEND)
+    model_mb = whisper_transcribe.model_memory_mb(job.get("model", "small"), backend)
+    if job.get("cascade"):
+        model_mb += whisper_transcribe.model_memory_mb(job["cascade"], backend)
+    return model_mb * max(1, int(job.get("parallel", 0)))
+
+class JobQueue:
+    """Kolejka zadań i ich zdarzeń w bazie SQLite (bezpieczna dla wielu procesów)."""
+
+    def __init__(self, path=None):
+        self.path = path or default_db_path()
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS jobs; DROP TABLE IF EXISTS scheduler;"
+            )
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def enqueue(self, job, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Dodaje zadanie (słownik w formacie --serve) i zwraca jego identyfikator."""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (job, priority, max_attempts, memory_mb, output_path, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (json.dumps(job, ensure_ascii=False), priority, max(1, max_attempts), job_memory_mb(job),
+                 job.get("output"), time.time())
+            )
+        return cursor.lastrowid
+
+    def _rows(self, where="", params=()):
+        cursor = self.connection.execute(
+            "SELECT id, job, priority, state, attempts, max_attempts, memory_mb, not_before, output_path, error, "
+            f"created_at, started_at, finished_at FROM jobs {where}", params
+        )
+        columns = [column[0] for column in cursor.description]
+        jobs = []
+        for row in cursor.fetchall():
+            entry = dict(zip(columns, row))
+            entry["job"] = json.loads(entry["job"])
+            jobs.append(entry)
+        return jobs
+
+    def get(self, job_id):
+        """Zwraca zadanie o podanym identyfikatorze (None, jeśli nie istnieje)."""
+        jobs = self._rows("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def list(self, state=None, limit=None):
+        """Zwraca zadania (opcjonalnie tylko w danym stanie) w kolejności wykonywania."""
+        where, params = "", ()
+        if state:
+            where, params = "WHERE state = ?", (state,)
+        where += " ORDER BY CASE state WHEN 'running' THEN 0 WHEN 'queued' THEN 1 ELSE 2 END, priority DESC, id"
+        if limit:
+            where += f" LIMIT {int(limit)}"
+        return self._rows(where, params)
+
+    def next_ready(self, now=None):
+        """Zwraca zadanie z kolejki o najwyższym priorytecie, które można już uruchomić."""
+        jobs = self._rows("WHERE state = 'queued' AND not_before <= ? ORDER BY priority DESC, id LIMIT 1",
+                          (now or time.time(),))
+        return jobs[0] if jobs else None
+
+    def count(self, state):
+        return self.connection.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    def mark_running(self, job_id):
+        """Oznacza zadanie jako uruchomione (każde uruchomienie to kolejna próba)."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?, error = NULL "
+                "WHERE id = ?", (time.time(), job_id)
+            )
+
+    def store_result(self, job_id, output_path, error):
+        """Zapisuje wynik próby (wywoływane przez proces roboczy)."""
+        with self.connection:
+            self.connection.execute("UPDATE jobs SET output_path = COALESCE(?, output_path), error = ? WHERE id = ?",
+                                    (output_path, error, job_id))
+
+    def finish(self, job_id, success, error=None):
+        """
+        Kończy próbę zadania: udana - stan done, nieudana - ponowienie z opóźnieniem
+        lub stan failed po wyczerpaniu prób.
+
+        Returns:
+            Nowy stan zadania
+        """
+        job = self.get(job_id)
+        now = time.time()
+        if success:
+            state, not_before = "done", 0
+        elif job["attempts"] < job["max_attempts"]:
+            state, not_before = "queued", now + RETRY_DELAY_SECONDS * 2 ** (job["attempts"] - 1)
+        else:
+            state, not_before = "failed", 0
+        if not success:
+            error = error or job["error"] or "Nieznany błąd"
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET state = ?, not_before = ?, error = ?, finished_at = ? WHERE id = ?",
+                (state, not_before, None if success else error, now if state != "queued" else None, job_id)
+            )
+        return state
+
+    def requeue(self, job_id, count_attempt=False):
+        """Przywraca uruchomione zadanie do kolejki (np. po przerwaniu pracy harmonogramu)."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET state = 'queued', not_before = 0, started_at = NULL, "
+                "attempts = attempts - ? WHERE id = ? AND state = 'running'",
+                (0 if count_attempt else 1, job_id)
+            )
+
+    def requeue_interrupted(self):
+        """
+        Przywraca do kolejki zadania, które były w toku podczas awarii lub restartu.
+        Przerwana próba jest liczona, więc zadanie, które za każdym razem powoduje awarię,
+        w końcu trafia do stanu failed.
+
+        Returns:
+            Lista identyfikatorów przywróconych zadań
+        """
+        interrupted = [job["id"] for job in self._rows("WHERE state = 'running'")]
+        for job_id in interrupted:
+            self.finish(job_id, False, "Przerwano (awaria lub restart harmonogramu)")
+            with self.connection:
+                self.connection.execute("UPDATE jobs SET not_before = 0 WHERE id = ? AND state = 'queued'",
+                                        (job_id,))
+        return interrupted
+
+    def add_event(self, job_id, event):
+        with self.connection:
+            self.connection.execute("INSERT INTO events (job_id, created_at, event) VALUES (?, ?, ?)",
+                                    (job_id, time.time(), json.dumps(event, ensure_ascii=False)))
+
+    def events_after(self, last_event_id=0, job_ids=None):
+        """Zwraca zdarzenia nowsze niż last_event_id jako listę (id, job_id, zdarzenie)."""
+        query = "SELECT id, job_id, event FROM events WHERE id > ?"
+        params = [last_event_id]
+        if job_ids:
+            query += f" AND job_id IN ({', '.join('?' * len(job_ids))})"
+            params.extend(job_ids)
+        rows = self.connection.execute(query + " ORDER BY id", params).fetchall()
+        return [(event_id, job_id, json.loads(event)) for event_id, job_id, event in rows]
+
+    def last_event_id(self):
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def prune_events(self, retention_days=EVENTS_RETENTION_DAYS):
+        """Usuwa zdarzenia zadań zakończonych dawniej niż retention_days dni."""
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM events WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?)",
+                (time.time() - retention_days * 86400,)
+            )
+        return cursor.rowcount
+
+    def claim_scheduler(self):
+        """
+        Rejestruje bieżący proces jako jedyny harmonogram tej kolejki.
+
+        Raises:
+            SchedulerBusyError: jeśli inny harmonogram dał niedawno znak życia
+        """
+        now = time.time()
+        with self.connection:
+            # Blokada zapisu od początku transakcji - inaczej dwa harmonogramy mogą jednocześnie
+            # odczytać brak aktywnego harmonogramu i oba się zarejestrować
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute("SELECT pid, host, heartbeat FROM scheduler WHERE id = 1").fetchone()
+            if row is not None and now - row[2] < SCHEDULER_STALE_SECONDS and (row[0], row[1]) != _identity():
+                raise SchedulerBusyError(f"Harmonogram już działa (PID {row[0]} na {row[1]})")
+            self.connection.execute("INSERT OR REPLACE INTO scheduler (id, pid, host, heartbeat) VALUES (1, ?, ?, ?)",
+                                    (*_identity(), now))
+
+    def heartbeat(self):
+        with self.connection:
+            self.connection.execute("UPDATE scheduler SET heartbeat = ? WHERE id = 1", (time.time(),))
+
+    def release_scheduler(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM scheduler WHERE id = 1 AND pid = ? AND host = ?", _identity())
+
+def _identity():
+    return os.getpid(), socket.gethostname()
+
+def _worker_main(db_path, job_id, threads):
+    """Wykonuje jedno zadanie w procesie roboczym i zapisuje jego zdarzenia w bazie."""
+    # Limit wątków musi być ustawiony przed (leniwym) importem torch
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    with JobQueue(db_path) as queue:
+        errors = []
+
+        def record(event):
+            if "error" in event:
+                errors.append(event["error"])
+            queue.add_event(job_id, event)
+
+        whisper_transcribe._event_context["job_id"] = job_id
+        whisper_transcribe._event_listeners.append(record)
+        try:
+            job = queue.get(job_id)["job"]
+            output_path = whisper_transcribe.run_job({**job, "cpu_threads": threads})
+        except Exception as e:
+            emit_event({"error": str(e), "status": "error"})
+            output_path = None
+        finally:
+            whisper_transcribe._event_listeners.remove(record)
+
+        queue.store_result(job_id, output_path, None if output_path else (errors[-1] if errors else "Nieznany błąd"))
+    sys.exit(0 if output_path else 1)
+
+class Scheduler:
+    """
+    Harmonogram uruchamiający zadania z kolejki w osobnych procesach.
+
+    Zadania są uruchamiane w kolejności priorytetu. Zadanie czeka, dopóki pamięć jego modelu
+    nie zmieści się w limicie obok już uruchomionych zadań (zadanie większe niż cały limit
+    działa samodzielnie); kolejne zadania nie wyprzedzają czekającego, więc duże modele
+    nie są zagładzane przez małe.
+    """
+
+    def __init__(self, queue, memory_mb=DEFAULT_MEMORY_MB, max_jobs=DEFAULT_MAX_JOBS):
+        self.queue = queue
+        self.memory_mb = memory_mb
+        self.max_jobs = max(1, max_jobs)
+        self.threads = max(1, (os.cpu_count() or 1) // self.max_jobs)
+        self.running = {}
+        self._context = multiprocessing.get_context("spawn")
+
+    def _running_memory_mb(self):
+        return sum(memory_mb for _, memory_mb in self.running.values())
+
+    def _start_ready_jobs(self):
+        while len(self.running) < self.max_jobs:
+            job = self.queue.next_ready()
+            if job is None:
+                return
+            if self.running and self._running_memory_mb() + job["memory_mb"] > self.memory_mb:
+                return
+            self.queue.mark_running(job["id"])
+            process = self._context.Process(target=_worker_main, args=(self.queue.path, job["id"], self.threads))
+            process.start()
+            self.running[job["id"]] = (process, job["memory_mb"])
+            emit_event({"status": "job_started", "job_id": job["id"], "audio_path": job["job"]["audio_path"],
+                        "attempt": job["attempts"] + 1, "memory_mb": job["memory_mb"],
+                        "running_memory_mb": self._running_memory_mb()})
+
+    def _reap_finished_jobs(self):
+        for job_id, (process, _) in list(self.running.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del self.running[job_id]
+            error = None
+            if process.exitcode not in (0, 1):
+                error = f"Proces roboczy zakończył się nieoczekiwanie (kod {process.exitcode})"
+            state = self.queue.finish(job_id, process.exitcode == 0, error)
+            job = self.queue.get(job_id)
+            event = {"status": "job_finished", "job_id": job_id, "state": state, "attempts": job["attempts"]}
+            if state != "done":
+                event["job_error"] = job["error"]
+            emit_event(event)
+
+    def _stop_running_jobs(self):
+        """Przerywa uruchomione zadania i przywraca je do kolejki bez liczenia próby."""
+        for job_id, (process, _) in self.running.items():
+            process.terminate()
+            process.join()
+            self.queue.requeue(job_id)
+        self.running.clear()
+
+    def run(self, exit_when_idle=False):
+        """Główna pętla harmonogramu (do przerwania lub, z exit_when_idle, do opróżnienia kolejki)."""
+        self.queue.claim_scheduler()
+        try:
+            requeued = self.queue.requeue_interrupted()
+            if requeued:
+                emit_event({"info": f"Przywrócono do kolejki przerwane zadania: {requeued}", "requeued": requeued})
+            self.queue.prune_events()
+            emit_event({"status": "scheduler_ready", "memory_mb": self.memory_mb, "max_jobs": self.max_jobs,
+                        "queued": self.queue.count("queued")})
+
+            while True:
+                self.queue.heartbeat()
+                self._reap_finished_jobs()
+                self._start_ready_jobs()
+                if exit_when_idle and not self.running and self.queue.count("queued") == 0:
+                    break
+                time.sleep(POLL_SECONDS)
+        finally:
+            self._stop_running_jobs()
+            self.queue.release_scheduler()
+
+def watch(queue, job_ids=None, from_start=True):
+    """
+    Wypisuje zdarzenia zadań w miarę ich zapisywania. Z podanymi identyfikatorami kończy się,
+    gdy wszystkie te zadania są zakończone (done lub failed).
+    """
+    last_event_id = 0 if job_ids and from_start else queue.last_event_id()
+    while True:
+        finished = job_ids and all((queue.get(job_id) or {}).get("state") in ("done", "failed", None)
+                                   for job_id in job_ids)
+        for event_id, _, event in queue.events_after(last_event_id, job_ids):
+            last_event_id = event_id
+            emit_event(event)
+        if finished:
+            return
+        time.sleep(POLL_SECONDS)
+
+def setup_args():
+    """Konfiguracja parsera argumentów wiersza poleceń."""
+    parser = argparse.ArgumentParser(description='Kolejka zadań transkrypcji z harmonogramem')
+    parser.add_argument('--db', type=str, help='Ścieżka bazy kolejki (domyślnie w katalogu danych aplikacji)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = commands.add_parser('enqueue', help='Dodaj nagrania do kolejki')
+    enqueue_parser.add_argument('audio_paths', type=str, nargs='+', help='Ścieżki do plików audio')
+    enqueue_parser.add_argument('--output', '-o', type=str, help='Ścieżka do pliku wyjściowego (tylko dla jednego nagrania)')
+    enqueue_parser.add_argument('--model', type=str, default='small', help='Model Whisper (tiny, base, small, medium, large)')
+    enqueue_parser.add_argument('--language', type=str, default='pl', help='Język transkrypcji (domyślnie polski)')
+    enqueue_parser.add_argument('--punctuation', action='store_true', help='Dodaj automatycznie interpunkcję')
+    enqueue_parser.add_argument('--best_of', type=int, default=1, help='Parametr best_of dla Whisper')
+    enqueue_parser.add_argument('--beam_size', type=int, default=1, help='Parametr beam_size dla Whisper')
+    enqueue_parser.add_argument('--stream', action='store_true', help='Transkrypcja w oknach 30 s z bieżącym zapisem')
+    enqueue_parser.add_argument('--vad', action='store_true', help='Usuń długie fragmenty ciszy przed transkrypcją')
+    enqueue_parser.add_argument('--backend', type=str, default=inference_backends.DEFAULT_BACKEND,
+                                choices=list(inference_backends.BACKENDS), help='Silnik inferencji')
+    enqueue_parser.add_argument('--model-dir', type=str, default=None,
+                                help='Lokalny katalog modelu CTranslate2 (dla --backend ctranslate2)')
+    enqueue_parser.add_argument('--priority', type=int, default=0, help='Priorytet (wyższy jest wykonywany wcześniej)')
+    enqueue_parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                                help='Liczba prób wykonania zadania')
+
+    list_parser = commands.add_parser('list', help='Wypisz zadania')
+    list_parser.add_argument('--state', type=str, choices=list(STATES), help='Tylko zadania w danym stanie')
+    list_parser.add_argument('--limit', type=int, default=None, help='Maksymalna liczba zadań')
+
+    watch_parser = commands.add_parser('watch', help='Śledź zdarzenia zadań')
+    watch_parser.add_argument('job_ids', type=int, nargs='*',
+                              help='Identyfikatory zadań (bez nich - nowe zdarzenia wszystkich zadań)')
+
+    run_parser = commands.add_parser('run', help='Uruchom harmonogram')
+    run_parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                            help='Limit pamięci modeli wszystkich uruchomionych zadań (MB)')
+    run_parser.add_argument('--max-jobs', type=int, default=DEFAULT_MAX_JOBS,
+                            help='Maksymalna liczba jednocześnie uruchomionych zadań')
+    run_parser.add_argument('--exit-when-idle', action='store_true',
+                            help='Zakończ pracę, gdy kolejka jest pusta')
+    args = parser.parse_args()
+    if args.command == 'enqueue' and args.output and len(args.audio_paths) > 1:
+        parser.error('--output można podać tylko dla jednego nagrania')
+    return args
+
+def main():
+    """Główna funkcja skryptu."""
+    args = setup_args()
+    try:
+        with JobQueue(args.db) as queue:
+            if args.command == 'enqueue':
+                missing_deps = whisper_transcribe.check_dependencies(args.backend)
+                if missing_deps:
+                    emit_event({"warning": f"Brakujące biblioteki Python: {', '.join(missing_deps)}",
+                                "missing_deps": missing_deps})
+                for audio_path in args.audio_paths:
+                    if not os.path.isfile(audio_path):
+                        emit_event({"warning": f"Pominięto nieistniejący plik: {audio_path}"})
+                        continue
+                    job = {
+                        "audio_path": os.path.abspath(audio_path),
+                        "output": os.path.abspath(args.output or default_output_path(audio_path)),
+                        "model": args.model,
+                        "language": args.language,
+                        "punctuation": args.punctuation,
+                        "best_of": args.best_of,
+                        "beam_size": args.beam_size,
+                        "stream": args.stream,
+                        "vad": args.vad,
+                        "backend": args.backend,
+                        "model_dir": args.model_dir
+                    }
+                    job_id = queue.enqueue(job, args.priority, args.max_attempts)
+                    emit_event({"status": "queued", "job_id": job_id, "audio_path": job["audio_path"],
+                                "priority": args.priority})
+            elif args.command == 'list':
+                emit_event({"status": "completed", "jobs": queue.list(args.state, args.limit)})
+            elif args.command == 'watch':
+                watch(queue, args.job_ids)
+            else:
+                Scheduler(queue, args.memory_mb, args.max_jobs).run(args.exit_when_idle)
+        return 0
+    except KeyboardInterrupt:
+        return 0
+    except (sqlite3.Error, OSError, SchedulerBusyError) as e:
+        emit_event({"error": str(e), "status": "error"})
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""
+Odczyt długości plików MP3 bez dekodowania i bez ffprobe.
+Długość jest liczona z nagłówka Xing/Info lub VBRI (pliki VBR), a gdy go brak -
+z przepływności pierwszej ramki i rozmiaru danych audio (pliki CBR).
+"""
+
+import os
+import struct
+
+# Przepływności (kb/s) według (wersja MPEG-1?, warstwa) i indeksu z nagłówka ramki
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Częstotliwości próbkowania MPEG-1; MPEG-2 używa połowy, MPEG-2.5 ćwierci
+_SAMPLE_RATES = (44100, 48000, 32000)
+
+# Liczba bajtów przeszukiwanych w poszukiwaniu pierwszej ramki (za tagiem ID3v2)
+SYNC_SEARCH_BYTES = 64 * 1024
+
+class Mp3FormatError(ValueError):
+    """Plik nie jest obsługiwanym plikiem MP3."""
+
+class FrameHeader:
+    """Nagłówek ramki MPEG audio."""
+
+    def __init__(self, mpeg1, layer, bitrate, sample_rate, padding, mono):
+        self.mpeg1 = mpeg1
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.mono = mono
+
+    @property
+    def samples_per_frame(self):
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and not self.mpeg1:
+            return 576
+        return 1152
+
+    @property
+    def frame_length(self):
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        return self.samples_per_frame // 8 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def side_info_size(self):
+        """Rozmiar informacji pobocznej warstwy III (za nią zaczyna się nagłówek Xing/Info)."""
+        if self.mpeg1:
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+def parse_frame_header(data):
+    """
+    Dekoduje 4-bajtowy nagłówek ramki.
+
+    Returns:
+        FrameHeader lub None, jeśli bajty nie są poprawnym nagłówkiem
+    """
+    if len(data) < 4 or data[0] != 0xFF or (data[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (data[1] >> 3) & 0x03
+    layer_bits = (data[1] >> 1) & 0x03
+    bitrate_index = data[2] >> 4
+    rate_index = (data[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        # Wersja/warstwa zarezerwowana, przepływność "free" lub nieprawidłowa
+        return None
+
+    mpeg1 = version_bits == 3
+    version_divisor = {3: 1, 2: 2, 0: 4}[version_bits]
+    layer = 4 - layer_bits
+    return FrameHeader(
+        mpeg1=mpeg1,
+        layer=layer,
+        bitrate=_BITRATES[(mpeg1, layer)][bitrate_index] * 1000,
+        sample_rate=_SAMPLE_RATES[rate_index] // version_divisor,
+        padding=(data[2] >> 1) & 0x01,
+        mono=(data[3] >> 6) == 3
+    )
+
+def _id3v2_size(f):
+    """Zwraca rozmiar tagu ID3v2 na początku pliku (0, jeśli go brak)."""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _find_first_frame(buffer):
+    """Szuka pierwszej ramki, po której następuje kolejna poprawna ramka (odrzuca przypadkowe synchronizacje)."""
+    position = buffer.find(b'\xff')
+    while 0 <= position < len(buffer) - 4:
+        header = parse_frame_header(buffer[position:position + 4])
+        if header is not None:
+            following = position + header.frame_length
+            if following + 4 > len(buffer):
+                return position, header
+            next_header = parse_frame_header(buffer[following:following + 4])
+            if next_header is not None and next_header.sample_rate == header.sample_rate:
+                return position, header
+        position = buffer.find(b'\xff', position + 1)
+    raise Mp3FormatError("Nie znaleziono ramki MPEG audio")
+
+def _vbr_frame_count(frame, header):
+    """Zwraca liczbę ramek z nagłówka Xing/Info lub VBRI (None dla plików bez tych nagłówków)."""
+    xing = 4 + header.side_info_size
+    if frame[xing:xing + 4] in (b'Xing', b'Info') and len(frame) >= xing + 12:
+        flags = struct.unpack('>I', frame[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            return struct.unpack('>I', frame[xing + 8:xing + 12])[0]
+    # Nagłówek VBRI (koder Fraunhofer) ma stałe położenie: 32 bajty za nagłówkiem ramki
+    if frame[36:40] == b'VBRI' and len(frame) >= 54:
+        return struct.unpack('>I', frame[50:54])[0]
+    return None
+
+def read_mp3_duration(path):
+    """
+    Zwraca długość pliku MP3 w sekundach, odczytując tylko nagłówki.
+
+    Raises:
+        Mp3FormatError: jeśli w pliku nie ma ramek MPEG audio
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        audio_start = _id3v2_size(f)
+        f.seek(audio_start)
+        buffer = f.read(SYNC_SEARCH_BYTES)
+        offset, header = _find_first_frame(buffer)
+        audio_start += offset
+
+        f.seek(audio_start)
+        frame = f.read(max(header.frame_length, 64))
+        audio_end = file_size
+        if file_size >= 128:
+            f.seek(file_size - 128)
+            if f.read(3) == b'TAG':
+                audio_end -= 128
+
+    frame_count = _vbr_frame_count(frame, header)
+    if frame_count:
+        return frame_count * header.samples_per_frame / float(header.sample_rate)
+    return max(0, audio_end - audio_start) * 8 / float(header.bitrate)
+
+def can_parse(path):
+    """Sprawdza, czy plik ma rozszerzenie obsługiwane przez read_mp3_duration."""
+    return path.lower().endswith('.mp3')
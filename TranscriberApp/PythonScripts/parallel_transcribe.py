@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""
+Równoległa transkrypcja długich nagrań na wielu rdzeniach CPU.
+Nagranie jest dzielone w miejscach ciszy na fragmenty z zakładką, fragmenty są
+transkrybowane w puli procesów, a wyniki sklejane w jedną listę segmentów
+(z usunięciem powtórzeń w zakładkach i zachowaniem rosnących znaczników czasu).
+"""
+
+import os
+import re
+import math
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import inference_backends
+
+# Częstotliwość próbkowania wejścia Whisper
+SAMPLE_RATE = 16000
+
+# Minimalna długość nagrania (sekundy), od której opłaca się dzielić je na fragmenty
+MIN_PARALLEL_SECONDS = 240
+
+# Maksymalna długość jednego fragmentu (sekundy)
+MAX_CHUNK_SECONDS = 600
+
+# Najkrótszy fragment (sekundy) - krótsze fragmenty tracą za dużo kontekstu
+MIN_CHUNK_SECONDS = 120
+
+# Zakładka dodawana po obu stronach fragmentu (sekundy)
+OVERLAP_SECONDS = 5.0
+
+# Zakres poszukiwania ciszy wokół planowanego miejsca podziału (sekundy)
+SILENCE_SEARCH_SECONDS = 15.0
+
+# Długość ramki używanej przy szukaniu ciszy (sekundy)
+ENERGY_FRAME_SECONDS = 0.1
+
+# Model w procesie roboczym (ładowany raz przez _init_worker)
+_worker_model = None
+
+class Chunk:
+    """Fragment nagrania: część własna [core_start, core_end) i zakres z zakładką [start, end) w próbkach."""
+
+    def __init__(self, index, core_start, core_end, start, end):
+        self.index = index
+        self.core_start = core_start
+        self.core_end = core_end
+        self.start = start
+        self.end = end
+
+def plan_chunks(audio, sample_rate, workers):
+    """
+    Dzieli nagranie na fragmenty, przesuwając miejsca podziału do najcichszego
+    miejsca w pobliżu planowanej granicy.
+
+    Returns:
+        Lista obiektów Chunk
+    """
+    total = len(audio)
+    duration = total / sample_rate
+    count = max(workers, math.ceil(duration / MAX_CHUNK_SECONDS))
+    count = max(1, min(count, int(duration // MIN_CHUNK_SECONDS)))
+
+    frame = max(1, int(ENERGY_FRAME_SECONDS * sample_rate))
+    n_frames = total // frame
+    energy = np.mean(np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame) ** 2, axis=1)
+    search = int(SILENCE_SEARCH_SECONDS / ENERGY_FRAME_SECONDS)
+
+    cuts = [0]
+    for i in range(1, count):
+        target = int(i * n_frames / count)
+        lo = max(target - search, 1)
+        hi = min(target + search, n_frames - 1)
+        best = lo + int(np.argmin(energy[lo:hi])) if hi > lo else target
+        cuts.append(max(best * frame, cuts[-1] + frame))
+    cuts.append(total)
+
+    overlap = int(OVERLAP_SECONDS * sample_rate)
+    return [
+        Chunk(i, cuts[i], cuts[i + 1], max(0, cuts[i] - overlap), min(total, cuts[i + 1] + overlap))
+        for i in range(len(cuts) - 1)
+    ]
+
+def _init_worker(model_size, device, threads, backend, model_dir):
+    """Ładuje model raz na proces roboczy i ogranicza liczbę wątków obliczeniowych."""
+    global _worker_model
+    if inference_backends.uses_torch(backend):
+        import torch
+        torch.set_num_threads(threads)
+    _worker_model = inference_backends.load_model(backend, model_size, device, model_dir, cpu_threads=threads)
+
+def _detect_language(audio_file, start, end):
+    """Wykrywa język na podstawie fragmentu nagrania (w procesie roboczym)."""
+    audio = np.load(audio_file, mmap_mode='r')
+    return _worker_model.detect_language(np.array(audio[start:end]))
+
+def _transcribe_chunk(audio_file, chunk, options):
+    """Transkrybuje jeden fragment (w procesie roboczym) i zwraca segmenty w czasie bezwzględnym."""
+    audio = np.load(audio_file, mmap_mode='r')
+    samples = np.array(audio[chunk.start:chunk.end], dtype=np.float32)
+    result = _worker_model.transcribe(samples, **options, verbose=None)
+    offset = chunk.start / SAMPLE_RATE
+    segments = []
+    for segment in result.get("segments", []):
+        segments.append({
+            "start": segment["start"] + offset,
+            "end": segment["end"] + offset,
+            "text": segment["text"],
+            "avg_logprob": segment.get("avg_logprob"),
+            "compression_ratio": segment.get("compression_ratio"),
+            "no_speech_prob": segment.get("no_speech_prob")
+        })
+    return chunk, segments, result.get("language")
+
+def _normalize_words(text):
+    """Zwraca słowa tekstu bez interpunkcji i wielkości liter (do porównywania zakładek)."""
+    return re.findall(r"\w+", text.lower())
+
+def _word_keys(text):
+    """Zwraca słowa tekstu w postaci znormalizowanej (bez interpunkcji i wielkości liter)."""
+    return ["".join(_normalize_words(word)) for word in text.split()]
+
+def _trim_repeated_prefix(tail_words, text, min_words=2):
+    """
+    Usuwa z początku text słowa rozpoznane już w poprzednim fragmencie (zakładka).
+    Usuwany jest najdłuższy początek, który jest końcówką tail_words,
+    albo - jeśli ma co najmniej min_words słów - występuje gdziekolwiek w tail_words.
+    """
+    words = text.split()
+    keys = _word_keys(text)
+    for length in range(len(keys), 0, -1):
+        prefix = keys[:length]
+        repeated = tail_words[-length:] == prefix
+        if not repeated and length >= min_words:
+            repeated = any(tail_words[i:i + length] == prefix for i in range(len(tail_words) - length + 1))
+        if repeated:
+            return " " + " ".join(words[length:]) if words[length:] else ""
+    return text
+
+def merge_chunk_results(chunk_results, sample_rate, tail_size=40):
+    """
+    Skleja segmenty z fragmentów w jedną listę.
+
+    Z każdego fragmentu zostają segmenty nachodzące na jego część własną. Segmenty, które
+    zaczynają się przed końcem poprzedniego, są przycinane o tekst powtórzony w zakładce,
+    a znaczniki czasu są wymuszane jako rosnące.
+    """
+    merged = []
+    tail_words = []
+    for chunk, segments in sorted(chunk_results, key=lambda item: item[0].index):
+        core_start = chunk.core_start / sample_rate
+        core_end = chunk.core_end / sample_rate
+        for segment in segments:
+            if segment["end"] <= core_start or segment["start"] >= core_end:
+                continue
+            segment = dict(segment)
+            if merged and segment["start"] < merged[-1]["end"]:
+                segment["text"] = _trim_repeated_prefix(tail_words, segment["text"])
+                segment["start"] = merged[-1]["end"]
+            if not segment["text"].strip():
+                continue
+            segment["end"] = max(segment["end"], segment["start"])
+            segment["id"] = len(merged)
+            merged.append(segment)
+            tail_words = (tail_words + _word_keys(segment["text"]))[-tail_size:]
+    return merged
+
+def transcribe_parallel(audio, model_size, device, transcribe_options, workers, on_progress=None,
+                        threads_per_worker=None, backend=inference_backends.DEFAULT_BACKEND, model_dir=None):
+    """
+    Transkrybuje nagranie równolegle w puli procesów.
+
+    Args:
+        audio: Tablica float32 (16 kHz, mono)
+        model_size: Rozmiar modelu Whisper
+        device: Urządzenie ('cpu' lub 'cuda')
+        transcribe_options: Opcje dla model.transcribe
+        workers: Liczba procesów roboczych
+        on_progress: Funkcja on_progress(przetworzone_sekundy, wszystkie_sekundy) wywoływana po każdym fragmencie
+        threads_per_worker: Liczba wątków obliczeniowych procesu roboczego (domyślnie rdzenie / procesy)
+        backend: Silnik inferencji (inference_backends.BACKENDS)
+        model_dir: Lokalny katalog modelu dla silnika ctranslate2
+
+    Returns:
+        Słownik wyniku w formacie model.transcribe (text, segments, language)
+    """
+    chunks = plan_chunks(audio, SAMPLE_RATE, workers)
+    workers = max(1, min(workers, len(chunks)))
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    options = dict(transcribe_options)
+    total_seconds = len(audio) / SAMPLE_RATE
+
+    # Nagranie trafia do procesów przez plik mapowany w pamięci zamiast kopiowania przez potok
+    fd, audio_file = tempfile.mkstemp(suffix='.npy')
+    os.close(fd)
+    try:
+        np.save(audio_file, np.asarray(audio, dtype=np.float32))
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_size, device, threads_per_worker, backend, model_dir)) as executor:
+            # Jeden język dla wszystkich fragmentów
+            if not options.get("language"):
+                options["language"] = executor.submit(
+                    _detect_language, audio_file, 0, min(len(audio), 30 * SAMPLE_RATE)
+                ).result()
+
+            # Najdłuższe fragmenty najpierw
+            futures = [executor.submit(_transcribe_chunk, audio_file, chunk, options)
+                       for chunk in sorted(chunks, key=lambda c: c.end - c.start, reverse=True)]
+            chunk_results = []
+            done_seconds = 0.0
+            for future in as_completed(futures):
+                chunk, segments, _ = future.result()
+                chunk_results.append((chunk, segments))
+                done_seconds += (chunk.core_end - chunk.core_start) / SAMPLE_RATE
+                if on_progress is not None:
+                    on_progress(done_seconds, total_seconds)
+    finally:
+        try:
+            os.remove(audio_file)
+        except OSError:
+            pass
+
+    segments = merge_chunk_results(chunk_results, SAMPLE_RATE)
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": options["language"]
+    }
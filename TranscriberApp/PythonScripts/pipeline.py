@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+Potok transkrypcji wielu nagrań w jednym procesie. Trzy etapy działają jednocześnie:
+    przygotowanie - długość, skrót zawartości, wynik z pamięci podręcznej albo dekodowanie audio
+                    i spektrogram kolejnych nagrań (wątki w tle, ograniczona kolejka o głębokości prefetch)
+    inferencja    - transcribe_audio z przygotowanymi danymi (wątek wywołujący)
+    zapis         - plik Markdown, indeks i zdarzenie "completed" (osobny wątek)
+Dzięki temu model nie czeka na ffmpeg ani na dysk. Po zakończeniu zgłaszane jest zdarzenie
+"pipeline_stats" z głębokością kolejki i czasem pracy oraz przestojów każdego etapu.
+"""
+
+import time
+import queue
+import threading
+
+import feature_cache
+import inference_backends
+import result_cache
+import whisper_transcribe
+from whisper_transcribe import emit_event
+
+# Domyślna liczba nagrań przygotowywanych z wyprzedzeniem
+DEFAULT_PREFETCH = 2
+
+# Domyślna liczba wątków etapu przygotowania
+DEFAULT_PREPARE_THREADS = 1
+
+# Największa liczba zadań zapisu oczekujących na wątek zapisu
+WRITE_QUEUE_SIZE = 4
+
+def _feature_config(options):
+    """Konfiguracja spektrogramu zadania (None, jeśli transkrypcja nie korzysta z gotowego spektrogramu)."""
+    return whisper_transcribe.feature_cache_config(
+        options["backend"], options["model_size"], options["use_feature_cache"], options["stream"],
+        options["follow"], options["use_vad"], options["parallel_workers"], options["cascade_model"],
+        options["low_memory"]
+    )
+
+def prepare(job, backend=inference_backends.DEFAULT_BACKEND, model=None):
+    """
+    Etap przygotowania jednego zadania (format zadań trybu --serve).
+
+    Args:
+        job: Zadanie (audio_path i opcje jak w whisper_transcribe.job_options)
+        backend: Domyślny silnik inferencji
+        model: Załadowany model zadania; pozwala policzyć spektrogram jeszcze przed inferencją
+
+    Returns:
+        Słownik dla transcribe_audio(prepared=...)
+    """
+    options = whisper_transcribe.job_options(job, backend)
+    audio_path = job["audio_path"]
+    prepared = {"audio_duration": None, "audio_digest": None}
+    if options["follow"]:
+        # Nagranie wciąż rośnie - wszystko dzieje się dopiero podczas transkrypcji
+        return prepared
+    prepared["audio_duration"] = whisper_transcribe.get_audio_duration(audio_path)
+
+    config = _feature_config(options)
+    if options["use_cache"] or config is not None:
+        prepared["audio_digest"] = result_cache.file_digest(audio_path)
+    if options["use_cache"]:
+        # Nagranie z wynikiem w pamięci podręcznej nie musi być dekodowane
+        store = result_cache.ResultCache()
+        result_options = whisper_transcribe.result_cache_options(
+            options["model_size"], options["language"], options["best_of"], options["beam_size"],
+            options["stream"] or options["low_memory"], options["decoder"], options["use_vad"],
+            options["vad_min_silence"], options["parallel_workers"], options["backend"], options["model_dir"],
+            options["cascade_model"], options["cascade_thresholds"]
+        )
+        result = store.get(store.make_key(prepared["audio_digest"], result_options))
+        if result is not None:
+            prepared["result"] = result
+            return prepared
+    if options["low_memory"]:
+        # Plik tymczasowy z próbkami jest tworzony i usuwany przez transcribe_audio
+        return prepared
+
+    if config is not None:
+        store = feature_cache.FeatureCache()
+        key = store.make_key(prepared["audio_digest"], config)
+        features = store.get(key)
+        if features is not None:
+            prepared.update(features=features, feature_cache_hit=True)
+            return prepared
+
+    prepared["audio"] = whisper_transcribe.load_audio(audio_path, options["decoder"])
+    if config is not None and model is not None:
+        prepared.update(features=model.compute_features(prepared["audio"]), feature_cache_hit=False)
+        store.put(key, prepared["features"])
+    return prepared
+
+def _model_key(job, backend):
+    options = whisper_transcribe.job_options(job, backend)
+    return options["model_size"], options["backend"], options["model_dir"]
+
+def _feature_model(job, backend, model_cache):
+    """
+    Ładuje model zadania, jeśli przyjmuje gotowy spektrogram, żeby etap przygotowania mógł go liczyć
+    (None, jeśli spektrogram policzy dopiero inferencja).
+    """
+    options = whisper_transcribe.job_options(job, backend)
+    if _feature_config(options) is None:
+        return None
+    if inference_backends.uses_torch(options["backend"]):
+        whisper_transcribe.require_backend()
+    device = inference_backends.select_device(options["backend"])
+    model, _ = model_cache.get(options["model_size"], device, options["backend"], options["model_dir"])
+    return model
+
+def run(jobs, model_cache, backend=inference_backends.DEFAULT_BACKEND, prefetch=DEFAULT_PREFETCH,
+        prepare_threads=DEFAULT_PREPARE_THREADS):
+    """
+    Transkrybuje zadania potokiem (zdarzenia każdego zadania są oznaczane polem "job_id",
+    domyślnie ścieżką nagrania).
+
+    Args:
+        jobs: Lista zadań w formacie trybu --serve
+        model_cache: Pamięć podręczna modeli (ModelCache) wspólna dla wszystkich zadań
+        prefetch: Liczba nagrań przygotowywanych z wyprzedzeniem (głębokość kolejki)
+        prepare_threads: Liczba wątków etapu przygotowania
+
+    Returns:
+        Krotka (lista wpisów audio_path, output_path, status, ... w kolejności zadań, statystyki potoku)
+    """
+    jobs = [dict(job, job_id=job.get("job_id", job["audio_path"])) for job in jobs]
+    prepared_queue = queue.Queue(maxsize=max(1, prefetch))
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    lock = threading.Lock()
+    next_job = iter(jobs)
+    stats = {
+        "prepare": {"busy": 0.0, "stall": 0.0},
+        "inference": {"busy": 0.0, "stall_input": 0.0, "stall_output": 0.0},
+        "write": {"busy": 0.0, "stall": 0.0}
+    }
+    depths = []
+
+    # Wyniki zadań zbierane ze zdarzeń "completed" i "error" (zgłaszanych także przez wątek zapisu)
+    results = {}
+
+    def collect(event):
+        if event.get("status") in ("completed", "error") and event.get("job_id") in results:
+            results[event["job_id"]].setdefault(event["status"], event)
+
+    def produce(feature_models):
+        while True:
+            with lock:
+                job = next(next_job, None)
+            if job is None:
+                break
+            start = time.perf_counter()
+            # Zdarzenia przygotowania (np. ostrzeżenia o nagłówku) dotyczą tego zadania,
+            # a nie zadania, które właśnie transkrybuje wątek główny
+            whisper_transcribe._thread_event_context.context = {"job_id": job["job_id"]}
+            try:
+                prepared = prepare(job, backend, feature_models.get(_model_key(job, backend)))
+            except Exception:
+                # Błąd zostanie zgłoszony przez transcribe_audio, które powtórzy przygotowanie
+                prepared = None
+            finally:
+                whisper_transcribe._thread_event_context.context = None
+            waited = time.perf_counter()
+            prepared_queue.put((job, prepared))
+            with lock:
+                stats["prepare"]["busy"] += waited - start
+                stats["prepare"]["stall"] += time.perf_counter() - waited
+        prepared_queue.put(None)
+
+    def consume_writes():
+        while True:
+            start = time.perf_counter()
+            task = write_queue.get()
+            stats["write"]["stall"] += time.perf_counter() - start
+            if task is None:
+                break
+            start = time.perf_counter()
+            task()
+            stats["write"]["busy"] += time.perf_counter() - start
+
+    def submit_write(task):
+        start = time.perf_counter()
+        write_queue.put(task)
+        stats["inference"]["stall_output"] += time.perf_counter() - start
+
+    start_time = time.time()
+    whisper_transcribe._event_listeners.append(collect)
+    writer_thread = threading.Thread(target=consume_writes, name="pipeline-write", daemon=True)
+    writer_thread.start()
+    try:
+        # Model pierwszego zadania (zwykle wspólny dla wszystkich) pozwala liczyć spektrogramy w tle;
+        # dla zadań z innym modelem spektrogram powstaje podczas inferencji
+        feature_models = {}
+        if jobs:
+            try:
+                feature_models[_model_key(jobs[0], backend)] = _feature_model(jobs[0], backend, model_cache)
+            except Exception as e:
+                emit_event({"warning": f"Spektrogramy zostaną policzone podczas inferencji: {str(e)}"})
+        producers = [threading.Thread(target=produce, args=(feature_models,), name=f"pipeline-prepare-{i}",
+                                      daemon=True)
+                     for i in range(max(1, prepare_threads))]
+        for thread in producers:
+            thread.start()
+
+        finished_producers = 0
+        while finished_producers < len(producers):
+            waited = time.perf_counter()
+            item = prepared_queue.get()
+            stats["inference"]["stall_input"] += time.perf_counter() - waited
+            if item is None:
+                finished_producers += 1
+                continue
+            job, prepared = item
+            depths.append(prepared_queue.qsize())
+            results[job["job_id"]] = {}
+            whisper_transcribe._event_context["job_id"] = job["job_id"]
+            start = time.perf_counter()
+            try:
+                emit_event({"info": f"Potok: {depths[-1]} nagrań przygotowanych w kolejce",
+                            "queue_depth": depths[-1]})
+                whisper_transcribe.transcribe_audio(job["audio_path"], model_cache=model_cache, prepared=prepared,
+                                                    writer=submit_write,
+                                                    **whisper_transcribe.job_options(job, backend))
+            finally:
+                whisper_transcribe._event_context.pop("job_id", None)
+                stats["inference"]["busy"] += time.perf_counter() - start
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+        whisper_transcribe._event_listeners.remove(collect)
+    # Czas zablokowania na pełnej kolejce zapisu jest wliczony w czas transcribe_audio
+    stats["inference"]["busy"] -= stats["inference"]["stall_output"]
+
+    wall_time = time.time() - start_time
+    entries = []
+    for job in jobs:
+        events = results.get(job["job_id"], {})
+        entry = {"audio_path": job["audio_path"]}
+        if "completed" in events:
+            completed = events["completed"]
+            entry.update({
+                "output_path": completed["output_path"],
+                "status": "completed",
+                "total_time": completed["total_time"],
+                "audio_duration": completed["audio_duration"],
+                "speed_ratio": completed["speed_ratio"]
+            })
+        else:
+            entry.update({"status": "error", "error": events.get("error", {}).get("error", "Nieznany błąd")})
+        entries.append(entry)
+
+    pipeline_stats = {
+        "status": "pipeline_stats",
+        "files": len(jobs),
+        "prefetch": prefetch,
+        "prepare_threads": prepare_threads,
+        "wall_time": wall_time,
+        "inference_utilization": stats["inference"]["busy"] / wall_time if wall_time > 0 else 0,
+        "queue_depth": {
+            "mean": sum(depths) / len(depths) if depths else 0,
+            "max": max(depths) if depths else 0
+        },
+        "stages": stats
+    }
+    emit_event(pipeline_stats)
+    return entries, pipeline_stats
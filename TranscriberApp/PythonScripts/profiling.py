@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pomiar czasu poszczególnych etapów transkrypcji i opcjonalne profilowanie
+(cProfile oraz raport alokacji pamięci z tracemalloc).
+"""
+
+import os
+import sys
+import time
+import cProfile
+import tracemalloc
+
+def peak_rss_mb():
+    """Zwraca szczytowe zużycie pamięci procesu (MB) lub None, jeśli nie da się go odczytać."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize / (1024 * 1024)
+        except (AttributeError, OSError):
+            pass
+        return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje wartość w KB, macOS w bajtach
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def torch_threads():
+    """Zwraca liczbę wątków obliczeniowych torch (tylko jeśli torch jest już zaimportowany)."""
+    torch = sys.modules.get("torch")
+    if torch is None or not hasattr(torch, "get_num_threads"):
+        return None
+    return torch.get_num_threads()
+
+class PhaseTracker:
+    """
+    Mierzy kolejne etapy przetwarzania. Rozpoczęcie etapu kończy poprzedni,
+    a zakończenie każdego etapu jest zgłaszane jako zdarzenie JSON z polem "span".
+    """
+
+    def __init__(self, emit):
+        self._emit = emit
+        self._current = None
+        self._started = None
+        self.durations = {}
+
+    def enter(self, name):
+        """Kończy bieżący etap i rozpoczyna etap name."""
+        self.finish()
+        self._current = name
+        self._started = time.perf_counter()
+
+    def finish(self):
+        """Kończy bieżący etap (jeśli trwa) i wysyła zdarzenie z jego czasem."""
+        if self._current is None:
+            return
+        duration = time.perf_counter() - self._started
+        name, self._current = self._current, None
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        self._emit({
+            "span": name,
+            "duration": duration,
+            "peak_rss_mb": peak_rss_mb(),
+            "torch_threads": torch_threads()
+        })
+
+def run_profiled(fn, base_path, top_n=25):
+    """
+    Wywołuje fn() pod kontrolą cProfile i tracemalloc.
+    Zapisuje base_path.prof (do analizy np. w snakeviz lub pstats)
+    oraz base_path.alloc.txt z top_n miejscami alokującymi najwięcej pamięci.
+
+    Returns:
+        Krotka (wynik fn, ścieżka .prof, ścieżka .alloc.txt)
+    """
+    profile_path = base_path + ".prof"
+    alloc_path = base_path + ".alloc.txt"
+
+    tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(profile_path)
+
+        stats = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )).statistics('lineno')
+        with open(alloc_path, 'w', encoding='utf-8') as f:
+            f.write(f"Pamięć śledzona przez tracemalloc: bieżąca {current / 1024 / 1024:.1f} MB, "
+                    f"szczytowa {peak / 1024 / 1024:.1f} MB\n")
+            f.write(f"Największe alokacje (top {top_n}):\n\n")
+            for index, stat in enumerate(stats[:top_n], 1):
+                frame = stat.traceback[0]
+                f.write(f"{index:3d}. {os.path.basename(frame.filename)}:{frame.lineno} "
+                        f"- {stat.size / 1024:.1f} KB w {stat.count} blokach\n")
+    return result, profile_path, alloc_path
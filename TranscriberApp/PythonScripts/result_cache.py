@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pamięć podręczna wyników transkrypcji adresowana treścią nagrania.
+Klucz to skrót SHA-256 zawartości pliku audio oraz opcji wpływających na wynik,
+a wpis przechowuje surowy słownik wyniku Whisper (text, segments, language).
+"""
+
+import os
+import json
+import time
+import hashlib
+
+from app_paths import data_dir
+
+# Domyślny limit rozmiaru pamięci podręcznej (MB)
+DEFAULT_MAX_MB = 512
+
+# Wersja formatu wpisów - zmiana unieważnia wszystkie zapisane wyniki
+CACHE_VERSION = 1
+
+# Rozmiar bloku przy liczeniu skrótu pliku
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_digest(path):
+    """Zwraca skrót SHA-256 zawartości pliku (szesnastkowo)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _json_default(value):
+    """Serializacja typów numpy występujących w wynikach Whisper."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+class ResultCache:
+    """Katalog z wynikami transkrypcji i usuwaniem najdawniej używanych wpisów (LRU)."""
+
+    def __init__(self, directory=None, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory or data_dir("results")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def make_key(self, audio_digest, options):
+        """Buduje klucz z treści nagrania i opcji transkrypcji."""
+        payload = json.dumps({"audio": audio_digest, "options": options, "version": CACHE_VERSION},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Zwraca zapisany wynik lub None. Trafienie odświeża czas użycia wpisu."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("result")
+
+    def put(self, key, result, metadata=None):
+        """Zapisuje wynik i w razie potrzeby usuwa najdawniej używane wpisy."""
+        entry = {"result": result, "created": time.time(), "metadata": metadata or {}}
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, default=_json_default)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Usuwa najdawniej używane wpisy, aż rozmiar zmieści się w limicie."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pełnotekstowy indeks transkrypcji (SQLite FTS5).
+Każdy segment (plik, początek, koniec, tekst, model, język) trafia do indeksu, który jest
+aktualizowany przyrostowo: pliki bez zmian (ten sam czas modyfikacji i rozmiar lub ten sam skrót)
+są pomijane. Wyniki wyszukiwania są uszeregowane według trafności (bm25), a znaczniki czasu
+podawane w milisekundach.
+
+Przykład:
+    python transcript_index.py index
+    python transcript_index.py search "budżet na przyszły rok" --limit 10
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+from app_paths import data_dir, transcriptions_dir
+from result_cache import file_digest
+
+# Wersja schematu bazy - zmiana powoduje przebudowę indeksu
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    audio_path TEXT,
+    model TEXT,
+    language TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_file ON segments(file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# Linia segmentu w pliku .md: **[MM:SS -> MM:SS]** tekst (dopuszczalne również H:MM:SS)
+_SEGMENT_LINE = re.compile(r"^\*\*\[((?:\d+:)?\d+:\d{2}) -> ((?:\d+:)?\d+:\d{2})\]\*\* ?(.*)$")
+_HEADER_FIELDS = {"**Plik:**": "audio_path", "**Model:**": "model", "**Język:**": "language"}
+
+def default_db_path():
+    """Domyślne położenie bazy indeksu w katalogu danych aplikacji."""
+    return os.path.join(data_dir("index"), "transcripts.sqlite")
+
+def _timestamp_ms(text):
+    """Zamienia znacznik czasu [H:]MM:SS na milisekundy."""
+    seconds = 0
+    for part in text.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds * 1000
+
+def parse_markdown(path):
+    """
+    Odczytuje nagłówek i segmenty z pliku .md zapisanego przez whisper_transcribe.
+
+    Returns:
+        Krotka (metadane, lista segmentów {start_ms, end_ms, text})
+    """
+    metadata = {}
+    segments = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip("\n")
+            match = _SEGMENT_LINE.match(line)
+            if match:
+                if match.group(3).strip():
+                    segments.append({
+                        "start_ms": _timestamp_ms(match.group(1)),
+                        "end_ms": _timestamp_ms(match.group(2)),
+                        "text": match.group(3).strip()
+                    })
+                continue
+            for prefix, field in _HEADER_FIELDS.items():
+                if line.startswith(prefix) and field not in metadata:
+                    metadata[field] = line[len(prefix):].strip()
+    return metadata, segments
+
+def to_match_query(query):
+    """Zamienia zwykły tekst na zapytanie FTS5: wszystkie słowa muszą wystąpić (bez składni FTS5)."""
+    words = re.findall(r"\w+", query)
+    return " ".join('"' + word + '"' for word in words)
+
+class TranscriptIndex:
+    """Indeks segmentów transkrypcji w bazie SQLite z tabelą FTS5."""
+
+    def __init__(self, path=None):
+        self.path = path or default_db_path()
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS segments_fts; DROP TABLE IF EXISTS segments; DROP TABLE IF EXISTS files;"
+            )
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _replace_file(self, path, stat, digest, metadata, segments):
+        """Zastępuje wpis pliku i wszystkie jego segmenty (w jednej transakcji)."""
+        with self.connection:
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+            cursor = self.connection.execute(
+                "INSERT INTO files (path, mtime, size, sha256, audio_path, model, language, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_mtime, stat.st_size, digest, metadata.get("audio_path"),
+                 metadata.get("model"), metadata.get("language"), time.time())
+            )
+            self.connection.executemany(
+                "INSERT INTO segments (file_id, start_ms, end_ms, text) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, s["start_ms"], s["end_ms"], s["text"]) for s in segments]
+            )
+
+    def index_file(self, path):
+        """
+        Indeksuje plik .md, jeśli zmienił się od ostatniego indeksowania.
+
+        Returns:
+            True, jeśli plik został (ponownie) zaindeksowany
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.connection.execute("SELECT mtime, size, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            return False
+        digest = file_digest(path)
+        if row is not None and row[2] == digest:
+            with self.connection:
+                self.connection.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                                        (stat.st_mtime, stat.st_size, path))
+            return False
+        metadata, segments = parse_markdown(path)
+        self._replace_file(path, stat, digest, metadata, segments)
+        return True
+
+    def index_result(self, path, audio_path, result, model_size, language):
+        """
+        Indeksuje świeżo zapisany plik .md bezpośrednio z wyniku transkrypcji
+        (z pełną dokładnością znaczników czasu, bez ponownego czytania pliku).
+        """
+        path = os.path.abspath(path)
+        segments = [
+            {"start_ms": int(round(s["start"] * 1000)), "end_ms": int(round(s["end"] * 1000)),
+             "text": s["text"].strip()}
+            for s in result.get("segments", []) if s["text"].strip()
+        ]
+        metadata = {"audio_path": os.path.abspath(audio_path), "model": model_size,
+                    "language": result.get("language") or language}
+        self._replace_file(path, os.stat(path), file_digest(path), metadata, segments)
+
+    def update_directory(self, directory=None):
+        """
+        Aktualizuje indeks dla wszystkich plików .md w katalogu (rekurencyjnie)
+        i usuwa wpisy plików, które z niego zniknęły.
+
+        Returns:
+            Słownik z liczbą plików zaindeksowanych, niezmienionych i usuniętych
+        """
+        directory = os.path.abspath(directory or transcriptions_dir())
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        seen = set()
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if not name.endswith('.md'):
+                    continue
+                path = os.path.join(root, name)
+                seen.add(path)
+                try:
+                    stats["indexed" if self.index_file(path) else "unchanged"] += 1
+                except (OSError, UnicodeDecodeError):
+                    stats["failed"] += 1
+
+        prefix = os.path.join(directory, "")
+        stale = [path for (path,) in self.connection.execute("SELECT path FROM files")
+                 if path.startswith(prefix) and path not in seen]
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in stale])
+        stats["removed"] = len(stale)
+        return stats
+
+    def search(self, query, limit=20, raw=False):
+        """
+        Wyszukuje segmenty pasujące do zapytania.
+
+        Args:
+            query: Szukany tekst (lub zapytanie w składni FTS5, jeśli raw=True)
+            limit: Maksymalna liczba wyników
+            raw: Czy przekazać zapytanie bez zmian do FTS5
+
+        Returns:
+            Lista trafień uszeregowana od najlepszego (path, audio_path, start_ms, end_ms, text, snippet, score)
+        """
+        match = query if raw else to_match_query(query)
+        if not match:
+            return []
+        rows = self.connection.execute(
+            "SELECT f.path, f.audio_path, f.model, f.language, s.start_ms, s.end_ms, s.text, "
+            "       snippet(segments_fts, 0, '**', '**', '...', 16), bm25(segments_fts) AS score "
+            "FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid JOIN files f ON f.id = s.file_id "
+            "WHERE segments_fts MATCH ? ORDER BY score LIMIT ?",
+            (match, limit)
+        ).fetchall()
+        return [
+            {"path": path, "audio_path": audio_path, "model": model, "language": language,
+             "start_ms": start_ms, "end_ms": end_ms, "text": text, "snippet": snippet, "score": -score}
+            for path, audio_path, model, language, start_ms, end_ms, text, snippet, score in rows
+        ]
+
+def emit_event(event):
+    """Wypisuje zdarzenie JSON na standardowe wyjście i natychmiast je opróżnia."""
+    print(json.dumps(event))
+    sys.stdout.flush()
+
+def setup_args():
+    """Konfiguracja parsera argumentów wiersza poleceń."""
+    parser = argparse.ArgumentParser(description='Pełnotekstowy indeks transkrypcji')
+    parser.add_argument('--db', type=str, help='Ścieżka bazy indeksu (domyślnie w katalogu danych aplikacji)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = commands.add_parser('index', help='Zaktualizuj indeks (tylko zmienione pliki)')
+    index_parser.add_argument('directories', nargs='*', help='Katalogi z plikami .md (domyślnie transcriptions)')
+
+    search_parser = commands.add_parser('search', help='Wyszukaj w transkrypcjach')
+    search_parser.add_argument('query', type=str, help='Szukany tekst')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maksymalna liczba wyników')
+    search_parser.add_argument('--raw', action='store_true', help='Zapytanie w składni FTS5 (AND, OR, NEAR, "fraza", prefiks*)')
+    return parser.parse_args()
+
+def main():
+    """Główna funkcja skryptu."""
+    args = setup_args()
+    try:
+        with TranscriptIndex(args.db) as index:
+            if args.command == 'index':
+                start_time = time.time()
+                totals = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+                for directory in args.directories or [transcriptions_dir()]:
+                    stats = index.update_directory(directory)
+                    for key in totals:
+                        totals[key] += stats[key]
+                emit_event({"status": "completed", "db_path": index.path,
+                            "total_time": time.time() - start_time, **totals})
+            else:
+                hits = index.search(args.query, args.limit, args.raw)
+                emit_event({"status": "completed", "query": args.query, "hits": hits})
+        return 0
+    except (sqlite3.Error, OSError) as e:
+        emit_event({"error": str(e), "status": "error"})
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+Prosty detektor aktywności mowy (energia + współczynnik przejść przez zero).
+Służy do wycięcia długich fragmentów ciszy przed transkrypcją i odtworzenia
+oryginalnych znaczników czasu w wynikach Whisper.
+"""
+
+import numpy as np
+
+# Długość ramki analizy (sekundy)
+FRAME_SECONDS = 0.03
+
+# Margines ponad poziomem szumu tła (dB), od którego ramka jest uznawana za mowę
+ENERGY_MARGIN_DB = 12.0
+
+# Bezwzględny próg energii (dBFS) - ramki cichsze nigdy nie są mową
+MIN_ENERGY_DB = -60.0
+
+# Zakres współczynnika przejść przez zero typowy dla głosek szumowych (s, sz, f)
+FRICATIVE_ZCR_RANGE = (0.25, 0.6)
+
+# Margines dodawany przed i po każdym fragmencie mowy (sekundy)
+PADDING_SECONDS = 0.4
+
+# Najkrótszy fragment mowy, który zostaje zachowany (sekundy)
+MIN_SPEECH_SECONDS = 0.15
+
+# Przerwa wstawiana pomiędzy sklejonymi fragmentami mowy (sekundy)
+JOIN_GAP_SECONDS = 0.2
+
+def _runs(mask):
+    """Zwraca pary (początek, koniec) ciągów wartości True w tablicy logicznej."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges.reshape(-1, 2)
+
+def detect_speech(audio, sample_rate, min_silence=2.0):
+    """
+    Wyznacza fragmenty mowy w nagraniu.
+
+    Args:
+        audio: Tablica float32 (mono)
+        sample_rate: Częstotliwość próbkowania
+        min_silence: Najkrótsza przerwa (sekundy), która zostanie usunięta
+
+    Returns:
+        Lista par (początek, koniec) w próbkach, posortowana i bez nakładania się
+    """
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frame - 1 or 1)
+
+    # Poziom szumu tła szacowany z najcichszych ramek
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(noise_floor + ENERGY_MARGIN_DB, MIN_ENERGY_DB)
+    speech = energy_db > threshold
+    fricative = ((zcr >= FRICATIVE_ZCR_RANGE[0]) & (zcr <= FRICATIVE_ZCR_RANGE[1])
+                 & (energy_db > threshold - 6.0))
+    speech |= fricative
+
+    # Usunięcie zbyt krótkich fragmentów mowy (trzaski, kliknięcia)
+    min_speech_frames = max(1, int(round(MIN_SPEECH_SECONDS / FRAME_SECONDS)))
+    for start, end in _runs(speech):
+        if end - start < min_speech_frames:
+            speech[start:end] = False
+
+    # Wypełnienie przerw krótszych niż min_silence
+    min_silence_frames = int(round(min_silence / FRAME_SECONDS))
+    for start, end in _runs(~speech):
+        if start > 0 and end < n_frames and end - start < min_silence_frames:
+            speech[start:end] = True
+
+    padding = int(PADDING_SECONDS * sample_rate)
+    regions = []
+    for start, end in _runs(speech):
+        region_start = max(0, start * frame - padding)
+        region_end = min(len(audio), end * frame + padding)
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region_end)
+        else:
+            regions.append((region_start, region_end))
+    return regions
+
+class Timeline:
+    """Odwzorowanie czasu w sklejonym nagraniu na czas w nagraniu oryginalnym."""
+
+    def __init__(self, packed_starts, original_starts, lengths, sample_rate):
+        self.packed_starts = np.asarray(packed_starts, dtype=np.int64)
+        self.original_starts = np.asarray(original_starts, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.sample_rate = sample_rate
+
+    def to_original(self, seconds):
+        """Zamienia czas (sekundy) w sklejonym nagraniu na czas w oryginale."""
+        position = int(round(seconds * self.sample_rate))
+        index = max(0, int(np.searchsorted(self.packed_starts, position, side='right')) - 1)
+        offset = min(max(position - self.packed_starts[index], 0), self.lengths[index])
+        return float(self.original_starts[index] + offset) / self.sample_rate
+
+def pack_speech(audio, regions, sample_rate):
+    """
+    Skleja fragmenty mowy w jedną tablicę, oddzielając je krótką ciszą.
+
+    Returns:
+        Krotka (sklejone audio, Timeline)
+    """
+    gap = int(JOIN_GAP_SECONDS * sample_rate)
+    total = sum(end - start for start, end in regions) + gap * max(0, len(regions) - 1)
+    packed = np.zeros(total, dtype=np.float32)
+
+    packed_starts, original_starts, lengths = [], [], []
+    position = 0
+    for start, end in regions:
+        length = end - start
+        packed[position:position + length] = audio[start:end]
+        packed_starts.append(position)
+        original_starts.append(start)
+        lengths.append(length)
+        position += length + gap
+    return packed, Timeline(packed_starts, original_starts, lengths, sample_rate)
+
+def remap_result(result, timeline):
+    """Przelicza znaczniki czasu segmentów (i słów) wyniku Whisper na czas oryginalnego nagrania."""
+    for segment in result.get("segments", []):
+        remap_segment(segment, timeline)
+    return result
+
+def remap_segment(segment, timeline):
+    """Przelicza znaczniki czasu jednego segmentu (i jego słów)."""
+    segment["start"] = timeline.to_original(segment["start"])
+    segment["end"] = max(segment["start"], timeline.to_original(segment["end"]))
+    for word in segment.get("words", []) or []:
+        word["start"] = timeline.to_original(word["start"])
+        word["end"] = max(word["start"], timeline.to_original(word["end"]))
+    return segment
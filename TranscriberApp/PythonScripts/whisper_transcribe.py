@@ -12,57 +12,334 @@ import json
 import argparse
 import time
 from datetime import datetime
-import wave
-import contextlib
 import math
+import gc
+import shutil
+import sqlite3
+import threading
+import importlib.util
+from collections import OrderedDict
 
+from app_paths import data_dir, transcriptions_dir
+import cascade
+import checkpoint
+import cpu_tuning
+import eta_history
+import feature_cache
+import inference_backends
+import mp3_info
+import profiling
+import result_cache
+import transcript_index
+
+# Whisper i torch są importowane leniwie (import torch trwa kilka sekund) - dostępność
+# sprawdzamy jedynie wyszukaniem modułów, bez ich importowania
+WHISPER_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("whisper", "torch"))
+whisper = None
+torch = None
+
+# Moduły przetwarzania audio wymagają jedynie NumPy (instalowanego razem z Whisper)
 try:
-    import whisper
-    import torch
-    WHISPER_AVAILABLE = True
+    import numpy as np
+    import audio_decoder
+    import vad
+    import parallel_transcribe
 except ImportError:
-    WHISPER_AVAILABLE = False
+    pass
+
+# Przybliżone zużycie pamięci RAM przez modele Whisper w MB (wagi fp32)
+MODEL_MEMORY_MB = {
+    'tiny': 150,
+    'base': 290,
+    'small': 970,
+    'medium': 3060,
+    'large': 6170
+}
+
+# Długość okna w trybie strumieniowym (sekundy) - odpowiada oknu kontekstu Whisper
+STREAM_WINDOW_SECONDS = 30
+
+# Tryb --follow: nagranie uznaje się za zakończone, gdy plik nie rośnie przez tyle sekund
+FOLLOW_IDLE_SECONDS = 5
+
+# Tryb --follow: odstęp (sekundy) między kolejnymi sprawdzeniami przyrostu pliku
+FOLLOW_POLL_SECONDS = 1.0
+
+# Domyślna liczba krótkich nagrań transkrybowanych razem (transcribe_clips)
+CLIP_BATCH_SIZE = 8
+
+# Dodatkowe pola dołączane do każdego zdarzenia JSON (np. job_id w trybie --serve)
+_event_context = {}
+
+# Pola zdarzeń zgłaszanych przez bieżący wątek, zastępujące _event_context (np. wątki przygotowania potoku,
+# które pracują nad innym zadaniem niż wątek główny)
+_thread_event_context = threading.local()
+
+# Zdarzenia zgłaszane jednocześnie z kilku wątków nie mogą się przeplatać na standardowym wyjściu
+_emit_lock = threading.Lock()
+
+# Funkcje wywoływane dla każdego zdarzenia (np. zbieranie wyników w trybie wsadowym)
+_event_listeners = []
+
+# Wątek importujący whisper i torch w tle oraz ewentualny błąd importu
+_backend_thread = None
+_backend_error = None
+
+def emit_event(event, context=None):
+    """
+    Wypisuje zdarzenie JSON na standardowe wyjście i natychmiast je opróżnia.
+    context zastępuje bieżący _event_context (zdarzenia zadania zgłaszane później z innego wątku);
+    bez niego używane są pola ustawione dla bieżącego wątku w _thread_event_context.context, jeśli są.
+    """
+    if context is None:
+        context = getattr(_thread_event_context, "context", None)
+    if context is None:
+        context = _event_context
+    if context:
+        event = {**event, **context}
+    for listener in _event_listeners:
+        listener(event)
+    line = json.dumps(event) + "\n"
+    with _emit_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
 
 def setup_args():
     """Konfiguracja parsera argumentów wiersza poleceń."""
     parser = argparse.ArgumentParser(description='Transkrypcja audio za pomocą Whisper AI')
-    parser.add_argument('audio_path', type=str, help='Ścieżka do pliku audio')
+    parser.add_argument('audio_path', type=str, nargs='?', help='Ścieżka do pliku audio')
     parser.add_argument('--output', '-o', type=str, help='Ścieżka do pliku wyjściowego')
     parser.add_argument('--model', type=str, default='small', help='Model Whisper (tiny, base, small, medium, large)')
     parser.add_argument('--language', type=str, default='pl', help='Język transkrypcji (domyślnie polski)')
     parser.add_argument('--punctuation', action='store_true', help='Dodaj automatycznie interpunkcję')
     parser.add_argument('--best_of', type=int, default=1, help='Parametr best_of dla Whisper')
     parser.add_argument('--beam_size', type=int, default=1, help='Parametr beam_size dla Whisper')
-    return parser.parse_args()
+    parser.add_argument('--stream', action='store_true',
+                        help='Transkrypcja w oknach 30 s z bieżącym zapisem segmentów do pliku wyjściowego')
+    parser.add_argument('--follow', action='store_true',
+                        help='Transkrybuj nagranie WAV w trakcie jego zapisywania (kończy, gdy plik przestaje rosnąć)')
+    parser.add_argument('--follow-idle', type=float, default=FOLLOW_IDLE_SECONDS,
+                        help='Po ilu sekundach bez przyrostu pliku --follow uznaje nagranie za zakończone')
+    parser.add_argument('--no-checkpoint', action='store_true',
+                        help='Nie zapisuj punktów kontrolnych w trybie --stream (i nie wznawiaj od nich)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Dekoduj do pliku tymczasowego i transkrybuj w oknach (pamięć niezależna od długości nagrania)')
+    parser.add_argument('--vad', action='store_true',
+                        help='Usuń długie fragmenty ciszy przed transkrypcją (detektor aktywności mowy)')
+    parser.add_argument('--vad-min-silence', type=float, default=2.0,
+                        help='Najkrótsza przerwa (sekundy) usuwana przez --vad')
+    parser.add_argument('--parallel', type=int, default=0,
+                        help='Liczba procesów do równoległej transkrypcji długich nagrań na CPU (0 - wyłączone)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Nie korzystaj z pamięci podręcznej wyników transkrypcji')
+    parser.add_argument('--cache-max-mb', type=int, default=None,
+                        help='Limit rozmiaru pamięci podręcznej wyników (MB, domyślnie 512)')
+    parser.add_argument('--cascade', type=str, default=None, metavar='MODEL_WSTĘPNY',
+                        help='Kaskada: szybki model (np. tiny) transkrybuje całość, a --model dekoduje ponownie niepewne fragmenty')
+    parser.add_argument('--cascade-logprob', type=float, default=cascade.DEFAULT_LOGPROB_THRESHOLD,
+                        help='Kaskada: segment z niższym avg_logprob jest niepewny')
+    parser.add_argument('--cascade-compression', type=float, default=cascade.DEFAULT_COMPRESSION_THRESHOLD,
+                        help='Kaskada: segment z wyższym compression_ratio jest niepewny')
+    parser.add_argument('--cascade-no-speech', type=float, nargs=2, default=list(cascade.DEFAULT_NO_SPEECH_RANGE),
+                        metavar=('OD', 'DO'), help='Kaskada: segment z no_speech_prob w tym zakresie jest niepewny')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help='Nie korzystaj z pamięci podręcznej spektrogramów (ponowne dekodowanie audio)')
+    parser.add_argument('--feature-cache-max-mb', type=int, default=None,
+                        help='Limit rozmiaru pamięci podręcznej spektrogramów (MB, domyślnie 2048)')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Nie dodawaj transkrypcji do pełnotekstowego indeksu (transcript_index.py)')
+    parser.add_argument('--decoder', type=str, default='auto', choices=['auto', 'ffmpeg'],
+                        help='Dekodowanie audio: auto (natywnie dla WAV, ffmpeg dla innych formatów) lub ffmpeg')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profiluj transkrypcję (cProfile i tracemalloc); raporty obok pliku wyjściowego')
+    parser.add_argument('--profile-top', type=int, default=25,
+                        help='Liczba największych alokacji w raporcie --profile')
+    parser.add_argument('--backend', type=str, default=inference_backends.DEFAULT_BACKEND,
+                        choices=list(inference_backends.BACKENDS),
+                        help='Silnik inferencji: openai (fp32), torch-int8, ctranslate2 (faster-whisper, int8) lub stub')
+    parser.add_argument('--model-dir', type=str, default=None,
+                        help='Lokalny katalog modelu CTranslate2 (dla --backend ctranslate2)')
+    parser.add_argument('--preflight', action='store_true',
+                        help='Szybki raport o środowisku (urządzenie, pobrane modele, ffmpeg) bez ładowania Whisper')
+    parser.add_argument('--autotune', action='store_true',
+                        help='Dobierz liczbę wątków i równoległych zadań na CPU dla --model i --backend (zapisywane dla komputera)')
+    parser.add_argument('--autotune-seconds', type=float, default=cpu_tuning.DEFAULT_CLIP_SECONDS,
+                        help='Długość nagrania kalibracyjnego --autotune (sekundy)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Tryb pracy ciągłej: zadania JSON (po jednym w linii) ze standardowego wejścia')
+    parser.add_argument('--model-cache-mb', type=int, default=4096,
+                        help='Limit pamięci RAM (MB) dla modeli trzymanych w trybie --serve')
+    args = parser.parse_args()
+    if not args.serve and not args.preflight and not args.autotune and not args.audio_path:
+        parser.error('wymagana jest ścieżka do pliku audio (lub opcja --serve, --preflight albo --autotune)')
+    if args.follow and not (args.audio_path or '').lower().endswith('.wav'):
+        parser.error('--follow obsługuje tylko nagrania WAV')
+    if args.cascade and (args.stream or args.follow or args.low_memory or args.parallel > 1):
+        parser.error('--cascade nie działa z --stream, --follow, --low-memory ani --parallel')
+    return args
 
-def check_dependencies():
-    """Sprawdza, czy wymagane zależności są zainstalowane."""
-    missing_deps = []
-    
+def check_dependencies(backend=inference_backends.DEFAULT_BACKEND):
+    """
+    Sprawdza, czy zależności wybranego silnika są zainstalowane (bez importowania ich).
+    Moduły importowane na początku skryptu importują NumPy warunkowo, żeby jego brak
+    został zgłoszony stąd zdarzeniem JSON z listą brakujących bibliotek, a nie wyjątkiem przy imporcie.
+    """
+    return inference_backends.missing_dependencies(backend)
+
+def _import_backend():
+    """Importuje whisper i torch do zmiennych globalnych modułu (w wątku w tle)."""
+    global whisper, torch, _backend_error
     try:
-        import whisper
-    except ImportError:
-        missing_deps.append("whisper")
-    
+        import whisper as whisper_module
+        import torch as torch_module
+        whisper, torch = whisper_module, torch_module
+    except Exception as e:
+        _backend_error = e
+
+def start_backend_import():
+    """
+    Rozpoczyna import whisper i torch w wątku w tle, aby nałożył się na inne prace
+    (np. dekodowanie audio). Kolejne wywołania nic nie robią.
+    """
+    global _backend_thread
+    if _backend_thread is None:
+        _backend_thread = threading.Thread(target=_import_backend, name="backend-import", daemon=True)
+        _backend_thread.start()
+
+def require_backend():
+    """
+    Czeka na zakończenie importu whisper i torch (rozpoczynając go w razie potrzeby).
+
+    Returns:
+        Krotka (whisper, torch)
+    """
+    start_backend_import()
+    _backend_thread.join()
+    if _backend_error is not None:
+        raise ImportError(f"Nie można zaimportować whisper/torch: {str(_backend_error)}")
+    return whisper, torch
+
+def whisper_cache_dir():
+    """Katalog, w którym Whisper przechowuje pobrane wagi modeli."""
+    default_cache = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default_cache), "whisper")
+
+def detect_cuda_devices():
+    """
+    Zwraca liczbę kart CUDA widocznych dla sterownika, bez importowania torch
+    (bezpośrednio przez bibliotekę sterownika; 0, jeśli sterownika nie ma).
+    """
+    import ctypes
+    names = ("nvcuda.dll",) if sys.platform == "win32" else ("libcuda.so.1", "libcuda.so", "libcuda.dylib")
+    for name in names:
+        try:
+            cuda = ctypes.CDLL(name)
+        except OSError:
+            continue
+        count = ctypes.c_int(0)
+        if cuda.cuInit(0) != 0 or cuda.cuDeviceGetCount(ctypes.byref(count)) != 0:
+            return 0
+        return count.value
+    return 0
+
+def preflight():
+    """
+    Szybki raport o środowisku (bez importowania whisper i torch): zależności,
+    przewidywane urządzenie, pobrane modele i dostępność ffmpeg.
+    """
+    cache_dir = whisper_cache_dir()
     try:
-        import torch
-    except ImportError:
-        missing_deps.append("torch")
-    
-    return missing_deps
+        models = sorted(os.path.splitext(name)[0] for name in os.listdir(cache_dir) if name.endswith('.pt'))
+    except OSError:
+        models = []
+    cuda_devices = detect_cuda_devices()
+    missing_deps = [name for name in ("whisper", "torch", "numpy") if importlib.util.find_spec(name) is None]
+    emit_event({
+        "status": "preflight",
+        "python": sys.version.split()[0],
+        "missing_deps": missing_deps,
+        "backends": {name: not inference_backends.missing_dependencies(name) for name in inference_backends.BACKENDS},
+        "device": "cuda" if cuda_devices else "cpu",
+        "cuda_devices": cuda_devices,
+        "models": models,
+        "models_dir": cache_dir,
+        "ffmpeg": shutil.which("ffmpeg"),
+        "ffprobe": shutil.which("ffprobe")
+    })
+    return 0 if not missing_deps else 1
+
+def model_memory_mb(model_size, backend=inference_backends.DEFAULT_BACKEND):
+    """Szacowane zużycie pamięci RAM przez model danego silnika (MB)."""
+    fp32_mb = MODEL_MEMORY_MB.get(model_size, MODEL_MEMORY_MB['large'])
+    return fp32_mb * inference_backends.MEMORY_RATIO[backend]
+
+class ModelCache:
+    """
+    Pamięć podręczna załadowanych modeli Whisper (LRU) z limitem pamięci RAM.
+    Pozwala procesowi w trybie --serve obsługiwać kolejne zadania bez ponownego ładowania modelu.
+    """
+
+    def __init__(self, budget_mb):
+        self.budget_mb = budget_mb
+        self._models = OrderedDict()
+
+    def used_mb(self):
+        """Zwraca szacowane zużycie pamięci przez trzymane modele (MB)."""
+        return sum(size_mb for _, size_mb in self._models.values())
+
+    def get(self, model_size, device, backend=inference_backends.DEFAULT_BACKEND, model_dir=None, cpu_threads=None):
+        """
+        Zwraca model (ładując go w razie potrzeby) oraz informację, czy pochodził z pamięci podręcznej.
+        """
+        key = (model_size, device, backend, model_dir)
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key][0], True
+
+        if inference_backends.uses_torch(backend):
+            require_backend()
+        needed_mb = model_memory_mb(model_size, backend)
+        while self._models and self.used_mb() + needed_mb > self.budget_mb:
+            evicted_key, _ = self._models.popitem(last=False)
+            emit_event({"info": f"Zwalniam model z pamięci: {evicted_key[0]} ({evicted_key[1]}, {evicted_key[2]})"})
+        gc.collect()
+        if device == "cuda" and torch is not None:
+            torch.cuda.empty_cache()
+
+        model = inference_backends.load_model(backend, model_size, device, model_dir, cpu_threads)
+        # Rzeczywisty rozmiar wag, jeśli da się go policzyć
+        size_mb = model.size_mb()
+        if size_mb is not None:
+            needed_mb = size_mb
+        self._models[key] = (model, needed_mb)
+        return model, False
+
+    def stats(self):
+        """Zwraca opis zawartości pamięci podręcznej."""
+        return {
+            "models": [f"{size}:{device}:{backend}" for size, device, backend, _ in self._models],
+            "used_mb": round(self.used_mb(), 1),
+            "budget_mb": self.budget_mb
+        }
 
 def get_audio_duration(audio_path):
-    """Pobiera długość pliku audio w sekundach."""
+    """
+    Pobiera długość pliku audio w sekundach na podstawie samych nagłówków (bez dekodowania).
+    Zwraca None, jeśli długości nie da się ustalić - zostanie wtedy obliczona ze zdekodowanych próbek.
+    """
     # Dla plików WAV
-    if audio_path.lower().endswith('.wav'):
+    if audio_decoder.can_decode(audio_path):
         try:
-            with contextlib.closing(wave.open(audio_path, 'r')) as f:
-                frames = f.getnframes()
-                rate = f.getframerate()
-                duration = frames / float(rate)
-                return duration
-        except Exception as e:
-            print(json.dumps({"warning": f"Nie można określić długości pliku WAV: {str(e)}"}))
+            return audio_decoder.read_wav_info(audio_path).duration
+        except (OSError, audio_decoder.WavFormatError) as e:
+            emit_event({"warning": f"Nie można określić długości pliku WAV: {str(e)}"})
+    
+    # Dla plików MP3 (nagłówek Xing/Info, VBRI lub przepływność ramki)
+    if mp3_info.can_parse(audio_path):
+        try:
+            return mp3_info.read_mp3_duration(audio_path)
+        except (OSError, mp3_info.Mp3FormatError) as e:
+            emit_event({"warning": f"Nie można odczytać nagłówka MP3: {str(e)}"})
     
     # Próba użycia ffprobe do innych formatów
     try:
@@ -75,15 +352,24 @@ def get_audio_duration(audio_path):
         )
         return float(result.stdout)
     except Exception as e:
-        print(json.dumps({"warning": f"Nie można określić długości pliku audio: {str(e)}"}))
-        # Zwróć szacunkową długość (10 minut)
-        return 600
+        emit_event({"warning": f"Nie można określić długości pliku audio przed dekodowaniem: {str(e)}"})
+        return None
 
-def estimate_completion_time(audio_duration, model_size, device):
+def history_model_key(model_size, backend=inference_backends.DEFAULT_BACKEND):
+    """Nazwa modelu w historii wydajności (każdy silnik ma własne pomiary)."""
+    return model_size if backend == inference_backends.DEFAULT_BACKEND else f"{model_size}/{backend}"
+
+def estimate_completion_time(audio_duration, model_size, device, backend=inference_backends.DEFAULT_BACKEND):
     """
     Szacuje czas potrzebny do ukończenia transkrypcji w sekundach.
     Bazuje na długości pliku audio, wybranym modelu i urządzeniu (CPU/GPU).
+    Jeśli na tym komputerze zmierzono już wydajność danego modelu, używa historii pomiarów,
+    a stałe współczynniki służą tylko przy pierwszym uruchomieniu.
     """
+    calibrated_time = eta_history.estimate(audio_duration, history_model_key(model_size, backend), device)
+    if calibrated_time is not None:
+        return max(5, calibrated_time)
+    
     # Współczynniki prędkości dla różnych modeli i urządzeń
     # (wartości oparte na przybliżonych pomiarach)
     speed_factors = {
@@ -126,7 +412,304 @@ def format_time_remaining(seconds):
         minutes_remainder = int((seconds % 3600) / 60)
         return f"{hours} godz. {minutes_remainder} min."
 
-def transcribe_audio(audio_path, output_path=None, model_size='small', language='pl', add_punctuation=False, best_of=1, beam_size=1):
+def default_output_path(audio_path, output_dir=None):
+    """Zwraca ścieżkę pliku .md dla nagrania (domyślnie w katalogu 'transcriptions')."""
+    if output_dir is None:
+        output_dir = transcriptions_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(audio_path))[0]
+    return os.path.join(output_dir, f"{base_name}.md")
+
+def load_audio(audio_path, decoder='auto', low_memory=False):
+    """
+    Dekoduje nagranie do tablicy float32 (16 kHz, mono) oczekiwanej przez Whisper.
+    Pliki WAV PCM/float są dekodowane natywnie, pozostałe formaty przez ffmpeg.
+    Z low_memory próbki trafiają do pliku tymczasowego (audio_decoder.DiskAudio),
+    a pamięć potrzebna do dekodowania nie zależy od długości nagrania.
+    """
+    if low_memory:
+        return audio_decoder.decode_to_file(audio_path, use_ffmpeg=(decoder == 'ffmpeg'),
+                                            directory=data_dir("decoded"))
+    if decoder == 'auto' and audio_decoder.can_decode(audio_path):
+        return audio_decoder.decode_wav(audio_path)
+    return audio_decoder.decode_ffmpeg(audio_path)
+
+def write_markdown_header(f, audio_path, model_size, language, add_punctuation, best_of, beam_size):
+    """Zapisuje nagłówek pliku z transkrypcją (bez czasu przetwarzania)."""
+    f.write(f"# Transkrypcja: {os.path.basename(audio_path)}\n\n")
+    f.write(f"**Plik:** {audio_path}\n")
+    source = audio_decoder.read_source(audio_path)
+    if source is not None:
+        # Archiwum z ingest.py - wskazanie oryginalnego nagrania
+        f.write(f"**Źródło:** {source.get('source_path')} (SHA-256: {source.get('source_sha256')})\n")
+    f.write(f"**Model:** {model_size}\n")
+    f.write(f"**Język:** {language}\n")
+    if add_punctuation:
+        f.write(f"**Interpunkcja:** Włączona\n")
+    if best_of > 1 or beam_size > 1:
+        f.write(f"**Jakość:** Best_of={best_of}, Beam_size={beam_size}\n")
+    f.write(f"**Data:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+def write_segment(f, segment):
+    """Zapisuje pojedynczy segment czasowy transkrypcji."""
+    segment_start = format_timestamp(segment["start"])
+    segment_end = format_timestamp(segment["end"])
+    f.write(f"**[{segment_start} -> {segment_end}]** {segment['text'].strip()}\n\n")
+
+def write_markdown(output_path, audio_path, result, model_size, language, add_punctuation, best_of, beam_size, processing_time):
+    """
+    Zapisuje wynik transkrypcji (słownik z polami text, segments, language) do pliku Markdown.
+    Plik jest zapisywany w całości do pliku tymczasowego i podmieniany, więc nigdy nie jest widoczny w połowie.
+    """
+    temp_path = output_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        # Nagłówek
+        write_markdown_header(f, audio_path, model_size, language, add_punctuation, best_of, beam_size)
+        f.write(f"**Czas przetwarzania:** {format_time_remaining(processing_time)}\n\n")
+        
+        # Wykryty język
+        if result.get("language"):
+            f.write(f"**Wykryty język:** {result['language']}\n\n")
+        
+        # Główna treść transkrypcji
+        f.write("## Treść transkrypcji\n\n")
+        f.write(result["text"].strip())
+        f.write("\n\n")
+        
+        # Segmenty czasowe (opcjonalnie)
+        if "segments" in result:
+            f.write("## Segmenty czasowe\n\n")
+            for segment in result["segments"]:
+                write_segment(f, segment)
+    os.replace(temp_path, output_path)
+
+def build_transcribe_options(language, best_of, beam_size):
+    """Buduje słownik opcji dla model.transcribe."""
+    transcribe_options = {
+        "language": language if language != "auto" else None,
+        "task": "transcribe"
+    }
+    
+    # Dodaj opcje jakości, jeśli określone
+    if best_of > 1:
+        transcribe_options["best_of"] = best_of
+    if beam_size > 1:
+        transcribe_options["beam_size"] = beam_size
+    return transcribe_options
+
+def _transcribe_window(model, window, seek, is_last_window, options, segments, partial_file, timeline=None):
+    """
+    Transkrybuje jedno okno rozpoczynające się w próbce seek, dopisuje jego segmenty do listy segments
+    i do pliku partial_file (z opróżnieniem bufora) i zwraca pozycję początku następnego okna.
+    Ostatni segment okna (zwykle ucięty na granicy) jest odrzucany, a kolejne okno
+    zaczyna się od jego początku - tak samo przesuwa się okno w samym Whisper.
+    Wykryty w pierwszym oknie język jest zapisywany w options i obowiązuje dla kolejnych okien.
+    """
+    sample_rate = audio_decoder.TARGET_SAMPLE_RATE
+    previous_text = "".join(segment["text"] for segment in segments[-3:]).strip()
+    window_result = model.transcribe(
+        window, **options, verbose=None, initial_prompt=previous_text or None
+    )
+
+    if options.get("language") is None:
+        options["language"] = window_result.get("language")
+
+    window_segments = window_result.get("segments", [])
+    next_seek = seek + len(window)
+    if not is_last_window and len(window_segments) > 1:
+        last_start = int(window_segments[-1]["start"] * sample_rate)
+        if last_start > 0:
+            window_segments = window_segments[:-1]
+            next_seek = seek + last_start
+
+    offset = seek / sample_rate
+    window_end = (seek + len(window)) / sample_rate
+    for segment in window_segments:
+        segment = dict(segment)
+        segment["id"] = len(segments)
+        segment["start"] = segment["start"] + offset
+        segment["end"] = min(segment["end"] + offset, window_end)
+        segment["seek"] = seek
+        if timeline is not None:
+            vad.remap_segment(segment, timeline)
+        segments.append(segment)
+        write_segment(partial_file, segment)
+    partial_file.flush()
+    os.fsync(partial_file.fileno())
+    return next_seek
+
+def transcribe_in_windows(model, audio, transcribe_options, partial_file, start_time, progress_range=(20, 90), timeline=None,
+                          estimated_time=None, checkpoint=None):
+    """
+    Transkrybuje nagranie w oknach STREAM_WINDOW_SECONDS sekund.
+
+    Po każdym oknie wysyła zdarzenie postępu liczone z rzeczywistej pozycji w nagraniu
+    i dopisuje gotowe segmenty do otwartego pliku partial_file (z opróżnieniem bufora),
+    dzięki czemu częściowa transkrypcja jest dostępna w trakcie pracy.
+    Jeśli podano timeline (vad.Timeline), znaczniki czasu są przeliczane na czas oryginalnego nagrania.
+    Pozostały czas łączy wstępne oszacowanie estimated_time z wydajnością obserwowaną w kolejnych oknach.
+    Jeśli podano checkpoint (checkpoint.Checkpoint), transkrypcja zaczyna się od zapisanego stanu,
+    a stan po kolejnych oknach jest okresowo zapisywany.
+
+    Returns:
+        Słownik wyniku w formacie model.transcribe (text, segments, language)
+    """
+    sample_rate = audio_decoder.TARGET_SAMPLE_RATE
+    total_samples = len(audio)
+    audio_duration = total_samples / sample_rate
+    window_samples = STREAM_WINDOW_SECONDS * sample_rate
+    options = dict(transcribe_options)
+    progress_start, progress_end = progress_range
+
+    segments = []
+    seek = 0
+    state = checkpoint.load() if checkpoint is not None else None
+    if state is not None:
+        # Wznowienie: segmenty z punktu kontrolnego trafiają do pliku, a kontekst dekodowania
+        # (język i podpowiedź z ostatnich segmentów) jest taki sam jak przed przerwaniem
+        segments = state["segments"]
+        seek = min(state["seek"], total_samples)
+        if options.get("language") is None:
+            options["language"] = state["language"]
+        for segment in segments:
+            write_segment(partial_file, segment)
+        partial_file.flush()
+        emit_event({"info": f"Wznowiono od punktu kontrolnego: {format_timestamp(seek / sample_rate)}",
+                    "resumed_from": seek / sample_rate})
+
+    transcribe_start = time.time()
+    resume_position = seek / sample_rate
+    if estimated_time is not None and audio_duration > 0:
+        estimated_time *= 1 - resume_position / audio_duration
+    while seek < total_samples:
+        is_last_window = seek + window_samples >= total_samples
+        next_seek = _transcribe_window(model, audio[seek:seek + window_samples], seek, is_last_window,
+                                       options, segments, partial_file, timeline)
+
+        seek = min(next_seek, total_samples)
+        if checkpoint is not None and seek < total_samples:
+            checkpoint.save(seek, segments, options.get("language"))
+        position = seek / sample_rate
+        elapsed = time.time() - transcribe_start
+        # Po wznowieniu wydajność jest liczona tylko z części przetworzonej w tym uruchomieniu
+        processed_fraction = (position - resume_position) / (audio_duration - resume_position)
+        if estimated_time is None:
+            estimated_time = elapsed / processed_fraction if processed_fraction > 0 else 0
+        remaining = eta_history.refine_remaining(estimated_time, elapsed, processed_fraction)
+        emit_event({
+            "progress": int(progress_start + (progress_end - progress_start) * position / audio_duration),
+            "status": "processing",
+            "audio_position": position,
+            "time_elapsed": time.time() - start_time,
+            "time_remaining": max(0, remaining)
+        })
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": options.get("language")
+    }
+
+def transcribe_following(model, audio_path, transcribe_options, partial_file, start_time, progress_range=(20, 90),
+                         idle_seconds=FOLLOW_IDLE_SECONDS):
+    """
+    Transkrybuje nagranie WAV, które jest wciąż zapisywane (np. przez AudioRecorder).
+
+    Nowe ramki są dekodowane przyrostowo, a każde pełne okno STREAM_WINDOW_SECONDS sekund jest
+    transkrybowane jeszcze w trakcie nagrywania. Nagranie uznaje się za zakończone, gdy plik
+    nie rośnie przez idle_seconds sekund - wtedy transkrybowana jest już tylko końcówka.
+
+    Returns:
+        Słownik wyniku w formacie model.transcribe (text, segments, language)
+    """
+    sample_rate = audio_decoder.TARGET_SAMPLE_RATE
+    window_samples = STREAM_WINDOW_SECONDS * sample_rate
+    options = dict(transcribe_options)
+    progress_start, progress_end = progress_range
+    reader = audio_decoder.GrowingWavReader(audio_path)
+
+    segments = []
+    # Bufor trzyma tylko próbki od początku bieżącego okna (buffer_start - jego pozycja w nagraniu)
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0
+    seek = 0
+    last_size = None
+    last_growth = time.time()
+    finished = False
+    while True:
+        size = os.path.getsize(audio_path)
+        if size != last_size:
+            last_size, last_growth = size, time.time()
+        elif time.time() - last_growth >= idle_seconds:
+            finished = True
+
+        new_samples = reader.poll(final=finished)
+        if len(new_samples) or seek > buffer_start:
+            buffer = np.concatenate([buffer[seek - buffer_start:], new_samples])
+            buffer_start = seek
+        total_samples = buffer_start + len(buffer)
+
+        while total_samples - seek >= window_samples or (finished and seek < total_samples):
+            window = buffer[seek - buffer_start:seek - buffer_start + window_samples]
+            is_last_window = finished and seek + window_samples >= total_samples
+            seek = min(_transcribe_window(model, window, seek, is_last_window, options, segments, partial_file),
+                       total_samples)
+            emit_event({
+                "progress": int(progress_start + (progress_end - progress_start) * seek / total_samples),
+                "status": "processing",
+                "audio_position": seek / sample_rate,
+                "recording": not finished,
+                "time_elapsed": time.time() - start_time
+            })
+
+        if finished:
+            break
+        time.sleep(FOLLOW_POLL_SECONDS)
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": options.get("language")
+    }
+
+def feature_cache_config(backend, model_size, use_feature_cache=True, stream=False, follow=False, use_vad=False,
+                         parallel_workers=0, cascade_model=None, low_memory=False):
+    """
+    Zwraca konfigurację cech (klucz pamięci podręcznej spektrogramów) albo None, jeśli transkrypcja
+    z tymi opcjami nie korzysta z pamięci podręcznej: spektrogram całego nagrania jest używany tylko
+    przy transkrypcji jednym wywołaniem modelu (bez okien, pomijania ciszy, podziału i kaskady).
+    """
+    if not use_feature_cache or follow or stream or low_memory or use_vad or parallel_workers > 1 or cascade_model:
+        return None
+    return inference_backends.feature_config(backend, model_size)
+
+def result_cache_options(model_size, language, best_of, beam_size, stream, decoder, use_vad, vad_min_silence,
+                         parallel_workers, backend, model_dir, cascade_model=None, cascade_thresholds=None):
+    """Opcje wpływające na wynik transkrypcji (klucz pamięci podręcznej wyników i punktu kontrolnego)."""
+    options = {
+        "model": model_size,
+        "language": language,
+        "best_of": best_of,
+        "beam_size": beam_size,
+        "stream": stream,
+        "decoder": decoder,
+        "vad": use_vad,
+        "vad_min_silence": vad_min_silence if use_vad else None,
+        "parallel": parallel_workers > 1,
+        "backend": backend,
+        "model_dir": model_dir
+    }
+    if cascade_model:
+        if cascade_thresholds is None:
+            cascade_thresholds = cascade.thresholds()
+        options["cascade"] = {"draft_model": cascade_model, "thresholds": cascade_thresholds}
+    return options
+
+def transcribe_audio(audio_path, output_path=None, model_size='small', language='pl', add_punctuation=False, best_of=1, beam_size=1, model_cache=None, stream=False, decoder='auto', use_vad=False, vad_min_silence=2.0,
+                     use_cache=True, cache_max_mb=None, parallel_workers=0, backend=inference_backends.DEFAULT_BACKEND,
+                     model_dir=None, use_index=True, follow=False, follow_idle=FOLLOW_IDLE_SECONDS, use_checkpoint=True,
+                     low_memory=False, cpu_threads=None, use_feature_cache=True, feature_cache_max_mb=None,
+                     cascade_model=None, cascade_thresholds=None, prepared=None, writer=None):
     """
     Transkrybuje audio za pomocą Whisper AI.
     
@@ -138,174 +721,578 @@ def transcribe_audio(audio_path, output_path=None, model_size='small', language=
         add_punctuation: Czy dodać automatycznie interpunkcję
         best_of: Parametr best_of dla modelu Whisper
         beam_size: Parametr beam_size dla modelu Whisper
+        model_cache: Opcjonalna pamięć podręczna modeli (ModelCache) współdzielona między zadaniami
+        stream: Czy transkrybować w oknach 30 s z bieżącym zapisem segmentów
+        decoder: Sposób dekodowania audio ('auto' - natywnie dla WAV, 'ffmpeg')
+        use_vad: Czy usunąć długie fragmenty ciszy przed transkrypcją
+        vad_min_silence: Najkrótsza przerwa (sekundy) usuwana przez detektor mowy
+        use_cache: Czy korzystać z pamięci podręcznej wyników
+        cache_max_mb: Limit rozmiaru pamięci podręcznej wyników (MB)
+        parallel_workers: Liczba procesów do równoległej transkrypcji długich nagrań (0 lub 1 - wyłączone)
+        backend: Silnik inferencji (openai, torch-int8, ctranslate2, stub)
+        model_dir: Lokalny katalog modelu dla silnika ctranslate2
+        use_index: Czy dodać transkrypcję do pełnotekstowego indeksu (transcript_index)
+        follow: Czy transkrybować nagranie WAV w trakcie jego zapisywania
+        follow_idle: Po ilu sekundach bez przyrostu pliku nagranie uznaje się za zakończone
+        use_checkpoint: Czy w trybie stream zapisywać punkty kontrolne i wznawiać od nich pracę
+        low_memory: Czy dekodować nagranie do pliku tymczasowego i transkrybować je w oknach
+                    (zużycie pamięci niezależne od długości nagrania)
+        cpu_threads: Liczba wątków obliczeniowych na CPU (domyślnie wynik --autotune, jeśli był uruchomiony)
+        use_feature_cache: Czy korzystać z pamięci podręcznej spektrogramów (feature_cache)
+        feature_cache_max_mb: Limit rozmiaru pamięci podręcznej spektrogramów (MB)
+        cascade_model: Szybki model wstępny kaskady (np. 'tiny'); model_size dekoduje wtedy ponownie
+                       tylko niepewne fragmenty (None - wyłączone)
+        cascade_thresholds: Progi niepewności kaskady (cascade.thresholds; None - domyślne)
+        prepared: Dane przygotowane wcześniej przez etap wstępny potoku (pipeline.prepare):
+                  audio_duration, audio_digest oraz opcjonalnie audio, features i result (trafienie
+                  w pamięci podręcznej wyników)
+        writer: Funkcja przyjmująca zadanie zapisu (Markdown, indeks, zdarzenie "completed") do wykonania
+                asynchronicznie; bez niej zapis odbywa się przed powrotem z funkcji
         
     Returns:
-        Ścieżka do pliku z transkrypcją
+        Ścieżka do pliku z transkrypcją (z writer plik powstaje po wykonaniu zadania zapisu)
     """
     # Sprawdzenie, czy wszystkie wymagane biblioteki są zainstalowane
-    missing_deps = check_dependencies()
+    missing_deps = check_dependencies(backend)
     if missing_deps:
         error_message = "Brakujące biblioteki Python: " + ", ".join(missing_deps)
         install_cmd = "pip install " + " ".join(missing_deps)
         full_error = f"{error_message}\nZainstaluj je używając polecenia:\n{install_cmd}"
-        print(json.dumps({"error": full_error, "status": "error", "missing_deps": missing_deps}))
+        emit_event({"error": full_error, "status": "error", "missing_deps": missing_deps})
         return None
     
+    # Pola zdarzeń tego zadania (np. job_id) - zapis może się zakończyć, gdy trwa już kolejne zadanie
+    job_context = dict(_event_context)
+    
+    def emit_job_event(event):
+        emit_event(event, job_context)
+    
+    # Pomiar czasu kolejnych etapów (zdarzenia "span")
+    phases = profiling.PhaseTracker(emit_job_event)
+    
+    # W trybie niskiego zużycia pamięci całe nagranie nigdy nie jest w pamięci,
+    # więc transkrypcja musi przebiegać w oknach
+    if low_memory and not follow:
+        stream = True
+    audio = None
+    
     try:
         # Pobranie długości pliku audio
-        audio_duration = get_audio_duration(audio_path)
-        print(json.dumps({"info": f"Długość audio: {format_time_remaining(audio_duration)}"}))
-        sys.stdout.flush()
-        
-        # Wypisujemy informację o rozpoczęciu
-        print(json.dumps({"progress": 0, "status": "loading_model"}))
-        sys.stdout.flush()
-        
-        # Sprawdzenie dostępności GPU
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(json.dumps({"info": f"Używam urządzenia: {device}"}))
-        sys.stdout.flush()
+        phases.enter("probe")
+        if follow and not audio_path.lower().endswith('.wav'):
+            raise ValueError("Tryb follow obsługuje tylko nagrania WAV")
+        if cascade_model and (stream or follow or parallel_workers > 1):
+            raise ValueError("Kaskada modeli wymaga transkrypcji całego nagrania "
+                             "(bez --stream, --follow, --low-memory i --parallel)")
+        if cascade_model and cascade_thresholds is None:
+            cascade_thresholds = cascade.thresholds()
+        # Długość nagrania, które jest wciąż zapisywane, nie jest jeszcze znana
+        if follow:
+            audio_duration = None
+        elif prepared is not None:
+            audio_duration = prepared["audio_duration"]
+        else:
+            audio_duration = get_audio_duration(audio_path)
+        if audio_duration is not None:
+            emit_event({"info": f"Długość audio: {format_time_remaining(audio_duration)}"})
         
-        # Szacowanie czasu ukończenia
-        estimated_time = estimate_completion_time(audio_duration, model_size, device)
-        print(json.dumps({
-            "info": f"Szacowany czas transkrypcji: {format_time_remaining(estimated_time)}",
-            "estimated_time": estimated_time
-        }))
-        sys.stdout.flush()
+        # Jeśli nie podano ścieżki wyjściowej, utworzymy ją
+        if output_path is None:
+            output_path = default_output_path(audio_path)
         
         # Zapisz czas rozpoczęcia
         start_time = time.time()
         
-        # Ładowanie modelu
-        try:
-            print(json.dumps({"info": f"Próbuję załadować model: {model_size}"}))
-            sys.stdout.flush()
-            model = whisper.load_model(model_size, device=device)
-            model_load_time = time.time() - start_time
-            print(json.dumps({
-                "progress": 10, 
-                "status": "model_loaded",
-                "time_elapsed": model_load_time,
-                "time_remaining": estimated_time - model_load_time
-            }))
-            sys.stdout.flush()
-        except Exception as e:
-            error_msg = f"Błąd podczas ładowania modelu {model_size}: {str(e)}"
-            print(json.dumps({"error": error_msg, "status": "error", "model_error": True}))
-            sys.stdout.flush()
-            raise Exception(error_msg)
-        
-        # Opcje transkrypcji
-        transcribe_options = {
-            "language": language if language != "auto" else None,
-            "task": "transcribe"
-        }
-        
-        # Dodaj opcje jakości, jeśli określone
-        if best_of > 1:
-            transcribe_options["best_of"] = best_of
-        if beam_size > 1:
-            transcribe_options["beam_size"] = beam_size
-            
-        # Opcje interpunkcji
-        if add_punctuation:
-            # W Whisper nie ma bezpośredniej opcji dla interpunkcji, jest ona domyślnie włączona
-            # Możemy dodać dodatkową informację w pliku wyjściowym
-            print(json.dumps({"info": "Interpunkcja włączona"}))
-            sys.stdout.flush()
+        # Opcje wpływające na wynik (klucz pamięci podręcznej i punktu kontrolnego)
+        result_options = result_cache_options(model_size, language, best_of, beam_size, stream, decoder, use_vad,
+                                              vad_min_silence, parallel_workers, backend, model_dir,
+                                              cascade_model, cascade_thresholds)
         
-        # Rozpoczęcie transkrypcji
-        print(json.dumps({
-            "progress": 20, 
-            "status": "transcribing",
-            "time_elapsed": time.time() - start_time,
-            "time_remaining": estimated_time - (time.time() - start_time)
-        }))
-        sys.stdout.flush()
+        # Kaskada ma własną historię wydajności (czas zależy od obu modeli)
+        history_model = f"{cascade_model}+{model_size}" if cascade_model else model_size
+        cascade_stats = None
         
-        # Faktyczna transkrypcja
-        result = model.transcribe(audio_path, **transcribe_options, verbose=False)
-        
-        # Okresowe aktualizacje postępu podczas transkrypcji
-        elapsed_time = time.time() - start_time
-        progress = min(90, int(20 + 70 * (elapsed_time / estimated_time)))
-        print(json.dumps({
-            "progress": progress, 
-            "status": "processing",
-            "time_elapsed": elapsed_time,
-            "time_remaining": max(0, estimated_time - elapsed_time)
-        }))
-        sys.stdout.flush()
+        # Sprawdzenie pamięci podręcznej wyników (ten sam plik audio i te same opcje)
+        result = None
+        cache = None
+        feature_store = None
+        audio_digest = prepared.get("audio_digest") if prepared is not None else None
+        vad_stats = None
+        run_checkpoint = None
+        estimated_time = 0
+        if use_cache and not follow:
+            phases.enter("cache_lookup")
+            if cache_max_mb is None:
+                cache_max_mb = result_cache.DEFAULT_MAX_MB
+            cache = result_cache.ResultCache(max_mb=cache_max_mb)
+            if audio_digest is None:
+                audio_digest = result_cache.file_digest(audio_path)
+            cache_key = cache.make_key(audio_digest, result_options)
+            if prepared is not None and prepared.get("result") is not None:
+                # Wynik odczytany już przez etap wstępny potoku (nagranie nie zostało zdekodowane)
+                result = prepared["result"]
+            else:
+                result = cache.get(cache_key)
+        cache_hit = result is not None
+        if cache_hit:
+            emit_event({"info": "Znaleziono wynik w pamięci podręcznej - pomijam transkrypcję"})
+            if audio_duration is None:
+                segments = result.get("segments") or []
+                audio_duration = segments[-1]["end"] if segments else 0
         
+        if not cache_hit:
+            # Wypisujemy informację o rozpoczęciu
+            emit_event({"progress": 0, "status": "loading_model"})
+            
+            # Import whisper i torch odbywa się w tle, równolegle z dekodowaniem nagrania
+            if inference_backends.uses_torch(backend):
+                start_backend_import()
+            
+            # Spektrogram zapisany przy poprzedniej transkrypcji tego nagrania (np. z innym beam_size)
+            # pozwala pominąć dekodowanie audio; dotyczy transkrypcji całego nagrania jednym wywołaniem modelu
+            features = None
+            feature_hit = False
+            features_config = feature_cache_config(backend, model_size, use_feature_cache, stream, follow, use_vad,
+                                                   parallel_workers, cascade_model)
+            if features_config is not None:
+                phases.enter("feature_lookup")
+                if feature_cache_max_mb is None:
+                    feature_cache_max_mb = feature_cache.DEFAULT_MAX_MB
+                feature_store = feature_cache.FeatureCache(max_mb=feature_cache_max_mb)
+                if audio_digest is None:
+                    audio_digest = result_cache.file_digest(audio_path)
+                feature_key = feature_store.make_key(audio_digest, features_config)
+                if prepared is not None and prepared.get("features") is not None:
+                    # Spektrogram odczytany lub policzony (i zapisany) przez etap wstępny potoku
+                    features, feature_hit = prepared["features"], prepared["feature_cache_hit"]
+                else:
+                    features = feature_store.get(feature_key)
+                    feature_hit = features is not None
+                emit_event({
+                    "info": ("Znaleziono spektrogram w pamięci podręcznej - pomijam dekodowanie audio"
+                             if feature_hit else "Brak spektrogramu w pamięci podręcznej"),
+                    "feature_cache_hit": feature_hit,
+                    "feature_cache": feature_store.stats()
+                })
+            
+            # Jednokrotne dekodowanie audio (natywnie dla WAV, w pozostałych przypadkach przez ffmpeg);
+            # ten sam bufor próbek trafia do wszystkich dalszych etapów
+            # (w trybie follow nagranie jest dekodowane przyrostowo podczas transkrypcji)
+            if not follow and prepared is not None and prepared.get("audio") is not None:
+                audio = prepared["audio"]
+                if audio_duration is None:
+                    audio_duration = len(audio) / audio_decoder.TARGET_SAMPLE_RATE
+                    emit_event({"info": f"Długość audio: {format_time_remaining(audio_duration)}"})
+            elif not follow and not feature_hit:
+                phases.enter("decode")
+                audio = load_audio(audio_path, decoder, low_memory)
+                if audio_duration is None:
+                    audio_duration = len(audio) / audio_decoder.TARGET_SAMPLE_RATE
+                    emit_event({"info": f"Długość audio: {format_time_remaining(audio_duration)}"})
+            elif feature_hit and audio_duration is None:
+                audio_duration = inference_backends.feature_duration(features_config, features)
+                emit_event({"info": f"Długość audio: {format_time_remaining(audio_duration)}"})
+            
+            phases.enter("backend_import")
+            if inference_backends.uses_torch(backend):
+                require_backend()
+            
+            # Sprawdzenie dostępności GPU
+            device = inference_backends.select_device(backend)
+            emit_event({"info": f"Używam urządzenia: {device} (silnik: {backend})"})
+            
+            # Szacowanie czasu ukończenia (niemożliwe, dopóki nagranie trwa)
+            if audio_duration is not None:
+                estimated_time = estimate_completion_time(audio_duration, history_model, device, backend)
+                emit_event({
+                    "info": f"Szacowany czas transkrypcji: {format_time_remaining(estimated_time)}",
+                    "estimated_time": estimated_time
+                })
+            
+            # Długie nagrania na CPU mogą być dzielone na fragmenty transkrybowane równolegle
+            use_parallel = (parallel_workers > 1 and not stream and not follow and device == "cpu"
+                            and audio_duration >= parallel_transcribe.MIN_PARALLEL_SECONDS)
+            
+            # Liczba wątków podana jawnie (np. przez proces wsadowy) lub dobrana przez --autotune
+            if device == "cpu" and not use_parallel:
+                if cpu_threads is None:
+                    tuned = cpu_tuning.saved_config(model_size, backend, "latency")
+                    if tuned is not None:
+                        cpu_threads = tuned["threads"]
+                        emit_event({"info": f"Liczba wątków (autotune): {cpu_threads}", "cpu_threads": cpu_threads})
+                if cpu_threads is not None:
+                    cpu_tuning.apply_threads(cpu_threads, backend)
+            else:
+                cpu_threads = None
+            
+            # Ładowanie modelu (w trybie równoległym model ładuje każdy proces roboczy)
+            phases.enter("model_load")
+            try:
+                emit_event({"info": f"Próbuję załadować model: {model_size}"})
+                model_cached = False
+                if use_parallel:
+                    model = None
+                    emit_event({"info": f"Transkrypcja równoległa: {parallel_workers} procesów"})
+                elif model_cache is not None:
+                    model, model_cached = model_cache.get(model_size, device, backend, model_dir, cpu_threads)
+                else:
+                    model = inference_backends.load_model(backend, model_size, device, model_dir, cpu_threads)
+                if cascade_model:
+                    emit_event({"info": f"Model wstępny kaskady: {cascade_model}"})
+                    if model_cache is not None:
+                        draft_model, _ = model_cache.get(cascade_model, device, backend, model_dir, cpu_threads)
+                    else:
+                        draft_model = inference_backends.load_model(backend, cascade_model, device, model_dir, cpu_threads)
+                model_load_time = time.time() - start_time
+                emit_event({
+                    "progress": 10, 
+                    "status": "model_loaded",
+                    "model_cached": model_cached,
+                    "time_elapsed": model_load_time,
+                    "time_remaining": max(0, estimated_time - model_load_time)
+                })
+            except Exception as e:
+                error_msg = f"Błąd podczas ładowania modelu {model_size}: {str(e)}"
+                emit_event({"error": error_msg, "status": "error", "model_error": True})
+                raise Exception(error_msg)
+            
+            # Opcje transkrypcji
+            transcribe_options = build_transcribe_options(language, best_of, beam_size)
+            
+            # Opcje interpunkcji
+            if add_punctuation:
+                # W Whisper nie ma bezpośredniej opcji dla interpunkcji, jest ona domyślnie włączona
+                # Możemy dodać dodatkową informację w pliku wyjściowym
+                emit_event({"info": "Interpunkcja włączona"})
+            
+            # Rozpoczęcie transkrypcji
+            emit_event({
+                "progress": 20, 
+                "status": "transcribing",
+                "time_elapsed": time.time() - start_time,
+                "time_remaining": max(0, estimated_time - (time.time() - start_time))
+            })
+            
+            # Usunięcie długich fragmentów ciszy (opcjonalnie)
+            timeline = None
+            if use_vad and low_memory:
+                emit_event({"warning": "Pomijanie ciszy (--vad) nie jest dostępne w trybie --low-memory"})
+            elif use_vad and not follow:
+                phases.enter("vad")
+                sample_rate = audio_decoder.TARGET_SAMPLE_RATE
+                regions = vad.detect_speech(audio, sample_rate, vad_min_silence)
+                if regions:
+                    original_seconds = len(audio) / sample_rate
+                    audio, timeline = vad.pack_speech(audio, regions, sample_rate)
+                    packed_seconds = len(audio) / sample_rate
+                    vad_stats = {
+                        "speech_regions": len(regions),
+                        "skipped_seconds": max(0, original_seconds - packed_seconds),
+                        "skipped_ratio": max(0, 1 - packed_seconds / original_seconds) if original_seconds > 0 else 0,
+                        # Ile razy krótsze jest audio podawane do modelu (nie zmierzone przyspieszenie)
+                        "audio_reduction_ratio": original_seconds / packed_seconds if packed_seconds > 0 else 1
+                    }
+                    emit_event({"info": f"Pominięto ciszę: {format_time_remaining(vad_stats['skipped_seconds'])}"})
+                else:
+                    emit_event({"warning": "Nie wykryto mowy - transkrybuję całe nagranie"})
+            
+            # Spektrogram liczony raz i zapisywany dla kolejnych transkrypcji tego nagrania
+            if feature_store is not None and features is None:
+                phases.enter("features")
+                features = model.compute_features(audio)
+                try:
+                    feature_store.put(feature_key, features)
+                except OSError as e:
+                    emit_event({"warning": f"Nie można zapisać spektrogramu w pamięci podręcznej: {str(e)}"})
+            
+            # Faktyczna transkrypcja
+            phases.enter("inference")
+            if follow:
+                # Segmenty są dopisywane do pliku na bieżąco, jeszcze w trakcie nagrywania
+                with open(output_path, 'w', encoding='utf-8') as partial_file:
+                    write_markdown_header(partial_file, audio_path, model_size, language, add_punctuation, best_of, beam_size)
+                    partial_file.write("**Status:** Transkrypcja w toku (nagrywanie)\n\n")
+                    partial_file.write("## Segmenty czasowe\n\n")
+                    result = transcribe_following(model, audio_path, transcribe_options, partial_file, start_time,
+                                                  idle_seconds=follow_idle)
+                audio_duration = get_audio_duration(audio_path)
+                if audio_duration is None:
+                    segments = result["segments"]
+                    audio_duration = segments[-1]["end"] if segments else 0
+                emit_event({"info": f"Długość audio: {format_time_remaining(audio_duration)}"})
+            elif stream:
+                # Częściowa transkrypcja jest zapisywana na bieżąco i zastępowana pełną na końcu;
+                # punkt kontrolny pozwala wznowić przerwaną pracę od ostatniego zapisanego okna
+                if use_checkpoint:
+                    run_checkpoint = checkpoint.Checkpoint(output_path, audio_path, result_options)
+                with open(output_path, 'w', encoding='utf-8') as partial_file:
+                    write_markdown_header(partial_file, audio_path, model_size, language, add_punctuation, best_of, beam_size)
+                    partial_file.write("**Status:** Transkrypcja w toku\n\n")
+                    partial_file.write("## Segmenty czasowe\n\n")
+                    result = transcribe_in_windows(model, audio, transcribe_options, partial_file, start_time,
+                                                   timeline=timeline,
+                                                   estimated_time=max(0, estimated_time - (time.time() - start_time)),
+                                                   checkpoint=run_checkpoint)
+            elif use_parallel:
+                transcribe_start = time.time()
+                estimated_transcribe_time = max(0, estimated_time - (transcribe_start - start_time))
+                
+                def report_parallel_progress(done_seconds, total_seconds):
+                    emit_event({
+                        "progress": int(20 + 70 * done_seconds / total_seconds),
+                        "status": "processing",
+                        "time_elapsed": time.time() - start_time,
+                        "time_remaining": eta_history.refine_remaining(
+                            estimated_transcribe_time, time.time() - transcribe_start, done_seconds / total_seconds)
+                    })
+                
+                result = parallel_transcribe.transcribe_parallel(
+                    audio, model_size, device, transcribe_options, parallel_workers,
+                    on_progress=report_parallel_progress, backend=backend, model_dir=model_dir
+                )
+                if timeline is not None:
+                    vad.remap_result(result, timeline)
+            elif cascade_model:
+                def report_cascade_progress(regions_done, regions_total):
+                    elapsed_time = time.time() - start_time
+                    emit_event({
+                        "progress": int(50 + 40 * regions_done / regions_total),
+                        "status": "processing",
+                        "time_elapsed": elapsed_time,
+                        "time_remaining": max(0, estimated_time - elapsed_time)
+                    })
+                
+                result, cascade_stats = cascade.transcribe_cascade(draft_model, model, audio, transcribe_options,
+                                                                   cascade_thresholds,
+                                                                   on_progress=report_cascade_progress)
+                emit_event({"info": f"Kaskada: ponownie zdekodowano {cascade_stats['redecoded_ratio']:.0%} nagrania "
+                                    f"({cascade_stats['regions']} fragmentów)"})
+                if timeline is not None:
+                    vad.remap_result(result, timeline)
+            else:
+                if features is not None:
+                    result = model.transcribe(audio, features=features, **transcribe_options, verbose=False)
+                else:
+                    result = model.transcribe(audio, **transcribe_options, verbose=False)
+                if timeline is not None:
+                    vad.remap_result(result, timeline)
+            
+                # Okresowe aktualizacje postępu podczas transkrypcji
+                elapsed_time = time.time() - start_time
+                progress = min(90, int(20 + 70 * (elapsed_time / estimated_time))) if estimated_time > 0 else 20
+                emit_event({
+                    "progress": progress, 
+                    "status": "processing",
+                    "time_elapsed": elapsed_time,
+                    "time_remaining": max(0, estimated_time - elapsed_time)
+                })
+            
+            if cache is not None:
+                cache.put(cache_key, result, {"audio_path": audio_path, "model": model_size})
+            
         # Informacja o zakończeniu transkrypcji
-        print(json.dumps({
+        emit_event({
             "progress": 90, 
             "status": "formatting",
             "time_elapsed": time.time() - start_time,
             "time_remaining": max(0, (estimated_time * 0.1))  # Zostało około 10% czasu
-        }))
-        sys.stdout.flush()
-        
-        # Jeśli nie podano ścieżki wyjściowej, utworzymy ją
-        if output_path is None:
-            base_name = os.path.splitext(os.path.basename(audio_path))[0]
-            output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'transcriptions')
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, f"{base_name}.md")
-        
-        # Formatowanie i zapis transkrypcji
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Nagłówek
-            f.write(f"# Transkrypcja: {os.path.basename(audio_path)}\n\n")
-            f.write(f"**Plik:** {audio_path}\n")
-            f.write(f"**Model:** {model_size}\n")
-            f.write(f"**Język:** {language}\n")
-            if add_punctuation:
-                f.write(f"**Interpunkcja:** Włączona\n")
-            if best_of > 1 or beam_size > 1:
-                f.write(f"**Jakość:** Best_of={best_of}, Beam_size={beam_size}\n")
-            f.write(f"**Data:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"**Czas przetwarzania:** {format_time_remaining(time.time() - start_time)}\n\n")
-            
-            # Wykryty język
-            if result.get("language"):
-                f.write(f"**Wykryty język:** {result['language']}\n\n")
-            
-            # Główna treść transkrypcji
-            f.write("## Treść transkrypcji\n\n")
-            f.write(result["text"].strip())
-            f.write("\n\n")
-            
-            # Segmenty czasowe (opcjonalnie)
-            if "segments" in result:
-                f.write("## Segmenty czasowe\n\n")
-                for i, segment in enumerate(result["segments"]):
-                    start_time = format_timestamp(segment["start"])
-                    end_time = format_timestamp(segment["end"])
-                    f.write(f"**[{start_time} -> {end_time}]** {segment['text'].strip()}\n\n")
+        })
         
-        # Obliczenie faktycznego czasu transkrypcji
-        total_time = time.time() - start_time
-        
-        # Informacja o zakończeniu
-        print(json.dumps({
-            "progress": 100, 
-            "status": "completed", 
-            "output_path": output_path,
-            "total_time": total_time,
-            "audio_duration": audio_duration,
-            "speed_ratio": audio_duration / total_time if total_time > 0 else 0
-        }))
-        sys.stdout.flush()
+        # Formatowanie, zapis i indeksowanie transkrypcji; z writer (potok wielu plików) wykonywane
+        # asynchronicznie, żeby model mógł od razu przejść do kolejnego nagrania
+        def finish():
+            try:
+                # Formatowanie i zapis transkrypcji
+                phases.enter("write")
+                write_markdown(output_path, audio_path, result, model_size, language, add_punctuation,
+                               best_of, beam_size, time.time() - start_time)
+                if run_checkpoint is not None:
+                    run_checkpoint.remove()
+
+                # Aktualizacja pełnotekstowego indeksu transkrypcji
+                if use_index:
+                    phases.enter("index")
+                    try:
+                        with transcript_index.TranscriptIndex() as index:
+                            index.index_result(output_path, audio_path, result, model_size, language)
+                    except (sqlite3.Error, OSError) as e:
+                        emit_job_event({"warning": f"Nie można zaktualizować indeksu transkrypcji: {str(e)}"})
+                phases.finish()
+
+                # Obliczenie faktycznego czasu transkrypcji
+                total_time = time.time() - start_time
+
+                # Informacja o zakończeniu
+                completed_event = {
+                    "progress": 100, 
+                    "status": "completed", 
+                    "output_path": output_path,
+                    "total_time": total_time,
+                    "audio_duration": audio_duration,
+                    "speed_ratio": audio_duration / total_time if total_time > 0 else 0,
+                    "cache_hit": cache_hit,
+                    "phases": phases.durations
+                }
+                if vad_stats is not None:
+                    completed_event["vad"] = vad_stats
+                if not cache_hit and feature_store is not None:
+                    completed_event["feature_cache_hit"] = feature_hit
+                    completed_event["feature_cache"] = feature_store.stats()
+                if cascade_stats is not None:
+                    # Tylko zmierzone wielkości (czas modelu wstępnego i ponownego dekodowania);
+                    # porównanie z samym większym modelem wymaga osobnego pomiaru (benchmarks/bench_cascade.py)
+                    completed_event["cascade"] = {
+                        **cascade_stats,
+                        "draft_model": cascade_model,
+                        "final_model": model_size
+                    }
+                emit_job_event(completed_event)
+
+                # Zapis zmierzonej wydajności do historii używanej przy szacowaniu czasu
+                # (czas transkrypcji w trybie follow zależy od długości nagrywania, a nie od wydajności)
+                if not cache_hit and not follow:
+                    try:
+                        eta_history.record(history_model_key(history_model, backend), device, audio_duration,
+                                           phases.durations.get("model_load", 0.0), total_time)
+                    except OSError as e:
+                        emit_job_event({"warning": f"Nie można zapisać historii wydajności: {str(e)}"})
+                return output_path
+            except Exception as e:
+                phases.finish()
+                emit_job_event({"error": str(e), "status": "error"})
+                return None
         
+        if writer is None:
+            return finish()
+        # Czas oczekiwania w kolejce zapisu jest raportowany jako osobny etap
+        phases.enter("write_queue")
+        writer(finish)
         return output_path
         
     except Exception as e:
         # W przypadku błędu, zwracamy informację
+        phases.finish()
         error_info = {"error": str(e), "status": "error"}
-        print(json.dumps(error_info))
+        emit_event(error_info)
         return None
+    finally:
+        # Usunięcie pliku tymczasowego z próbkami (tryb low_memory)
+        if isinstance(audio, audio_decoder.DiskAudio):
+            audio.close()
+
+def transcribe_clips(clips, model_size='small', language='pl', add_punctuation=False, best_of=1, beam_size=1,
+                     model_cache=None, batch_size=CLIP_BATCH_SIZE, decoder='auto',
+                     backend=inference_backends.DEFAULT_BACKEND, model_dir=None, use_index=True, cpu_threads=None):
+    """
+    Transkrybuje wiele krótkich nagrań wsadami: spektrogramy do batch_size nagrań trafiają
+    do kodera razem i są dekodowane wspólnie (model.transcribe_batch), a każde nagranie
+    otrzymuje własny wynik, plik Markdown, wpis w indeksie i zdarzenie "completed".
+    Nagrania dłuższe niż inference_backends.BATCH_CLIP_SECONDS są transkrybowane pojedynczo.
+
+    Args:
+        clips: Lista par (ścieżka nagrania, ścieżka pliku wyjściowego lub None)
+        batch_size: Największa liczba nagrań w jednym wsadzie
+        (pozostałe argumenty jak w transcribe_audio)
+
+    Returns:
+        Lista wpisów (audio_path, output_path, status, total_time, audio_duration, speed_ratio)
+        w kolejności nagrań
+    """
+    entries = [{"audio_path": audio_path, "output_path": output_path or default_output_path(audio_path)}
+               for audio_path, output_path in clips]
+
+    def fail(entry, message):
+        entry.update({"status": "error", "error": message})
+        emit_event({"error": message, "status": "error", "audio_path": entry["audio_path"]})
+
+    missing_deps = check_dependencies(backend)
+    if missing_deps:
+        for entry in entries:
+            fail(entry, "Brakujące biblioteki Python: " + ", ".join(missing_deps))
+        return entries
+
+    try:
+        if inference_backends.uses_torch(backend):
+            require_backend()
+        device = inference_backends.select_device(backend)
+        if device == "cpu":
+            if cpu_threads is None:
+                tuned = cpu_tuning.saved_config(model_size, backend, "latency")
+                cpu_threads = tuned["threads"] if tuned is not None else None
+            if cpu_threads is not None:
+                cpu_tuning.apply_threads(cpu_threads, backend)
+        else:
+            cpu_threads = None
+        if model_cache is not None:
+            model, _ = model_cache.get(model_size, device, backend, model_dir, cpu_threads)
+        else:
+            model = inference_backends.load_model(backend, model_size, device, model_dir, cpu_threads)
+    except Exception as e:
+        for entry in entries:
+            fail(entry, f"Błąd podczas ładowania modelu {model_size}: {str(e)}")
+        return entries
+
+    transcribe_options = build_transcribe_options(language, best_of, beam_size)
+    batch_size = max(1, batch_size)
+    for first in range(0, len(entries), batch_size):
+        batch = entries[first:first + batch_size]
+        start_time = time.time()
+
+        # Dekodowanie nagrań wsadu (nagranie, którego nie da się odczytać, nie zatrzymuje pozostałych)
+        short, long = [], []
+        for entry in batch:
+            try:
+                audio = load_audio(entry["audio_path"], decoder)
+            except Exception as e:
+                fail(entry, str(e))
+                continue
+            entry["audio_duration"] = len(audio) / audio_decoder.TARGET_SAMPLE_RATE
+            target = short if entry["audio_duration"] <= inference_backends.BATCH_CLIP_SECONDS else long
+            target.append((entry, audio))
+
+        try:
+            results = model.transcribe_batch([audio for _, audio in short], **transcribe_options) if short else []
+            results += [model.transcribe(audio, **transcribe_options, verbose=None) for _, audio in long]
+        except Exception as e:
+            for entry, _ in short + long:
+                fail(entry, str(e))
+            continue
+        transcribed = short + long
+        emit_event({"info": f"Wsad {len(transcribed)} nagrań: {format_time_remaining(time.time() - start_time)}",
+                    "batch_clips": len(transcribed)})
+
+        # Czas wspólnej inferencji jest rozdzielany po równo między nagrania wsadu
+        clip_time = (time.time() - start_time) / len(transcribed) if transcribed else 0
+        for (entry, _), result in zip(transcribed, results):
+            audio_path, output_path = entry["audio_path"], entry["output_path"]
+            try:
+                write_markdown(output_path, audio_path, result, model_size, language, add_punctuation,
+                               best_of, beam_size, clip_time)
+            except OSError as e:
+                fail(entry, str(e))
+                continue
+            if use_index:
+                try:
+                    with transcript_index.TranscriptIndex() as index:
+                        index.index_result(output_path, audio_path, result, model_size, language)
+                except (sqlite3.Error, OSError) as e:
+                    emit_event({"warning": f"Nie można zaktualizować indeksu transkrypcji: {str(e)}"})
+            entry.update({
+                "status": "completed",
+                "total_time": clip_time,
+                "speed_ratio": entry["audio_duration"] / clip_time if clip_time > 0 else 0
+            })
+            emit_event({
+                "progress": 100,
+                "status": "completed",
+                "audio_path": audio_path,
+                "output_path": output_path,
+                "total_time": clip_time,
+                "audio_duration": entry["audio_duration"],
+                "speed_ratio": entry["speed_ratio"],
+                "batch_clips": len(transcribed)
+            })
+    return entries
 
 def format_timestamp(seconds):
     """Formatuje czas w sekundach do formatu MM:SS."""
@@ -313,28 +1300,183 @@ def format_timestamp(seconds):
     seconds = int(seconds % 60)
     return f"{minutes:02d}:{seconds:02d}"
 
+def job_options(job, backend=inference_backends.DEFAULT_BACKEND):
+    """
+    Zamienia zadanie w formacie JSON trybu --serve (pola jak opcje wiersza poleceń:
+    output, model, language, stream, vad, backend itd.) na argumenty transcribe_audio.
+    """
+    return {
+        "output_path": job.get("output"),
+        "model_size": job.get("model", "small"),
+        "language": job.get("language", "pl"),
+        "add_punctuation": bool(job.get("punctuation", False)),
+        "best_of": int(job.get("best_of", 1)),
+        "beam_size": int(job.get("beam_size", 1)),
+        "stream": bool(job.get("stream", False)),
+        "decoder": job.get("decoder", "auto"),
+        "use_vad": bool(job.get("vad", False)),
+        "vad_min_silence": float(job.get("vad_min_silence", 2.0)),
+        "use_cache": not job.get("no_cache", False),
+        "use_feature_cache": not job.get("no_feature_cache", False),
+        "cascade_model": job.get("cascade"),
+        "cascade_thresholds": cascade.thresholds(job.get("cascade_logprob"), job.get("cascade_compression"),
+                                                 job.get("cascade_no_speech")),
+        "parallel_workers": int(job.get("parallel", 0)),
+        "backend": job.get("backend", backend),
+        "model_dir": job.get("model_dir"),
+        "use_index": not job.get("no_index", False),
+        "follow": bool(job.get("follow", False)),
+        "follow_idle": float(job.get("follow_idle", FOLLOW_IDLE_SECONDS)),
+        "use_checkpoint": not job.get("no_checkpoint", False),
+        "low_memory": bool(job.get("low_memory", False)),
+        "cpu_threads": job.get("cpu_threads")
+    }
+
+def run_job(job, model_cache=None, backend=inference_backends.DEFAULT_BACKEND):
+    """
+    Wykonuje zadanie w formacie JSON trybu --serve (pola jak opcje wiersza poleceń:
+    audio_path, output, model, language, stream, vad, backend itd.).
+
+    Returns:
+        Ścieżka do pliku z transkrypcją lub None w przypadku błędu
+    """
+    return transcribe_audio(job["audio_path"], model_cache=model_cache, **job_options(job, backend))
+
+def serve(model_cache_mb, backend=inference_backends.DEFAULT_BACKEND):
+    """
+    Tryb pracy ciągłej. Czyta zadania JSON ze standardowego wejścia (jedno w linii)
+    i wykonuje je kolejno, trzymając załadowane modele w pamięci między zadaniami.
+
+    Przykładowe zadanie:
+        {"job_id": "1", "audio_path": "nagranie.wav", "output": "nagranie.md", "model": "small"}
+    Polecenia sterujące:
+        {"command": "stats"}     - zwraca stan pamięci podręcznej modeli i szczytowe zużycie pamięci procesu
+        {"command": "shutdown"}  - kończy pracę procesu
+    Wszystkie zdarzenia dotyczące zadania są oznaczane polem "job_id".
+    Zadanie może wybrać silnik polem "backend" (domyślnie silnik podany przy uruchomieniu).
+    """
+    model_cache = ModelCache(model_cache_mb)
+    # Import whisper i torch trwa w tle, podczas oczekiwania na pierwsze zadanie
+    if inference_backends.uses_torch(backend):
+        start_backend_import()
+    emit_event({"status": "ready", "model_cache": model_cache.stats()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("zadanie musi być obiektem JSON")
+        except ValueError as e:
+            emit_event({"error": f"Nieprawidłowe zadanie: {str(e)}", "status": "error"})
+            continue
+
+        command = job.get("command")
+        if command == "shutdown":
+            break
+        if command == "stats":
+            emit_event({"status": "stats", "model_cache": model_cache.stats(), "peak_rss_mb": profiling.peak_rss_mb()})
+            continue
+
+        _event_context["job_id"] = job.get("job_id")
+        try:
+            if not job.get("audio_path"):
+                emit_event({"error": "Brak pola audio_path w zadaniu", "status": "error"})
+                continue
+            run_job(job, model_cache, backend)
+        except Exception as e:
+            emit_event({"error": str(e), "status": "error"})
+        finally:
+            _event_context.pop("job_id", None)
+            emit_event({"status": "ready", "model_cache": model_cache.stats()})
+
+    return 0
+
+def autotune(model_size, backend, clip_seconds, model_dir=None):
+    """
+    Mierzy kombinacje (procesy, wątki) na nagraniu kalibracyjnym i zapisuje najlepsze konfiguracje
+    dla tego komputera: 'latency' stosują zwykłe uruchomienia, a 'throughput' transkrypcja wsadowa.
+    """
+    # Każdy proces kalibracyjny ładuje własną kopię modelu - procesów nie może być więcej, niż zmieści RAM
+    max_jobs = cpu_tuning.memory_job_limit(model_memory_mb(model_size, backend))
+    configs = cpu_tuning.candidate_configs(max_jobs=max_jobs)
+    emit_event({"info": f"Kalibracja {len(configs)} konfiguracji (model {model_size}, silnik {backend})",
+                "status": "autotune", "max_jobs": max_jobs})
+    results = []
+
+    def report(result):
+        results.append(result)
+        emit_event({"progress": int(100 * len(results) / len(configs)), "status": "autotune", **result})
+
+    try:
+        entry = cpu_tuning.autotune(model_size, backend, clip_seconds, model_dir, on_result=report,
+                                    max_jobs=max_jobs)
+    except Exception as e:
+        emit_event({"error": f"Kalibracja nie powiodła się: {str(e)}", "status": "error"})
+        return 1
+    emit_event({"progress": 100, "status": "completed", "latency": entry["latency"],
+                "throughput": entry["throughput"]})
+    return 0
+
 def main():
     """Główna funkcja skryptu."""
-    # Jeśli Whisper nie jest dostępny, wyświetl jasny komunikat błędu
-    if not WHISPER_AVAILABLE:
+    args = setup_args()
+    if args.preflight:
+        return preflight()
+    
+    # Jeśli Whisper (lub biblioteka wybranego silnika) nie jest dostępny, wyświetl jasny komunikat błędu
+    missing_deps = check_dependencies(args.backend)
+    if missing_deps:
         error_message = (
-            "Brakujące biblioteki Python: whisper, torch\n"
+            f"Brakujące biblioteki Python: {', '.join(missing_deps)}\n"
             "Zainstaluj je używając polecenia:\n"
-            "pip install openai-whisper torch\n\n"
+            f"{inference_backends.INSTALL_COMMANDS[args.backend]}\n\n"
             "Uwaga: Instalacja Whisper może zająć kilka minut."
         )
-        print(json.dumps({"error": error_message, "status": "error", "missing_deps": ["whisper", "torch"]}))
+        emit_event({"error": error_message, "status": "error", "missing_deps": missing_deps})
         return 1
     
-    args = setup_args()
+    if args.serve:
+        return serve(args.model_cache_mb, args.backend)
+    if args.autotune:
+        return autotune(args.model, args.backend, args.autotune_seconds, args.model_dir)
+
     try:
-        output_path = args.output
-        transcribe_audio(args.audio_path, output_path, args.model, args.language, args.punctuation, args.best_of, args.beam_size)
+        output_path = args.output or default_output_path(args.audio_path)
+
+        def run():
+            return transcribe_audio(args.audio_path, output_path, args.model, args.language, args.punctuation,
+                                    args.best_of, args.beam_size,
+                                    stream=args.stream, decoder=args.decoder,
+                                    use_vad=args.vad, vad_min_silence=args.vad_min_silence,
+                                    use_cache=not args.no_cache, cache_max_mb=args.cache_max_mb,
+                                    parallel_workers=args.parallel, backend=args.backend, model_dir=args.model_dir,
+                                    use_index=not args.no_index, follow=args.follow, follow_idle=args.follow_idle,
+                                    use_checkpoint=not args.no_checkpoint, low_memory=args.low_memory,
+                                    use_feature_cache=not args.no_feature_cache,
+                                    feature_cache_max_mb=args.feature_cache_max_mb,
+                                    cascade_model=args.cascade,
+                                    cascade_thresholds=cascade.thresholds(args.cascade_logprob,
+                                                                          args.cascade_compression,
+                                                                          args.cascade_no_speech))
+
+        if args.profile:
+            _, profile_path, alloc_path = profiling.run_profiled(run, output_path, args.profile_top)
+            emit_event({
+                "info": f"Zapisano profil: {profile_path}",
+                "profile_path": profile_path,
+                "alloc_report_path": alloc_path
+            })
+        else:
+            run()
         return 0
     except Exception as e:
         # W przypadku błędu, zwracamy informację w formacie JSON
         error_info = {"error": str(e), "status": "error"}
-        print(json.dumps(error_info))
+        emit_event(error_info)
         return 1
 
 if __name__ == "__main__":
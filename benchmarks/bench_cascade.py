@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kaskada modeli (cascade.transcribe_cascade) w porównaniu z transkrypcją samym większym modelem.
+
+Użycie:
+    --draft stub --final stub    modele zastępcze o różnej szybkości (--stub-draft-rtf, --stub-final-rtf),
+                                 bez pobierania wag (do CI)
+    --draft tiny --final large   prawdziwe modele Whisper (silnik --backend), jeśli wagi są już pobrane
+
+Raport (JSON) zawiera czas obu ścieżek, przyspieszenie i część nagrania dekodowaną ponownie
+przez większy model; z --min-speedup kończy się kodem 1 przy zbyt małym przyspieszeniu.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_audio import speech_like
+from bench_pipeline import whisper_weights_cached
+import stub_model
+
+import cascade
+import inference_backends
+
+def load(name, backend, stub_rtf):
+    """Ładuje model (None, jeśli wagi prawdziwego modelu nie są pobrane)."""
+    if name == "stub":
+        return stub_model.load_model(realtime_factor=stub_rtf)
+    if backend in ("openai", "torch-int8") and not whisper_weights_cached(name):
+        return None
+    return inference_backends.load_model(backend, name, "cpu")
+
+def main():
+    parser = argparse.ArgumentParser(description='Kaskada modeli a transkrypcja samym większym modelem')
+    parser.add_argument('--draft', default='stub', help='Model wstępny (stub lub nazwa modelu Whisper)')
+    parser.add_argument('--final', default='stub', help='Większy model (stub lub nazwa modelu Whisper)')
+    parser.add_argument('--backend', default='openai', choices=[b for b in inference_backends.BACKENDS if b != 'stub'],
+                        help='Silnik dla prawdziwych modeli')
+    parser.add_argument('--duration', type=float, default=120.0, help='Długość nagrania (sekundy)')
+    parser.add_argument('--language', default='pl', help='Język transkrypcji')
+    parser.add_argument('--stub-draft-rtf', type=float, default=0.01,
+                        help='Czas inferencji zastępczego modelu wstępnego na sekundę audio')
+    parser.add_argument('--stub-final-rtf', type=float, default=0.1,
+                        help='Czas inferencji zastępczego większego modelu na sekundę audio')
+    parser.add_argument('--logprob', type=float, default=cascade.DEFAULT_LOGPROB_THRESHOLD)
+    parser.add_argument('--compression', type=float, default=cascade.DEFAULT_COMPRESSION_THRESHOLD)
+    parser.add_argument('--no-speech', type=float, nargs=2, default=list(cascade.DEFAULT_NO_SPEECH_RANGE))
+    parser.add_argument('--min-speedup', type=float, default=0.0,
+                        help='Wymagane przyspieszenie kaskady (0 - bez sprawdzania)')
+    args = parser.parse_args()
+
+    report = {"draft": args.draft, "final": args.final, "duration": args.duration}
+    draft_model = load(args.draft, args.backend, args.stub_draft_rtf)
+    final_model = load(args.final, args.backend, args.stub_final_rtf)
+    if draft_model is None or final_model is None:
+        report.update({"skipped": True, "reason": "brak pobranych wag modelu"})
+        print(json.dumps(report, indent=2))
+        return 0
+
+    audio = speech_like(args.duration, inference_backends.SAMPLE_RATE)
+    options = {"language": args.language, "task": "transcribe"}
+    limits = cascade.thresholds(args.logprob, args.compression, args.no_speech)
+
+    # Rozgrzewka obu modeli
+    for model in (draft_model, final_model):
+        model.transcribe(audio[:5 * inference_backends.SAMPLE_RATE], **options, verbose=None)
+
+    start = time.perf_counter()
+    final_only = final_model.transcribe(audio, **options, verbose=None)
+    final_only_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result, stats = cascade.transcribe_cascade(draft_model, final_model, audio, options, limits)
+    cascade_time = time.perf_counter() - start
+
+    report.update({
+        "final_only": {"time": final_only_time, "segments": len(final_only["segments"])},
+        "cascade": {"time": cascade_time, "segments": len(result["segments"]), **stats},
+        "redecoded_ratio": stats["redecoded_ratio"],
+        "speedup": final_only_time / cascade_time if cascade_time > 0 else 0
+    })
+    report["passed"] = report["speedup"] >= args.min_speedup
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Przepustowość transkrypcji krótkich nagrań (notatek głosowych 5-30 s): wsadowa
+(whisper_transcribe.transcribe_clips, wspólna inferencja kilku nagrań) w porównaniu
+z transkrypcją plik po pliku (transcribe_audio z tym samym, już załadowanym modelem).
+
+Użycie:
+    --model stub                 model zastępczy silnika "stub" (bez pobierania wag, do CI)
+    --model tiny|base|small|...  prawdziwy model Whisper (silnik --backend), jeśli wagi są już pobrane
+
+Wynik (JSON) zawiera liczbę nagrań na sekundę dla obu ścieżek i przyspieszenie; z --min-speedup
+benchmark kończy się kodem 1, gdy transkrypcja wsadowa nie jest co najmniej tyle razy szybsza.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_audio import write_wav
+from bench_pipeline import whisper_weights_cached
+
+import inference_backends
+import whisper_transcribe
+
+def make_clips(directory, count, min_seconds, max_seconds, seed=0):
+    """Tworzy nagrania WAV 16 kHz mono o losowej długości z przedziału [min_seconds, max_seconds]."""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        duration = float(rng.uniform(min_seconds, max_seconds))
+        paths.append(write_wav(os.path.join(directory, f"clip_{i:03d}.wav"), duration,
+                               inference_backends.SAMPLE_RATE, 1, seed=i))
+    return paths
+
+def run_sequential(paths, output_dir, model_cache, options):
+    """Transkrybuje nagrania po jednym i zwraca czas pracy."""
+    start = time.perf_counter()
+    for path in paths:
+        output_path = os.path.join(output_dir, os.path.basename(path) + ".sequential.md")
+        if whisper_transcribe.transcribe_audio(path, output_path, model_cache=model_cache, use_cache=False,
+                                               use_index=False, **options) is None:
+            raise RuntimeError(f"Transkrypcja nie powiodła się: {path}")
+    return time.perf_counter() - start
+
+def run_batched(paths, output_dir, model_cache, options, batch_size):
+    """Transkrybuje nagrania wsadami i zwraca czas pracy."""
+    clips = [(path, os.path.join(output_dir, os.path.basename(path) + ".batched.md")) for path in paths]
+    start = time.perf_counter()
+    entries = whisper_transcribe.transcribe_clips(clips, model_cache=model_cache, batch_size=batch_size,
+                                                  use_index=False, **options)
+    elapsed = time.perf_counter() - start
+    failed = [e["audio_path"] for e in entries if e["status"] != "completed"]
+    if failed:
+        raise RuntimeError(f"Transkrypcja nie powiodła się: {', '.join(failed)}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Przepustowość wsadowej transkrypcji krótkich nagrań')
+    parser.add_argument('--model', default='stub', help='stub lub nazwa modelu Whisper')
+    parser.add_argument('--backend', default='openai', choices=[b for b in inference_backends.BACKENDS if b != 'stub'],
+                        help='Silnik dla prawdziwego modelu')
+    parser.add_argument('--clips', type=int, default=32, help='Liczba nagrań')
+    parser.add_argument('--min-seconds', type=float, default=5.0, help='Najkrótsze nagranie (sekundy)')
+    parser.add_argument('--max-seconds', type=float, default=30.0, help='Najdłuższe nagranie (sekundy)')
+    parser.add_argument('--batch-size', type=int, default=whisper_transcribe.CLIP_BATCH_SIZE,
+                        help='Liczba nagrań w jednym wsadzie')
+    parser.add_argument('--min-speedup', type=float, default=0.0,
+                        help='Wymagane przyspieszenie ścieżki wsadowej (0 - bez sprawdzania)')
+    args = parser.parse_args()
+
+    backend = 'stub' if args.model == 'stub' else args.backend
+    report = {"model": args.model, "backend": backend, "clips": args.clips, "batch_size": args.batch_size}
+    if backend in ('openai', 'torch-int8') and not whisper_weights_cached(args.model):
+        report.update({"skipped": True, "reason": f"brak pobranych wag modelu {args.model}"})
+        print(json.dumps(report, indent=2))
+        return 0
+
+    options = {"model_size": args.model, "language": "pl", "backend": backend}
+    # Wspólna pamięć podręczna: model jest ładowany raz, przed pomiarami
+    model_cache = whisper_transcribe.ModelCache(whisper_transcribe.model_memory_mb(args.model, backend) * 2)
+    # Zdarzenia JSON transkrypcji trafiają na stderr, a na stdout tylko raport
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(sys.stderr):
+        paths = make_clips(tmp, args.clips, args.min_seconds, args.max_seconds)
+        report["audio_duration"] = sum(whisper_transcribe.get_audio_duration(p) for p in paths)
+
+        # Rozgrzewka: załadowanie modelu i pierwsze wywołania obu ścieżek
+        run_sequential(paths[:1], tmp, model_cache, options)
+        run_batched(paths[:2], tmp, model_cache, options, args.batch_size)
+
+        sequential_time = run_sequential(paths, tmp, model_cache, options)
+        batched_time = run_batched(paths, tmp, model_cache, options, args.batch_size)
+
+    report["sequential"] = {"time": sequential_time, "clips_per_second": args.clips / sequential_time}
+    report["batched"] = {"time": batched_time, "clips_per_second": args.clips / batched_time}
+    report["speedup"] = sequential_time / batched_time
+    report["passed"] = report["speedup"] >= args.min_speedup
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kontrola szczytowego zużycia pamięci przy dekodowaniu długich nagrań (audio_decoder.decode_to_file).
+
+Generuje syntetyczne nagranie w formacie AudioRecorder (44,1 kHz, 16 bit, stereo) o długości
+kilku godzin oraz krótkie nagranie odniesienia, dekoduje każde w osobnym procesie i porównuje
+szczytowe RSS. Kończy się kodem 1, jeśli dekodowanie długiego nagrania zużywa więcej pamięci
+niż krótkiego o ponad --tolerance-mb (pamięć powinna być stała niezależnie od długości).
+Z --in-memory mierzy dla porównania także decode_wav, który tworzy całą tablicę w pamięci.
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_audio import speech_like
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+# Długość bloku zapisywanego naraz przy generowaniu nagrania (sekundy)
+WRITE_BLOCK_SECONDS = 60
+
+def write_long_wav(path, duration):
+    """Zapisuje nagranie blokami (powtarzany minutowy fragment), bez tworzenia całego sygnału w pamięci."""
+    mono = speech_like(WRITE_BLOCK_SECONDS, SAMPLE_RATE)
+    block = (np.repeat(mono[:, None], CHANNELS, axis=1) * 32767).astype('<i2').tobytes()
+    frame_bytes = 2 * CHANNELS
+    remaining = int(duration * SAMPLE_RATE) * frame_bytes
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(CHANNELS)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        while remaining > 0:
+            chunk = block[:remaining]
+            f.writeframesraw(chunk)
+            remaining -= len(chunk)
+    return path
+
+def measure_child(path, mode):
+    """Dekoduje nagranie (w procesie potomnym) i wypisuje czas oraz szczytowe RSS."""
+    import audio_decoder
+    import profiling
+
+    start = time.perf_counter()
+    if mode == "stream":
+        with audio_decoder.decode_to_file(path, directory=os.path.dirname(path)) as audio:
+            samples = len(audio)
+    else:
+        samples = len(audio_decoder.decode_wav(path))
+    print(json.dumps({
+        "mode": mode,
+        "samples": samples,
+        "time": time.perf_counter() - start,
+        "peak_rss_mb": profiling.peak_rss_mb()
+    }))
+    return 0
+
+def measure(path, mode):
+    """Uruchamia pomiar w osobnym procesie (szczytowe RSS jest liczone dla całego procesu)."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, "--mode", mode],
+                            capture_output=True, check=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Szczytowe zużycie pamięci przy dekodowaniu długich nagrań')
+    parser.add_argument('--hours', type=float, default=3.0, help='Długość długiego nagrania (godziny)')
+    parser.add_argument('--baseline-minutes', type=float, default=5.0,
+                        help='Długość nagrania odniesienia (minuty)')
+    parser.add_argument('--tolerance-mb', type=float, default=32.0,
+                        help='Dopuszczalny wzrost szczytowego RSS względem nagrania odniesienia (MB)')
+    parser.add_argument('--in-memory', action='store_true',
+                        help='Zmierz także decode_wav (cała tablica w pamięci) dla porównania')
+    parser.add_argument('--workdir', type=str, default=None, help='Katalog na nagrania testowe (ok. 600 MB na godzinę)')
+    parser.add_argument('--child', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', type=str, default="stream", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return measure_child(args.child, args.mode)
+
+    report = {"hours": args.hours, "baseline_minutes": args.baseline_minutes}
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        short_path = write_long_wav(os.path.join(tmp, 'short.wav'), args.baseline_minutes * 60)
+        long_path = write_long_wav(os.path.join(tmp, 'long.wav'), args.hours * 3600)
+        report["long_file_size_mb"] = os.path.getsize(long_path) / (1024 * 1024)
+
+        report["stream_short"] = measure(short_path, "stream")
+        report["stream_long"] = measure(long_path, "stream")
+        if args.in_memory:
+            report["in_memory_short"] = measure(short_path, "memory")
+            report["in_memory_long"] = measure(long_path, "memory")
+
+    growth = report["stream_long"]["peak_rss_mb"] - report["stream_short"]["peak_rss_mb"]
+    report["stream_rss_growth_mb"] = growth
+    report["passed"] = growth <= args.tolerance_mb
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
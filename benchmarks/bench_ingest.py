@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Archiwum 16 kHz mono z ingest.py w porównaniu z nagraniem źródłowym (domyślnie WAV 44,1 kHz stereo,
+jak z AudioRecorder): rozmiar pliku i czas wczytania próbek ścieżką transkrypcji
+(whisper_transcribe.load_audio). Sprawdza też, czy próbki archiwum odpowiadają źródłu
+z dokładnością do kwantyzacji 16 bit.
+
+Wynik (JSON) zawiera współczynnik zmniejszenia rozmiaru i przyspieszenie wczytywania;
+z --min-storage-ratio lub --min-decode-speedup kończy się kodem 1 przy zbyt małych wartościach.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_audio import write_wav
+
+import ingest
+import whisper_transcribe
+
+def best_time(function, repeats):
+    """Najkrótszy czas z kilku powtórzeń (sekundy)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Archiwum 16 kHz mono a nagranie źródłowe')
+    parser.add_argument('--duration', type=float, default=300.0, help='Długość nagrania (sekundy)')
+    parser.add_argument('--sample-rate', type=int, default=44100, help='Częstotliwość nagrania źródłowego')
+    parser.add_argument('--channels', type=int, default=2, help='Liczba kanałów nagrania źródłowego')
+    parser.add_argument('--repeats', type=int, default=3, help='Liczba powtórzeń pomiaru wczytywania')
+    parser.add_argument('--min-storage-ratio', type=float, default=0.0,
+                        help='Wymagane zmniejszenie rozmiaru (0 - bez sprawdzania)')
+    parser.add_argument('--min-decode-speedup', type=float, default=0.0,
+                        help='Wymagane przyspieszenie wczytywania (0 - bez sprawdzania)')
+    args = parser.parse_args()
+
+    report = {"duration": args.duration, "source_sample_rate": args.sample_rate, "source_channels": args.channels}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_wav(os.path.join(tmp, "source.wav"), args.duration, args.sample_rate, args.channels)
+        start = time.perf_counter()
+        entry = ingest.ingest_file(source, tmp)
+        ingest_time = time.perf_counter() - start
+
+        source_time = best_time(lambda: whisper_transcribe.load_audio(source), args.repeats)
+        archive_time = best_time(lambda: whisper_transcribe.load_audio(entry["archive_path"]), args.repeats)
+        max_error = float(np.max(np.abs(whisper_transcribe.load_audio(source)
+                                        - whisper_transcribe.load_audio(entry["archive_path"]))))
+
+    report.update({
+        "ingest_time": ingest_time,
+        "source_bytes": entry["source_bytes"],
+        "archive_bytes": entry["archive_bytes"],
+        "storage_ratio": entry["source_bytes"] / entry["archive_bytes"],
+        "source_decode_time": source_time,
+        "archive_decode_time": archive_time,
+        "decode_speedup": source_time / archive_time if archive_time > 0 else 0,
+        "max_sample_error": max_error
+    })
+    # Błąd większy niż pół kroku kwantyzacji int16 oznacza różnicę treści, nie tylko zaokrąglenie
+    report["passed"] = (report["storage_ratio"] >= args.min_storage_ratio
+                        and report["decode_speedup"] >= args.min_decode_speedup
+                        and max_error <= 0.5 / 32768 + 1e-7)
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
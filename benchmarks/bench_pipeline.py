@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Powtarzalny benchmark potoku transkrypcji (whisper_transcribe.py).
+
+Dla każdej kombinacji formatu i długości nagrania mierzy osobno etapy:
+odczyt długości (probe), dekodowanie i zmianę częstotliwości (decode), ładowanie modelu
+(model_load), inferencję (inference) i zapis Markdown (format).
+
+Model:
+    --model stub                 model zastępczy (bez pobierania wag, do CI)
+    --model tiny|base|small|...  prawdziwy model Whisper, jeśli wagi są już pobrane
+    --model pakiet.moduł:funkcja własna fabryka modelu (funkcja zwracająca obiekt z metodą transcribe)
+
+Wyniki są zapisywane jako JSON (--output). Z opcją --compare porównuje wyniki
+z wcześniejszym przebiegiem i kończy się kodem 1, jeśli któryś etap zwolnił
+o więcej niż --tolerance.
+
+Przykład:
+    python benchmarks/bench_pipeline.py --durations 60 600 --output wyniki.json
+    python benchmarks/bench_pipeline.py --durations 60 600 --compare wyniki.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import importlib
+import tempfile
+import statistics
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'TranscriberApp', 'PythonScripts'))
+sys.path.insert(0, BENCH_DIR)
+
+import whisper_transcribe
+import synthetic_audio
+import stub_model
+
+# Kolejność etapów w raporcie
+PHASES = ("probe", "decode", "model_load", "inference", "format")
+
+# Różnice czasu poniżej tego progu (sekundy) nie są traktowane jako regresja
+NOISE_FLOOR_SECONDS = 0.005
+
+def whisper_weights_cached(name):
+    """Sprawdza, czy wagi modelu Whisper są już pobrane (benchmark nie pobiera wag)."""
+    try:
+        import whisper
+    except ImportError:
+        return False
+    url = getattr(whisper, "_MODELS", {}).get(name)
+    if url is None:
+        return os.path.isfile(name)
+    root = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "whisper")
+    return os.path.isfile(os.path.join(root, os.path.basename(url)))
+
+def make_model_loader(spec, stub_rtf):
+    """
+    Zwraca funkcję ładującą model oraz jego nazwę do raportu.
+    Funkcja zwraca None, jeśli prawdziwy model nie jest dostępny offline.
+    """
+    if spec == "stub":
+        return (lambda: stub_model.load_model(realtime_factor=stub_rtf)), "stub"
+    if ":" in spec:
+        module_name, factory_name = spec.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), factory_name)
+        return factory, spec
+
+    def load_whisper():
+        if not whisper_weights_cached(spec):
+            return None
+        import whisper
+        return whisper.load_model(spec, device="cpu")
+    return load_whisper, spec
+
+def time_call(fn, *args, **kwargs):
+    """Wywołuje funkcję i zwraca (wynik, czas w sekundach)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def summarize(samples):
+    """Statystyki serii pomiarów."""
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples)
+    }
+
+def bench_case(audio_path, duration, load_model, repeat, decoder):
+    """Mierzy wszystkie etapy potoku dla jednego nagrania."""
+    timings = {phase: [] for phase in PHASES}
+    options = whisper_transcribe.build_transcribe_options("pl", 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "out.md")
+        for _ in range(repeat):
+            _, elapsed = time_call(whisper_transcribe.get_audio_duration, audio_path)
+            timings["probe"].append(elapsed)
+
+            audio, elapsed = time_call(whisper_transcribe.load_audio, audio_path, decoder)
+            timings["decode"].append(elapsed)
+
+            model, elapsed = time_call(load_model)
+            if model is None:
+                return None
+            timings["model_load"].append(elapsed)
+
+            result, elapsed = time_call(model.transcribe, audio, **options, verbose=None)
+            timings["inference"].append(elapsed)
+
+            _, elapsed = time_call(whisper_transcribe.write_markdown, output_path, audio_path, result,
+                                   "bench", "pl", False, 1, 1, 0)
+            timings["format"].append(elapsed)
+
+    phases = {phase: summarize(samples) for phase, samples in timings.items()}
+    total = sum(phase["median"] for phase in phases.values())
+    return {"phases": phases, "total": total, "realtime_factor": duration / total if total > 0 else 0}
+
+def environment_info():
+    """Opis środowiska, w którym wykonano pomiary."""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "ffmpeg": shutil.which("ffmpeg") is not None
+    }
+    for module in ("torch", "whisper"):
+        try:
+            info[module] = getattr(importlib.import_module(module), "__version__", "unknown")
+        except ImportError:
+            info[module] = None
+    return info
+
+def compare(report, baseline, tolerance):
+    """Zwraca listę regresji względem wcześniejszego raportu."""
+    previous = {(c["format"], c["duration"], c["model"]): c for c in baseline.get("cases", [])}
+    regressions = []
+    for case in report["cases"]:
+        old = previous.get((case["format"], case["duration"], case["model"]))
+        if old is None:
+            continue
+        for phase, stats in case["phases"].items():
+            old_stats = old["phases"].get(phase)
+            if old_stats is None:
+                continue
+            before, after = old_stats["median"], stats["median"]
+            if after - before > NOISE_FLOOR_SECONDS and after > before * (1 + tolerance):
+                regressions.append({
+                    "format": case["format"], "duration": case["duration"], "model": case["model"],
+                    "phase": phase, "baseline": before, "current": after,
+                    "change": (after - before) / before if before > 0 else None
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark potoku transkrypcji')
+    parser.add_argument('--formats', nargs='+', default=list(synthetic_audio.FORMATS),
+                        choices=list(synthetic_audio.FORMATS), help='Formaty nagrań')
+    parser.add_argument('--durations', nargs='+', type=float, default=[30, 300], help='Długości nagrań (sekundy)')
+    parser.add_argument('--model', default='stub', help='stub, nazwa modelu Whisper lub moduł:fabryka')
+    parser.add_argument('--stub-rtf', type=float, default=0.0,
+                        help='Dodatkowy czas inferencji modelu zastępczego na sekundę audio')
+    parser.add_argument('--decoder', default='auto', choices=['auto', 'ffmpeg'], help='Ścieżka dekodowania')
+    parser.add_argument('--repeat', type=int, default=3, help='Liczba powtórzeń każdego pomiaru')
+    parser.add_argument('--output', help='Plik wynikowy JSON')
+    parser.add_argument('--compare', help='Wcześniejszy wynik JSON do porównania')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Dopuszczalne spowolnienie etapu (ułamek)')
+    args = parser.parse_args()
+
+    load_model, model_name = make_model_loader(args.model, args.stub_rtf)
+    report = {
+        "environment": environment_info(),
+        "config": {"model": model_name, "decoder": args.decoder, "repeat": args.repeat},
+        "cases": [],
+        "skipped": []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for format_name in args.formats:
+            for duration in args.durations:
+                audio_path = synthetic_audio.make_recording(tmp, format_name, duration)
+                if audio_path is None:
+                    report["skipped"].append({"format": format_name, "duration": duration, "reason": "brak ffmpeg"})
+                    continue
+                case = bench_case(audio_path, duration, load_model, args.repeat, args.decoder)
+                if case is None:
+                    report["skipped"].append({"format": format_name, "duration": duration,
+                                              "reason": f"brak pobranych wag modelu {model_name}"})
+                    continue
+                case.update({"format": format_name, "duration": duration, "model": model_name})
+                report["cases"].append(case)
+                print(json.dumps({"format": format_name, "duration": duration, "total": case["total"]}),
+                      file=sys.stderr)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark i kontrola dokładności natywnego dekodera WAV (audio_decoder.py)
+w porównaniu ze ścieżką ffmpeg używaną przez Whisper.
+
+Generuje syntetyczne nagranie w formacie AudioRecorder (44,1 kHz, 16 bit, stereo),
+mierzy czas dekodowania obiema ścieżkami i wypisuje wynik w formacie JSON.
+Kończy się kodem 1, jeśli stosunek sygnału do szumu jest niższy niż --min-snr.
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts'))
+
+import audio_decoder
+
+# Składowe testowego sygnału: (częstotliwość Hz, amplituda)
+TEST_TONES = ((220.0, 0.3), (1000.0, 0.25), (3300.0, 0.15), (5000.0, 0.1))
+
+def synth_signal(t):
+    """Zwraca sumę tonów testowych w chwilach t (sekundy)."""
+    return sum(amplitude * np.sin(2 * np.pi * freq * t) for freq, amplitude in TEST_TONES)
+
+def write_test_wav(path, duration, sample_rate=44100, channels=2):
+    """Zapisuje testowe nagranie 16-bitowe (sygnał + lekki szum)."""
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        block = sample_rate * 10
+        for start in range(0, int(duration * sample_rate), block):
+            n = min(block, int(duration * sample_rate) - start)
+            t = (start + np.arange(n)) / sample_rate
+            mono = synth_signal(t) + rng.normal(0, 1e-4, n)
+            frames = np.repeat(mono[:, None], channels, axis=1)
+            f.writeframes((frames * 32767).astype('<i2').tobytes())
+
+def snr_db(reference, signal):
+    """Stosunek sygnału do szumu (dB) pomiędzy dwoma sygnałami tej samej długości."""
+    noise = np.mean((reference - signal) ** 2)
+    return float('inf') if noise == 0 else float(10 * np.log10(np.mean(reference ** 2) / noise))
+
+def timed(fn, *args, repeat=3):
+    """Zwraca wynik funkcji i najkrótszy czas spośród kilku wywołań."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark natywnego dekodera WAV')
+    parser.add_argument('--duration', type=float, default=300, help='Długość nagrania testowego (sekundy)')
+    parser.add_argument('--repeat', type=int, default=3, help='Liczba powtórzeń pomiaru')
+    parser.add_argument('--min-snr', type=float, default=60.0, help='Minimalny wymagany SNR (dB)')
+    args = parser.parse_args()
+
+    report = {"duration": args.duration}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.wav')
+        write_test_wav(path, args.duration)
+        report["file_size_mb"] = os.path.getsize(path) / (1024 * 1024)
+
+        native, native_time = timed(audio_decoder.decode_wav, path, repeat=args.repeat)
+        report["native"] = {"time": native_time, "realtime_factor": args.duration / native_time}
+
+        # Dokładność względem analitycznie wyznaczonego sygnału (brzegi pomijamy ze względu na filtr)
+        t = np.arange(len(native)) / audio_decoder.TARGET_SAMPLE_RATE
+        core = slice(audio_decoder.TARGET_SAMPLE_RATE, -audio_decoder.TARGET_SAMPLE_RATE)
+        report["native"]["snr_vs_analytic_db"] = snr_db(synth_signal(t)[core], native[core])
+
+        if shutil.which("ffmpeg"):
+            ffmpeg, ffmpeg_time = timed(audio_decoder.decode_ffmpeg, path, repeat=args.repeat)
+            n = min(len(ffmpeg), len(native))
+            report["ffmpeg"] = {
+                "time": ffmpeg_time,
+                "realtime_factor": args.duration / ffmpeg_time,
+                "snr_vs_analytic_db": snr_db(synth_signal(t[:n])[core], ffmpeg[:n][core])
+            }
+            report["native_vs_ffmpeg"] = {
+                "length_difference": len(native) - len(ffmpeg),
+                "snr_db": snr_db(ffmpeg[:n][core], native[:n][core]),
+                "max_abs_error": float(np.max(np.abs(ffmpeg[:n][core] - native[:n][core]))),
+                "speedup": ffmpeg_time / native_time
+            }
+        else:
+            report["ffmpeg"] = None
+
+    print(json.dumps(report, indent=2))
+    return 0 if report["native"]["snr_vs_analytic_db"] >= args.min_snr else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
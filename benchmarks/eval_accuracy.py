@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ocena dokładności i szybkości konfiguracji transkrypcji na lokalnym korpusie (offline).
+
+Korpus to katalog z nagraniami i transkrypcjami wzorcowymi w plikach .txt o tej samej nazwie
+(nagranie.wav + nagranie.txt). Każda konfiguracja (pola jak w zadaniach trybu --serve: model,
+beam_size, backend, vad, parallel, low_memory itd.) jest uruchamiana w osobnym procesie
+whisper_transcribe.py --serve, który ładuje model raz dla całego korpusu. Dla każdej konfiguracji
+liczone są:
+    WER, CER         - odległość edycyjna słów i znaków po normalizacji tekstu (wielkość liter,
+                       interpunkcja), sumowana dla całego korpusu
+    RTF              - czas transkrypcji bez ładowania modelu / długość nagrań
+    peak_rss_mb      - szczytowe zużycie pamięci procesu transkrypcji
+Tabela na końcu jest posortowana według RTF; znak * oznacza konfiguracje z frontu Pareto
+(żadna inna nie jest jednocześnie szybsza i dokładniejsza).
+
+Użycie:
+    eval_accuracy.py KORPUS                       domyślne konfiguracje prawdziwych modeli (pomijane są
+                                                  modele bez pobranych wag)
+    eval_accuracy.py KORPUS --configs plik.json   lista konfiguracji [{"name": ..., "model": ...}, ...]
+    eval_accuracy.py --stub                       model zastępczy na syntetycznym korpusie (do CI);
+                                                  wzorce są wynikiem modelu zastępczego, więc WER > 0
+                                                  oznacza, że ścieżka transkrypcji zmieniła wynik
+Kończy się kodem 1, gdy któraś konfiguracja zakończy się błędem transkrypcji lub przekroczy --timeout,
+a z --max-wer także wtedy, gdy jej WER przekroczy próg. Konfiguracje pominięte z powodu braku wag
+lub bibliotek nie wpływają na wynik.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TranscriberApp', 'PythonScripts')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_audio import write_wav
+from bench_pipeline import whisper_weights_cached
+
+import inference_backends
+import transcript_index
+import whisper_transcribe
+from batch_transcribe import AUDIO_EXTENSIONS
+
+# Konfiguracje sprawdzane domyślnie (prawdziwe modele Whisper)
+DEFAULT_CONFIGS = [
+    {"name": "tiny", "model": "tiny"},
+    {"name": "base", "model": "base"},
+    {"name": "small", "model": "small"},
+    {"name": "small-beam5", "model": "small", "beam_size": 5, "best_of": 5},
+    {"name": "small-int8", "model": "small", "backend": "torch-int8"},
+    {"name": "small-vad", "model": "small", "vad": True},
+    {"name": "small-parallel2", "model": "small", "parallel": 2},
+    {"name": "medium", "model": "medium"}
+]
+
+# Konfiguracje modelu zastępczego (CI) - wszystkie powinny dać wynik identyczny ze wzorcem
+STUB_CONFIGS = [
+    {"name": "stub", "model": "stub", "backend": "stub"},
+    {"name": "stub-beam5", "model": "stub", "backend": "stub", "beam_size": 5, "best_of": 5},
+    {"name": "stub-low-memory", "model": "stub", "backend": "stub", "low_memory": True}
+]
+
+# Opcje wyłączające pamięć podręczną wyników i cech, indeks i punkty kontrolne (pomiar każdej transkrypcji)
+_MEASUREMENT_OPTIONS = {"no_cache": True, "no_feature_cache": True, "no_index": True, "no_checkpoint": True}
+
+# Znaki inne niż litery, cyfry i odstępy (interpunkcja) są przy normalizacji zamieniane na spacje
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+def normalize_text(text):
+    """Normalizuje tekst przed porównaniem: małe litery, bez interpunkcji, pojedyncze spacje."""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+def edit_distance(reference, hypothesis):
+    """
+    Odległość Levenshteina dwóch sekwencji (słów lub znaków) algorytmem bitowo-równoległym
+    Myersa/Hyyrö: kolumna macierzy programowania dynamicznego jest zapisana jako wektory bitowe
+    (liczby całkowite Pythona), więc koszt to O(len(hypothesis)) operacji na liczbach
+    o len(reference) bitach zamiast O(len(reference) * len(hypothesis)) operacji w Pythonie.
+    Wspólny początek i koniec sekwencji (zwykle większość poprawnej transkrypcji) są pomijane.
+    """
+    start = 0
+    while start < len(reference) and start < len(hypothesis) and reference[start] == hypothesis[start]:
+        start += 1
+    end = 0
+    while (end < len(reference) - start and end < len(hypothesis) - start
+           and reference[-1 - end] == hypothesis[-1 - end]):
+        end += 1
+    reference = reference[start:len(reference) - end]
+    hypothesis = hypothesis[start:len(hypothesis) - end]
+
+    m = len(reference)
+    if m == 0:
+        return len(hypothesis)
+    # Maska pozycji każdego symbolu we wzorcu
+    peq = {}
+    for i, symbol in enumerate(reference):
+        peq[symbol] = peq.get(symbol, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for symbol in hypothesis:
+        eq = peq.get(symbol, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # Przesunięcie z wstawieniem 1: pierwszy wiersz macierzy rośnie o 1 w każdej kolumnie
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+def error_counts(reference_text, hypothesis_text):
+    """Liczba błędów i długość wzorca na poziomie słów i znaków."""
+    reference = normalize_text(reference_text)
+    hypothesis = normalize_text(hypothesis_text)
+    reference_words = reference.split()
+    return {
+        "word_errors": edit_distance(reference_words, hypothesis.split()),
+        "words": len(reference_words),
+        "char_errors": edit_distance(reference, hypothesis),
+        "chars": len(reference)
+    }
+
+def load_corpus(directory):
+    """Zwraca listę par (nagranie, tekst wzorcowy) dla nagrań z plikiem .txt o tej samej nazwie."""
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        reference_path = os.path.join(directory, os.path.splitext(name)[0] + ".txt")
+        if os.path.isfile(reference_path):
+            with open(reference_path, 'r', encoding='utf-8') as f:
+                corpus.append((os.path.join(directory, name), f.read()))
+    return corpus
+
+def make_stub_corpus(directory, count, seconds):
+    """Syntetyczny korpus, którego wzorce są wynikiem modelu zastępczego dla całego nagrania."""
+    model = inference_backends.StubModel()
+    corpus = []
+    for i in range(count):
+        path = write_wav(os.path.join(directory, f"sample_{i:02d}.wav"), seconds, inference_backends.SAMPLE_RATE,
+                         1, seed=i)
+        result = model.transcribe(whisper_transcribe.load_audio(path), language="pl")
+        corpus.append((path, " ".join(segment["text"].strip() for segment in result["segments"])))
+    return corpus
+
+def config_available(config):
+    """Czy konfigurację da się uruchomić offline (None) lub powód pominięcia."""
+    backend = config.get("backend", inference_backends.DEFAULT_BACKEND)
+    if backend == "stub":
+        return None
+    missing = whisper_transcribe.check_dependencies(backend)
+    if missing:
+        return f"brak bibliotek: {', '.join(missing)}"
+    if backend == "ctranslate2":
+        if not config.get("model_dir") or not os.path.isdir(config["model_dir"]):
+            return "brak lokalnego katalogu modelu (model_dir)"
+        return None
+    for model in (config.get("model", "small"), config.get("cascade")):
+        if model and not whisper_weights_cached(model):
+            return f"brak pobranych wag modelu {model}"
+    return None
+
+def run_config(config, corpus, work_dir, language, timeout):
+    """
+    Transkrybuje korpus jedną konfiguracją w procesie whisper_transcribe.py --serve.
+
+    Returns:
+        Słownik z metrykami konfiguracji
+    """
+    name = config["name"]
+    output_dir = os.path.join(work_dir, name)
+    os.makedirs(output_dir, exist_ok=True)
+    fields = {key: value for key, value in config.items() if key != "name"}
+    backend = fields.get("backend", inference_backends.DEFAULT_BACKEND)
+
+    lines = []
+    for i, (audio_path, _) in enumerate(corpus):
+        job = dict(_MEASUREMENT_OPTIONS, language=language, **fields)
+        job.update(job_id=str(i), audio_path=audio_path, output=os.path.join(output_dir, f"{i:04d}.md"))
+        lines.append(json.dumps(job))
+    lines += [json.dumps({"command": "stats"}), json.dumps({"command": "shutdown"})]
+
+    # Osobny katalog danych: historia czasów i pamięć podręczna nie mieszają się z danymi użytkownika
+    env = dict(os.environ, TRANSCRIBER_DATA_DIR=os.path.join(work_dir, "data"))
+    process = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "whisper_transcribe.py"), "--serve", "--backend", backend],
+        input="\n".join(lines) + "\n", capture_output=True, text=True, encoding='utf-8', env=env, timeout=timeout
+    )
+
+    completed, errors, peak_rss_mb = {}, {}, None
+    for line in process.stdout.splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event.get("status") == "completed" and event.get("job_id") is not None:
+            completed[event["job_id"]] = event
+        elif event.get("status") == "error" and event.get("job_id") is not None:
+            errors.setdefault(event["job_id"], event.get("error"))
+        elif event.get("status") == "stats":
+            peak_rss_mb = event.get("peak_rss_mb")
+
+    totals = {"word_errors": 0, "words": 0, "char_errors": 0, "chars": 0}
+    audio_duration = transcribe_time = load_time = 0.0
+    failed = []
+    for i, (audio_path, reference) in enumerate(corpus):
+        event = completed.get(str(i))
+        if event is None:
+            failed.append({"audio_path": audio_path, "error": errors.get(str(i), process.stderr.strip()[-500:])})
+            continue
+        _, segments = transcript_index.parse_markdown(event["output_path"])
+        counts = error_counts(reference, " ".join(segment["text"] for segment in segments))
+        for key in totals:
+            totals[key] += counts[key]
+        model_load = event.get("phases", {}).get("model_load", 0.0)
+        audio_duration += event["audio_duration"]
+        transcribe_time += event["total_time"] - model_load
+        load_time += model_load
+
+    return {
+        "name": name,
+        "config": fields,
+        "files": len(corpus) - len(failed),
+        "failed": failed,
+        "wer": totals["word_errors"] / totals["words"] if totals["words"] else 0.0,
+        "cer": totals["char_errors"] / totals["chars"] if totals["chars"] else 0.0,
+        **totals,
+        "audio_duration": audio_duration,
+        "transcribe_time": transcribe_time,
+        "model_load_time": load_time,
+        "rtf": transcribe_time / audio_duration if audio_duration > 0 else None,
+        "peak_rss_mb": peak_rss_mb
+    }
+
+def pareto_front(results):
+    """Oznacza konfiguracje, których żadna inna nie przewyższa jednocześnie pod względem RTF i WER."""
+    measured = [r for r in results if r["rtf"] is not None]
+    for result in measured:
+        result["pareto"] = not any(
+            other["rtf"] <= result["rtf"] and other["wer"] <= result["wer"]
+            and (other["rtf"] < result["rtf"] or other["wer"] < result["wer"])
+            for other in measured
+        )
+    return sorted(measured, key=lambda r: r["rtf"])
+
+def format_table(results):
+    """Tabela konfiguracji posortowana według RTF."""
+    header = f"{'':1} {'konfiguracja':<24} {'WER':>7} {'CER':>7} {'RTF':>8} {'ładowanie s':>11} {'pamięć MB':>10}"
+    rows = [header, "-" * len(header)]
+    for r in results:
+        memory = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        rows.append(f"{'*' if r['pareto'] else ' ':1} {r['name']:<24} {r['wer']:>7.2%} {r['cer']:>7.2%} "
+                    f"{r['rtf']:>8.4f} {r['model_load_time']:>11.1f} {memory:>10}")
+    return "\n".join(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Dokładność (WER/CER) i szybkość konfiguracji transkrypcji')
+    parser.add_argument('corpus', nargs='?', help='Katalog z nagraniami i wzorcami .txt')
+    parser.add_argument('--configs', help='Plik JSON z listą konfiguracji (domyślnie DEFAULT_CONFIGS)')
+    parser.add_argument('--stub', action='store_true',
+                        help='Konfiguracje modelu zastępczego (bez korpusu: syntetyczny korpus)')
+    parser.add_argument('--synthetic-files', type=int, default=4, help='Liczba nagrań syntetycznego korpusu')
+    parser.add_argument('--synthetic-seconds', type=float, default=20.0, help='Długość nagrań syntetycznego korpusu')
+    parser.add_argument('--language', default='pl', help='Język transkrypcji (jeśli konfiguracja go nie podaje)')
+    parser.add_argument('--timeout', type=float, default=None, help='Limit czasu jednej konfiguracji (sekundy)')
+    parser.add_argument('--output', help='Plik wynikowy JSON')
+    parser.add_argument('--max-wer', type=float, default=None,
+                        help='Największy dopuszczalny WER konfiguracji (ułamek, np. 0.15)')
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        configs = STUB_CONFIGS if args.stub else DEFAULT_CONFIGS
+    if args.corpus is None and not args.stub:
+        parser.error("podaj katalog korpusu lub użyj --stub")
+
+    # Pominięte są tylko konfiguracje, których nie da się uruchomić offline (brak wag lub bibliotek);
+    # przekroczony limit czasu i błędy transkrypcji to niepowodzenia
+    report = {"configs": [], "skipped": [], "failed": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus is not None:
+            if not os.path.isdir(args.corpus):
+                parser.error(f"katalog korpusu nie istnieje: {args.corpus}")
+            corpus = load_corpus(args.corpus)
+            if not corpus:
+                parser.error(f"brak nagrań z plikami .txt w katalogu {args.corpus}")
+        else:
+            corpus = make_stub_corpus(tmp, args.synthetic_files, args.synthetic_seconds)
+        report["corpus"] = {"path": args.corpus or "synthetic", "files": len(corpus)}
+
+        for config in configs:
+            reason = config_available(config)
+            if reason is not None:
+                report["skipped"].append({"name": config["name"], "reason": reason})
+                continue
+            try:
+                result = run_config(config, corpus, tmp, args.language, args.timeout)
+            except subprocess.TimeoutExpired:
+                report["failed"].append({"name": config["name"], "reason": "przekroczony limit czasu"})
+                continue
+            report["configs"].append(result)
+            print(json.dumps({"name": result["name"], "wer": result["wer"], "rtf": result["rtf"]}), file=sys.stderr)
+
+    measured = pareto_front(report["configs"])
+    report["pareto"] = [r["name"] for r in measured if r["pareto"]]
+    report["failed"] += [{"name": r["name"], "reason": "błędy transkrypcji"}
+                         for r in report["configs"] if r["failed"] or r["rtf"] is None]
+    over_limit = [r["name"] for r in measured if args.max_wer is not None and r["wer"] > args.max_wer]
+    report["passed"] = not report["failed"] and not over_limit
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(format_table(measured))
+    for skipped in report["skipped"]:
+        print(f"  pominięto {skipped['name']}: {skipped['reason']}")
+    for failed in report["failed"]:
+        print(f"  niepowodzenie {failed['name']}: {failed['reason']}")
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zastępczy model o interfejsie Whisper (load_model / transcribe) do benchmarków bez pobierania wag.
+Wynik ma ten sam kształt co wynik model.transcribe, a czas pracy rośnie liniowo z długością audio.
+Opiera się na silniku "stub" z inference_backends (katalog PythonScripts musi być w sys.path).
+"""
+
+import time
+
+import inference_backends
+
+SAMPLE_RATE = inference_backends.SAMPLE_RATE
+
+class StubModel(inference_backends.StubModel):
+    """Model zastępczy silnika "stub" z opcjonalnym sztucznym czasem inferencji."""
+
+    def __init__(self, realtime_factor=0.0):
+        super().__init__()
+        # Dodatkowy czas "inferencji" na sekundę audio (symulacja wolniejszego modelu)
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, audio, language=None, verbose=None, **options):
+        result = super().transcribe(audio, language=language, verbose=verbose, **options)
+        if self.realtime_factor > 0:
+            time.sleep(len(audio) / SAMPLE_RATE * self.realtime_factor)
+        return result
+
+def load_model(name="stub", device=None, realtime_factor=0.0):
+    """Odpowiednik whisper.load_model dla modelu zastępczego."""
+    return StubModel(realtime_factor)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generowanie syntetycznych nagrań do benchmarków.
+Sygnał przypomina mowę: harmoniczne o zmiennej wysokości z modulacją amplitudy
+(sylaby) i przerwami między "wypowiedziami", na tle cichego szumu.
+"""
+
+import os
+import wave
+import shutil
+import subprocess
+
+import numpy as np
+
+# Formaty nagrań: nazwa -> (częstotliwość próbkowania, liczba kanałów, rozszerzenie)
+FORMATS = {
+    "wav44k_stereo": (44100, 2, ".wav"),   # format AudioRecorder
+    "wav16k_mono": (16000, 1, ".wav"),
+    "mp3": (44100, 2, ".mp3"),
+}
+
+def speech_like(duration, sample_rate, seed=0):
+    """Zwraca syntetyczny sygnał mono float32 o długości duration sekund."""
+    rng = np.random.default_rng(seed)
+    n = int(duration * sample_rate)
+    t = np.arange(n, dtype=np.float64) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    # 8 s wypowiedzi, 4 s przerwy
+    utterances = ((t % 12.0) < 8.0).astype(np.float64)
+    signal = 0.2 * voice * syllables * utterances + rng.normal(0, 1e-3, n)
+    return np.clip(signal, -1, 1).astype(np.float32)
+
+def write_wav(path, duration, sample_rate, channels, seed=0):
+    """Zapisuje syntetyczne nagranie jako 16-bitowy WAV."""
+    mono = speech_like(duration, sample_rate, seed)
+    frames = np.repeat(mono[:, None], channels, axis=1)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((frames * 32767).astype('<i2').tobytes())
+    return path
+
+def make_recording(directory, format_name, duration, seed=0):
+    """
+    Tworzy nagranie w zadanym formacie.
+
+    Returns:
+        Ścieżka do pliku lub None, jeśli format wymaga niedostępnego ffmpeg
+    """
+    sample_rate, channels, extension = FORMATS[format_name]
+    path = os.path.join(directory, f"{format_name}_{int(duration)}s{extension}")
+    if extension == ".wav":
+        return write_wav(path, duration, sample_rate, channels, seed)
+
+    if not shutil.which("ffmpeg"):
+        return None
+    wav_path = write_wav(path + ".wav", duration, sample_rate, channels, seed)
+    subprocess.run(["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", wav_path, "-b:a", "128k", path],
+                   check=True)
+    os.remove(wav_path)
+    return path